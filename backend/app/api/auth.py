@@ -1,15 +1,19 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError
 from backend.app.db.db import SessionLocal
-from backend.app.db.models import Student, StudentCourse
+from backend.app.db.models import Student
 from backend.data.consts import DEPARTMENT_CREDITS
 from backend.app.core.validation import validate_username,validate_username_for_light
-from backend.app.api.coursesInfo import get_courses
+from backend.app.api.coursesInfo import get_department_catalog
 from backend.app.core.logger import logger
 from backend.app.core.schemas import LoginRequest, SignupRequest
-from backend.app.core.helper import save_user, match_course
-from passlib.hash import bcrypt
+from backend.app.core.helper import save_user, resync_user_grades
+from backend.app.core.progress import get_progress, set_progress
+from backend.app.core.hashing import hash_password, verify_password, password_hasher, PasswordHasherBusy
+from backend.app.core.jobs import scraper_jobs, DONE, FAILED
+from backend.app.core.tokens import issue_token, require_student_id
+from backend.scripts.browser_pool import browser_pool
 
 
 router = APIRouter()
@@ -37,70 +41,27 @@ def guest_login():
      }
 
 
-@router.post("/login")
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    # Step 1: Authenticate user
-    username_validated = validate_username(data.username) or validate_username_for_light(data.username)
-    if not username_validated:
-        logger.error(f"Username not in correct format, Somehow bypassed our frontend!!  Username::{data.username}")
-        raise HTTPException(status_code=401, detail="Username must be in the format Firstname.Lastname")
+@router.get("/metrics")
+def hashing_metrics():
+    """Password hashing pool: queue depth, rejections and bcrypt latency"""
+    return password_hasher.metrics()
 
-    student = db.query(Student).filter(Student.username == data.username).first()
 
-    if not student or not bcrypt.verify(data.password, student.password):
-        logger.error("Username not valid or Password incorrect")
-        raise HTTPException(status_code=401, detail="Invalid username or password")
+@router.get("/metrics/browsers")
+def browser_pool_metrics():
+    """Scraper browser pool: idle/in-use drivers, recycling, utilization and acquire latency"""
+    return browser_pool.metrics()
 
-    # Step 2: Fetch student courses
-    student_courses = db.query(StudentCourse).filter_by(student_id=student.id).all()
-
-    # Step 3: Fetch department course data (from coursesInfo.py)
-    all_data_json = get_courses(student.department)
-
-    # Step 4: Find matching courses by group_code
-    completed_courses = []
-    enrolled_courses = []
-    credits_mandatory = 0
-    credits_elective = 0
-    credits_general = 0
-    enrolled_credits_total = 0
-
-    for sc in student_courses:
-        matched = match_course(sc.course_code, all_data_json)
-        if matched:
-            course_credit = float(matched["courseCredit"]) if matched.get("courseCredit") and float(matched["courseCredit"]) > 0 else 0
-
-            if sc.grade is not None:
-                # Completed course
-                completed_courses.append({
-                    "courseId":  matched.get("realCourseCode", "") or sc.course_code,
-                    "grade": sc.grade
-                })
-
-                # Add to appropriate category totals
-                if 'בחירה' in matched["courseType"]:
-                    credits_elective += course_credit
-                if 'חובה' in matched["courseType"]:
-                    credits_mandatory += course_credit
-                if 'רוח' in matched["courseType"]:
-                    credits_general += course_credit
-            else:
-                # Enrolled course
-                course_id = matched.get("courseCode", "") or matched.get("realCourseCode", "") or sc.course_code
-
-
-                # Store detailed info
-                enrolled_courses.append({
-                    "courseName": matched.get("courseName", "Unknown Course"),
-                    "courseCredit": course_credit,
-                    "courseType": matched.get("courseType", "Unknown"),
-                    "courseCode": course_id,
-                    "semester": matched.get("semester", "")
-                })
-
-                # Add to enrolled credits total
-                enrolled_credits_total += course_credit
-    logger.info(f"Successfully logged username {data.username}")
+
+def _get_student(db: Session, username: str):
+    # One round trip: the student row and its stored progress summary come back from a single joined query
+    return (db.query(Student)
+            .options(joinedload(Student.progress))
+            .filter(Student.username == username)
+            .one_or_none())
+
+
+def _login_payload(student: Student, summary):
     return {
         "status": "success",
         "user": {
@@ -108,36 +69,68 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
             "username": student.username,
             "name": student.name,
             "department": student.department,
-            "completedCourses": completed_courses,
-            "enrolledCourses": enrolled_courses,
+            "completedCourses": summary["completedCourses"],
+            "enrolledCourses": summary["enrolledCourses"],
             "credits": {
                 "completed": student.completedCredits,
                 "required": DEPARTMENT_CREDITS[student.department],
-                "enrolled": enrolled_credits_total
+                "enrolled": summary["enrolledCredits"]
             },
             "gpa": student.gpa,
-            "remainingRequirements": {
-                "general": credits_general,
-                "elective": credits_elective,
-                "mandatory": credits_mandatory
-            }
+            "remainingRequirements": summary["remainingRequirements"]
         },
-        "message": f"Welcome back, {student.name}!"
+        "message": f"Welcome back, {student.name}!",
+        # Sent back as "Authorization: Bearer <token>" to GET /auth/me and /schedule instead of the password
+        "token": issue_token(student.id)
     }
 
 
-@router.post("/signup")
-def signup(data: SignupRequest, db: Session = Depends(get_db)):
-    # Create new user object with just the necessary fields
-    new_user = {
-        "username": data.username,
-        "password": data.password,
-        "department": data.department,
-    }
+@router.post("/login")
+def login(data: LoginRequest, db: Session = Depends(get_db)):
+    # Step 1: Authenticate user
+    username_validated = validate_username(data.username) or validate_username_for_light(data.username)
+    if not username_validated:
+        logger.error(f"Username not in correct format, Somehow bypassed our frontend!!  Username::{data.username}")
+        raise HTTPException(status_code=401, detail="Username must be in the format Firstname.Lastname")
+
+    # Step 2: Fetch the student together with their progress summary
+    student = _get_student(db, data.username)
+
+    if not student or not verify_password(data.password, student.password):
+        logger.error("Username not valid or Password incorrect")
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    # Step 3: Build the response from the stored summary, recomputed only if courses or catalog changed
+    catalog = get_department_catalog(student.department)
+    payload = _login_payload(student, get_progress(db, student, catalog))
+    logger.info(f"Successfully logged username {data.username}")
+    return payload
+
+
+@router.get("/me")
+def me(student_id: int = Depends(require_student_id), db: Session = Depends(get_db)):
+    """The login payload for a session token: no password, so no bcrypt, and the stored progress summary"""
+    student = (db.query(Student)
+               .options(joinedload(Student.progress))
+               .filter(Student.id == student_id)
+               .one_or_none())
+    if student is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired session token")
 
+    catalog = get_department_catalog(student.department)
+    return _login_payload(student, get_progress(db, student, catalog))
+
+
+def _complete_signup(new_user: dict):
+    """
+    The scraper-backed part of signup, run on the signup job pool: scrape and save the student,
+    then build their login payload.
+    """
     # Save user and run the WebScraperStudent script
     save_result = save_user(new_user)
 
+    if save_result.get("error") == "Username already exists":
+        raise HTTPException(status_code=400, detail="Username already taken")
     if not save_result["success"]:
         # If script fails, tell user there was an issue
         logger.error("Script Fails")
@@ -146,12 +139,15 @@ def signup(data: SignupRequest, db: Session = Depends(get_db)):
             detail="There was an issue with your Afeka credentials. Please try again or enter as guest."
         )
 
-    # If script succeeds, proceed with login
+    # If script succeeds, log the user in with what was just saved; the password was verified by the scraper
+    # and hashed by save_user, so it is not verified again here
+    db = SessionLocal()
     try:
-        # Create login request object
-        login_request = LoginRequest(username=data.username, password=data.password)
-        login_result = login(login_request, db)  # Pass the db session here
-        return login_result
+        student = _get_student(db, new_user["username"])
+        if student is None:
+            raise HTTPException(status_code=401, detail="Invalid username or password")
+        catalog = get_department_catalog(student.department)
+        return _login_payload(student, get_progress(db, student, catalog))
 
     except HTTPException as e:
         # If login fails for some reason
@@ -159,6 +155,92 @@ def signup(data: SignupRequest, db: Session = Depends(get_db)):
             "status": "partial",
             "message": "Account created, but automatic login failed. Please log in manually."
         }
+    finally:
+        db.close()
+
+
+@router.post("/signup", status_code=202)
+def signup(data: SignupRequest, db: Session = Depends(get_db)):
+    # A taken username is refused right away instead of after a scrape
+    if db.query(Student.id).filter(Student.username == data.username).first():
+        logger.warning(f"Signup failed: username '{data.username}' is already taken.")
+        raise HTTPException(status_code=400, detail="Username already taken")
+
+    # Create new user object with just the necessary fields
+    new_user = {
+        "username": data.username,
+        "password": data.password,
+        "department": data.department,
+    }
+
+    # Scraping takes a headless browser and tens of seconds, so it runs as a job on a capped pool
+    job = scraper_jobs.submit(data.username, _complete_signup, new_user)
+    logger.info(f"Queued signup job {job.id} for {data.username}")
+    return {"status": "pending", "jobId": job.id, "position": scraper_jobs.position(job)}
+
+
+@router.get("/signup/{job_id}")
+def signup_status(job_id: str):
+    """Poll a signup job; once done this returns the login payload (or the signup error)"""
+    return _job_status(job_id)
+
+
+def _job_status(job_id: str):
+    job = scraper_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if job.status == FAILED:
+        status_code, detail = job.error
+        raise HTTPException(status_code=status_code, detail=detail)
+    if job.status == DONE:
+        return job.result
+    return {"status": job.status, "jobId": job.id, "position": scraper_jobs.position(job)}
+
+
+def _complete_resync(username: str, password: str):
+    """
+    Scrape the student's grades again, apply the differences and return the refreshed login payload.
+    """
+    resync_result = resync_user_grades(username, password)
+    if not resync_result["success"]:
+        logger.error(f"Grade re-sync failed for {username}: {resync_result.get('error')}")
+        raise HTTPException(
+            status_code=401,
+            detail="There was an issue with your Afeka credentials. Please try again."
+        )
+
+    db = SessionLocal()
+    try:
+        student = _get_student(db, username)
+        if student is None:
+            # Deleted between queuing and running the job
+            logger.error(f"Grade re-sync for {username}: student no longer exists")
+            raise HTTPException(status_code=401, detail="Invalid username or password")
+        catalog = get_department_catalog(student.department)
+        payload = _login_payload(student, get_progress(db, student, catalog))
+        payload["changes"] = resync_result["changes"]
+        return payload
+    finally:
+        db.close()
+
+
+@router.post("/resync", status_code=202)
+def resync(data: LoginRequest, db: Session = Depends(get_db)):
+    """Re-scrape the student's grades (Afeka credentials, checked against the account first) as a job"""
+    student = db.query(Student).filter(Student.username == data.username).one_or_none()
+    if not student or not verify_password(data.password, student.password):
+        logger.error("Username not valid or Password incorrect")
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    job = scraper_jobs.submit(data.username, _complete_resync, data.username, data.password)
+    logger.info(f"Queued grade re-sync job {job.id} for {data.username}")
+    return {"status": "pending", "jobId": job.id, "position": scraper_jobs.position(job)}
+
+
+@router.get("/resync/{job_id}")
+def resync_status(job_id: str):
+    """Poll a re-sync job; once done this returns the login payload with the applied changes"""
+    return _job_status(job_id)
 
 
 @router.post("/signuplight")
@@ -178,19 +260,21 @@ def signuplight(data: SignupRequest, db: Session = Depends(get_db)):
         # Create the student with hashed password
         new_student = Student(
             username=data.username,
-            password=bcrypt.hash(data.password),
+            password=hash_password(data.password),
             name=data.username,  # Default to username if name isn't provided
             department=data.department
         )
+        # A new student has no courses yet; their (empty) summary is stored with them
+        summary = set_progress(new_student, [])
 
         db.add(new_student)
         db.commit()
         db.refresh(new_student)
         logger.info(f"User '{data.username}' successfully registered with ID {new_student.id}")
 
-        # Attempt login after successful signup
-        login_request = LoginRequest(username=data.username, password=data.password)
-        login_result = login(login_request, db)
+        # Log in after successful signup; the password was just hashed, so it is not verified again
+        get_department_catalog(data.department)
+        login_result = _login_payload(new_student, summary)
         logger.info(f"User '{data.username}' successfully logged in after light signup.")
         return login_result
 
@@ -198,6 +282,11 @@ def signuplight(data: SignupRequest, db: Session = Depends(get_db)):
         # Already logged above if due to username conflict
         raise http_exc
 
+    except PasswordHasherBusy:
+        # Answered with 503 + Retry-After by the app-level handler
+        db.rollback()
+        raise
+
     except SQLAlchemyError as db_exc:
         db.rollback()
         logger.error(f"Database error during light signup for '{data.username}': {db_exc}")
@@ -1,27 +1,127 @@
-from fastapi import APIRouter, HTTPException
-from backend.app.core.cache import global_courses_cache
+import base64
+import binascii
+from typing import Annotated, Optional
+from fastapi import APIRouter, HTTPException, Response, Header, Query
+from backend.app.core.cache import get_catalog, get_departments_at
+from backend.app.core.catalog import encode_courses, encode_selection
 from backend.app.core.logger import logger
 # Initialize the APIRouter for courses info
 router = APIRouter()
 
+MAX_PAGE_SIZE = 500
+
 # # In-memory cache dictionary to store course data (you can adjust it based on department and other params)
 # courses_cache: Dict[str, str] = {}
 
 
-@router.get("")
-def get_courses(department: str, generalcourses: bool = True):
+def get_department_catalog(department: str):
     # Validate department in cache
-    if department not in global_courses_cache:
-        logger.error(f"department not in global_courses_cache {department}")
+    catalog = get_catalog()
+    if department not in catalog:
+        logger.error(f"department not in course catalog {department}")
         raise HTTPException(status_code=404, detail="Department not found")
+    return catalog
+
+
+def encode_cursor(version, offset):
+    return base64.urlsafe_b64encode(f"{version}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, version):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        cursor_version, offset = raw.split(":")
+        # Only plain digits: a negative offset would slice from the end and return the wrong page
+        if not (offset.isascii() and offset.isdigit()):
+            raise ValueError(offset)
+        cursor_version, offset = int(cursor_version), int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_version != version:
+        # Positions are only stable within one catalog version
+        raise HTTPException(status_code=409, detail="Course catalog changed, restart from the first page")
+    return offset
+
+
+@router.get("")
+def get_courses(department: str, generalcourses: bool = True,
+                semester: Optional[str] = None,
+                courseType: Optional[str] = None,
+                dayOfWeek: Optional[int] = None,
+                lectureType: Optional[int] = None,
+                fields: Optional[str] = None,
+                limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+                cursor: Optional[str] = None,
+                accept_encoding: Annotated[Optional[str], Header()] = None):
+    catalog = get_department_catalog(department)
+    headers = {"X-Catalog-Version": str(catalog.version)}
+
+    filters = {name: value for name, value in (("semester", semester), ("courseType", courseType),
+                                               ("dayOfWeek", dayOfWeek), ("lectureType", lectureType))
+               if value is not None}
+    if not filters and not fields and limit is None and cursor is None:
+        # Body (and its gzip/br variants) is pre-serialized once per catalog version
+        body, encoding = catalog.encoded_payload(department, generalcourses, accept_encoding)
+        headers["Vary"] = "Accept-Encoding"
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    # Filtered view: intersect the precomputed per-filter indexes, then page through the result
+    selected = catalog.select(department, generalcourses, filters)
+    offset = decode_cursor(cursor, catalog.version) if cursor else 0
+    end = len(selected) if limit is None else offset + limit
+    projection = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+    headers["X-Total-Count"] = str(len(selected))
+    if end < len(selected):
+        headers["X-Next-Cursor"] = encode_cursor(catalog.version, end)
+    body = encode_selection(selected[offset:end], projection)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/search")
+def search_courses(q: Annotated[str, Query(min_length=1, max_length=100)],
+                   department: Optional[str] = None,
+                   generalcourses: bool = True,
+                   limit: Annotated[int, Query(ge=1, le=100)] = 20):
+    """Ranked course search by name, real course code or lecturer, in one department or all of them"""
+    catalog = get_department_catalog(department) if department is not None else get_catalog()
+    selection = catalog.search(q, department, generalcourses, limit)
+    return Response(content=encode_selection(selection), media_type="application/json",
+                    headers={"X-Catalog-Version": str(catalog.version)})
+
+
+@router.get("/changes")
+def get_course_changes(department: str, since: int, generalcourses: bool = True):
+    """
+    Courses added, removed or modified in the /courses list of `department` since catalog version `since`.
+    Clients too far behind get "full": true and the whole list, like GET /courses.
+    """
+    catalog = get_department_catalog(department)
+    headers = {"X-Catalog-Version": str(catalog.version)}
+
+    changes = None
+    if since == catalog.version:
+        changes = {}
+    else:
+        previous = get_departments_at(since)
+        if previous is not None:
+            changes = catalog.changes_since(previous, department, generalcourses)
 
-    # Copy department courses
-    combined_courses = list(global_courses_cache[department])  # shallow copy
+    if changes is None:
+        # Wrap the pre-serialized /courses body instead of re-encoding it
+        body = b'{"version":%d,"since":%d,"full":true,"courses":%s}' % (
+            catalog.version, since, catalog.payload(department, generalcourses))
+    else:
+        body = encode_courses({"version": catalog.version, "since": since, "full": False, "departments": changes})
+    return Response(content=body, media_type="application/json", headers=headers)
 
-    # Optionally add "כללי" and "אנגלית"
-    if generalcourses:
-        for gen_dept in ["אנגלית", "כללי"]:
-            if gen_dept in global_courses_cache:
-                combined_courses.extend(global_courses_cache[gen_dept])
 
-    return combined_courses
+@router.get("/version")
+def get_catalog_version():
+    catalog = get_catalog()
+    return {
+        "version": catalog.version,
+        "departments": catalog.stamps(),
+    }
@@ -1,8 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from backend.app.core.logger import logger
 from backend.app.db.db import SessionLocal
 from backend.app.core import schemas
+from backend.app.core.tokens import optional_student_id, require_student_id
+from backend.app.core.config import (SCHEDULE_GENERATOR_BUDGET_MS, SCHEDULE_PARALLEL_BUDGET_MS,
+                                     SCHEDULE_PARALLEL_MIN_LEAVES)
+from backend.app.core.schedule_cache import encode_schedule, schedule_cache
+from backend.app.core.solver import ParallelScheduleSearch, search_size, solver_pool
+from backend.app.core.timetable import ScheduleSearch, check_schedule, course_options, fitting_courses
+from backend.app.api.coursesInfo import get_department_catalog
+from backend.app.db.models import Student
 from backend.app.db import crud
 
 # Initialize the APIRouter for courses info
@@ -17,8 +28,96 @@ def get_db():
         db.close()
 
 
+def _owner_id(student_id, token_student_id):
+    """
+    The student a request acts for: the session token's when one is sent, otherwise the given student id.
+    """
+    if token_student_id is None:
+        if student_id is None:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        return student_id
+    if student_id is not None and student_id != token_student_id:
+        raise HTTPException(status_code=403, detail="Not allowed for this student")
+    return token_student_id
+
+
+@router.post("/validate")
+def validate_schedule(request: schemas.ScheduleValidationRequest):
+    """Time conflicts between the selected groups, and selected groups the catalog does not know"""
+    catalog = get_department_catalog(request.department)
+    return check_schedule(catalog, request.department, request.schedule_data)
+
+
+@router.post("/fits")
+def schedule_fits(request: schemas.ScheduleFitsRequest):
+    """Courses and groups that can still be added to a selection without a time conflict"""
+    catalog = get_department_catalog(request.department)
+    filters = {field: value for field, value in (("courseType", request.course_type),
+                                                 ("semester", request.semester)) if value is not None}
+    return fitting_courses(catalog, request.department, request.schedule_data, request.generalcourses, filters)
+
+
+@router.post("/generate")
+def generate_schedules(request: schemas.ScheduleGenerateRequest):
+    """
+    Conflict-free timetables with one group per lecture type of every requested course, streamed as
+    newline-delimited JSON: a {"type": "schedule"} line whenever a schedule enters the best `limit` so far,
+    then a {"type": "done"} line with the final ranking
+    """
+    catalog = get_department_catalog(request.department)
+
+    courses, unknown = [], []
+    for course_code in dict.fromkeys(request.course_codes):
+        course = catalog.find_by_course_code(course_code, request.department)
+        if course is None or course.get("semester") != request.semester:
+            unknown.append(course_code)
+        else:
+            courses.append(course)
+    if unknown:
+        raise HTTPException(status_code=422, detail={"message": "Courses not offered in this semester",
+                                                     "unknownCourses": unknown})
+
+    options = [course_options(catalog, request.department, course) for course in courses]
+    # Even a forced parallel search needs to be big enough to be worth a slot of the solver pool
+    parallel = (request.mode != "serial" and solver_pool.enabled
+                and search_size(options) >= SCHEDULE_PARALLEL_MIN_LEAVES)
+    if parallel:
+        budget_ms = min(request.time_budget_ms or SCHEDULE_PARALLEL_BUDGET_MS, SCHEDULE_PARALLEL_BUDGET_MS)
+        search = ParallelScheduleSearch(options, request.rank_by, request.limit, budget_ms / 1000)
+    else:
+        budget_ms = min(request.time_budget_ms or SCHEDULE_GENERATOR_BUDGET_MS, SCHEDULE_GENERATOR_BUDGET_MS)
+        search = ScheduleSearch(options, request.rank_by, request.limit, budget_ms / 1000)
+
+    def lines():
+        for schedule in search:
+            yield json.dumps({"type": "schedule", **schedule}, ensure_ascii=False) + "\n"
+        logger.info(f"Generated {search.found} schedules for {len(courses)} courses in "
+                    f"{search.elapsed * 1000:.1f} ms ({search.nodes} nodes, complete: {search.complete})")
+        yield json.dumps({"type": "done", "schedules": search.ranked(), "found": search.found,
+                          "complete": search.complete, "elapsedMs": round(search.elapsed * 1000, 2),
+                          "parallel": getattr(search, "parallel", False)},
+                         ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("")
-def create_schedule(schedule: schemas.SavedScheduleCreate, db: Session = Depends(get_db)):
+def create_schedule(schedule: schemas.SavedScheduleCreate, db: Session = Depends(get_db),
+                    token_student_id: int = Depends(optional_student_id),
+                    check_conflicts: bool = Query(False, alias="checkConflicts")):
+    student_id = _owner_id(schedule.student_id, token_student_id)
+    schedule = schedule.model_copy(update={"student_id": student_id})
+
+    if check_conflicts:
+        # Opt-in: refuse a selection with overlapping groups, checked against the student's department
+        student = db.get(Student, student_id)
+        if student is None:
+            raise HTTPException(status_code=404, detail="Student not found")
+        result = check_schedule(get_department_catalog(student.department), student.department,
+                                schedule.schedule_data)
+        if result["conflicts"]:
+            raise HTTPException(status_code=409, detail={"message": "Schedule has time conflicts", **result})
+
     max_schedules = 5
     current_count = crud.count_schedules_for_student(db, schedule.student_id)
     logger.info(f"Current count: {current_count} for Student ID: {schedule.student_id}")
@@ -28,23 +127,48 @@ def create_schedule(schedule: schemas.SavedScheduleCreate, db: Session = Depends
     return crud.create_saved_schedule(db, schedule)
 
 
+@router.get("/student/me")
+def get_my_schedules(student_id: int = Depends(require_student_id), db: Session = Depends(get_db)):
+    return crud.get_schedules_for_student(db, student_id)
+
+
+@router.get("/metrics")
+def schedule_cache_metrics():
+    """Shared schedule cache: entries, hits/misses, evictions and invalidations"""
+    return schedule_cache.metrics()
+
+
 @router.get("/{schedule_id}", response_model=schemas.SavedScheduleOut)
 def load_schedule(schedule_id: str, db: Session = Depends(get_db)):
-    db_schedule = crud.get_schedule_by_id(db, schedule_id)
-    if not db_schedule:
-        raise HTTPException(status_code=404, detail="Schedule not found")
-    return db_schedule
+    # A shared link is opened by a whole class at once: serve the serialized body without touching the DB
+    body = schedule_cache.get(schedule_id)
+    if body is None:
+        read_at = time.monotonic()
+        db_schedule = crud.get_schedule_by_id(db, schedule_id)
+        if not db_schedule:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        body = encode_schedule(db_schedule)
+        schedule_cache.put(schedule_id, body, read_at)
+    return Response(content=body, media_type="application/json")
 
 
 @router.delete("/{schedule_id}")
-def delete_schedule(schedule_id: str, db: Session = Depends(get_db)):
+def delete_schedule(schedule_id: str, db: Session = Depends(get_db),
+                    token_student_id: int = Depends(optional_student_id)):
+    if token_student_id is not None:
+        # With a session, only the owner's schedules can be deleted
+        db_schedule = crud.get_schedule_by_id(db, schedule_id)
+        if db_schedule and db_schedule.student_id != token_student_id:
+            raise HTTPException(status_code=403, detail="Not allowed for this student")
     success = crud.delete_schedule_by_id(db, schedule_id)
+    schedule_cache.invalidate(schedule_id)
     if not success:
         raise HTTPException(status_code=404, detail="Schedule not found")
     return {"detail": "Schedule deleted successfully"}
 
 
 @router.get("/student/{student_id}")
-def get_student_schedules(student_id: int, db: Session = Depends(get_db)):
-    schedules = crud.get_schedules_for_student(db, student_id)
+def get_student_schedules(student_id: int, db: Session = Depends(get_db),
+                          token_student_id: int = Depends(optional_student_id)):
+    schedules = crud.get_schedules_for_student(db, _owner_id(student_id, token_student_id))
     return schedules
@@ -1,25 +1,290 @@
 # This will hold the in-memory cache
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from backend.app.db.db import SessionLocal
 from backend.app.db.models import DepartmentCourses
 from backend.app.core.logger import logger
+from backend.app.core.catalog import CourseCatalog, DepartmentCatalog, LazyCourseCatalog
+from backend.app.core.snapshot import SnapshotStore, SharedCourseCatalog, encode_section
+from backend.app.core.config import (CATALOG_REFRESH_SECONDS, CATALOG_LAZY, CATALOG_MAX_BYTES,
+                                     CATALOG_WARM_DEPARTMENTS, CATALOG_HISTORY_VERSIONS, CATALOG_SNAPSHOT_DIR,
+                                     CATALOG_SNAPSHOT_MAX_BYTES, CATALOG_SNAPSHOT_WAIT_SECONDS)
+from collections import OrderedDict
+import threading
 import json
+import time
 
-global_courses_cache = {}
+# Replaced as a whole, never mutated, so readers always see a complete catalog.
+# Versions count up from the process start time, so a version a client kept from before a restart
+# is never mistaken for a current one
+_course_catalog = CourseCatalog(version=int(time.time() * 1000))
 
+# Serializes full loads and refreshes so two writers never race on the version
+_reload_lock = threading.Lock()
 
-def load_courses_to_mem():
+
+# {version: {department_name: DepartmentCatalog}} of the last superseded catalogs, oldest first
+_history = OrderedDict()
+
+# Snapshot directory shared by the workers, when CATALOG_SNAPSHOT_DIR is set
+_snapshot_store = None
+
+
+def get_catalog():
+    return _course_catalog
+
+
+def set_catalog(catalog):
+    global _course_catalog
+    previous = _course_catalog
+    if catalog.version > previous.version:
+        # Departments are immutable and shared between versions, so this only keeps the ones that changed alive
+        _history[previous.version] = previous.loaded_departments()
+        while len(_history) > CATALOG_HISTORY_VERSIONS:
+            _history.popitem(last=False)
+    else:
+        # Not a successor (e.g. a fresh load replacing everything); older deltas would be meaningless
+        _history.clear()
+    _course_catalog = catalog
+
+
+def get_departments_at(version):
+    """
+    {department_name: DepartmentCatalog} as of a superseded catalog version, or None if it is no longer kept.
+    Lazy catalogs only remember the departments that were loaded at the time.
+    """
+    return _history.get(version)
+
+
+def _department_from_row(dept):
+    if isinstance(dept.data, str):
+        course_data = json.loads(dept.data)
+    else:
+        course_data = dept.data
+    return DepartmentCatalog(dept.department_name, course_data, dept.updated_at)
+
+
+def _department_stamps(db: Session):
+    return dict(
+        db.query(DepartmentCourses.department_name, func.max(DepartmentCourses.updated_at))
+        .group_by(DepartmentCourses.department_name)
+        .all()
+    )
+
+
+def load_department(department_name):
+    """
+    Read and index a single department, or None if it does not exist.
+    """
     db: Session = SessionLocal()
     try:
-        departments = db.query(DepartmentCourses).all()
-        for dept in departments:
-            if isinstance(dept.data, str):
-                course_data = json.loads(dept.data)
-            else:
-                course_data = dept.data
+        dept = db.query(DepartmentCourses).filter_by(department_name=department_name).first()
+        if dept is None:
+            return None
+        logger.info(f"Loaded department {department_name} on demand")
+        return _department_from_row(dept)
+    finally:
+        db.close()
+
+
+def load_courses_to_mem(lazy=CATALOG_LAZY):
+    if CATALOG_SNAPSHOT_DIR:
+        if _load_shared_catalog():
+            return
+        logger.warning("No catalog snapshot published within %ss, loading from the DB", CATALOG_SNAPSHOT_WAIT_SECONDS)
+    if lazy:
+        return _load_lazy_catalog()
+
+    with _reload_lock:
+        db: Session = SessionLocal()
+        try:
+            departments = {}
+            for dept in db.query(DepartmentCourses).all():
+                departments[dept.department_name] = _department_from_row(dept)
+
+            catalog = CourseCatalog(departments, get_catalog().version + 1)
+            set_catalog(catalog)
+            logger.info("Cached %d departments at startup", len(catalog))
+            log_build_stats(catalog)
+        finally:
+            db.close()
+
+
+def log_build_stats(catalog):
+    stats = catalog.build_stats
+    ratios = ", ".join(f"{encoding} {stats['identity'] / stats[encoding]:.1f}x ({stats[encoding]} bytes)"
+                       for encoding in ("br", "gzip") if stats.get(encoding))
+    logger.info("Built %d course payloads (%d reused) in %.3fs: identity %d bytes, %s",
+                stats["payloads"], stats["reused"], stats["seconds"], stats["identity"], ratios or "no compression")
+
+
+def _load_lazy_catalog():
+    with _reload_lock:
+        db: Session = SessionLocal()
+        try:
+            stamps = _department_stamps(db)
+        finally:
+            db.close()
+
+        catalog = LazyCourseCatalog(stamps, load_department, CATALOG_MAX_BYTES, CATALOG_WARM_DEPARTMENTS,
+                                    get_catalog().version + 1)
+        catalog.warm()
+        set_catalog(catalog)
+        logger.info("Lazy catalog knows %d departments, preloaded %d (%d bytes, budget %d)",
+                    len(catalog), len(catalog.departments), catalog.nbytes, catalog.max_bytes)
 
-            global_courses_cache[dept.department_name] = course_data
 
-        logger.info("Cached %d departments at startup", len(global_courses_cache))
+def _get_snapshot_store():
+    global _snapshot_store
+    if _snapshot_store is None or _snapshot_store.directory != CATALOG_SNAPSHOT_DIR:
+        if _snapshot_store is not None:
+            _snapshot_store.close()
+        _snapshot_store = SnapshotStore(CATALOG_SNAPSHOT_DIR)
+    return _snapshot_store
+
+
+def _publish_snapshot(store):
+    """
+    Leader only: publish a new snapshot generation if the DB changed since the current one.
+    Only changed departments are read; unchanged sections and bodies are copied from the current snapshot.
+    """
+    snapshot = store.open_current()
+    db: Session = SessionLocal()
+    try:
+        stamps = _department_stamps(db)
+        current_stamps = snapshot.stamps() if snapshot is not None else {}
+        if snapshot is not None and current_stamps == stamps:
+            return False
+        changed = [name for name, updated_at in stamps.items()
+                   if name not in current_stamps or current_stamps[name] != updated_at]
+        sections = {}
+        for dept in db.query(DepartmentCourses).filter(DepartmentCourses.department_name.in_(changed)).all():
+            data = json.loads(dept.data) if isinstance(dept.data, str) else dept.data
+            sections[dept.department_name] = encode_section(dept.department_name, data, dept.updated_at)
     finally:
         db.close()
+
+    for name in stamps:
+        if name not in sections:
+            sections[name] = snapshot.sections[name]
+    version = max(snapshot.version if snapshot is not None else 0, get_catalog().version) + 1
+    name = store.publish(version, dict(sorted(sections.items())), previous=snapshot)
+    logger.info("Published catalog snapshot %s (changed: %s)", name, ", ".join(changed) or "-")
+    return True
+
+
+def _map_snapshot(store):
+    """
+    Switch to the store's current snapshot if it is not the one already mapped. Returns True if it switched.
+    """
+    snapshot = store.open_current()
+    if snapshot is None:
+        return False
+    current = get_catalog()
+    if isinstance(current, SharedCourseCatalog):
+        if current.snapshot.name == snapshot.name:
+            return False
+        catalog = current.remapped(snapshot)
+    else:
+        catalog = SharedCourseCatalog(snapshot, CATALOG_SNAPSHOT_MAX_BYTES, CATALOG_WARM_DEPARTMENTS)
+    catalog.warm()
+    set_catalog(catalog)
+    logger.info("Mapped catalog snapshot %s (version %d, %d departments)", snapshot.name, catalog.version,
+                len(catalog))
+    return True
+
+
+def _load_shared_catalog():
+    store = _get_snapshot_store()
+    with _reload_lock:
+        if store.lead():
+            _publish_snapshot(store)
+        elif store.wait_for_current(CATALOG_SNAPSHOT_WAIT_SECONDS) is None:
+            return False
+        return _map_snapshot(store) or isinstance(get_catalog(), SharedCourseCatalog)
+
+
+def _refresh_shared_catalog():
+    store = _get_snapshot_store()
+    with _reload_lock:
+        # Any worker may take over publishing once the leader has exited
+        if store.lead():
+            _publish_snapshot(store)
+        return _map_snapshot(store)
+
+
+def refresh_catalog():
+    """
+    Re-read only the departments whose updated_at changed and publish a new catalog version.
+    Unchanged departments are shared with the previous catalog.
+    Returns True if a new catalog was published.
+    """
+    if CATALOG_SNAPSHOT_DIR and isinstance(get_catalog(), SharedCourseCatalog):
+        return _refresh_shared_catalog()
+
+    with _reload_lock:
+        current = get_catalog()
+        db: Session = SessionLocal()
+        try:
+            stamps = _department_stamps(db)
+
+            current_stamps = current.stamps()
+            changed = [name for name, updated_at in stamps.items()
+                       if name not in current_stamps or current_stamps[name] != updated_at]
+            removed = [name for name in current_stamps if name not in stamps]
+            if not changed and not removed:
+                return False
+
+            departments = {}
+            if changed and not isinstance(current, LazyCourseCatalog):
+                rows = db.query(DepartmentCourses).filter(DepartmentCourses.department_name.in_(changed)).all()
+                for dept in rows:
+                    departments[dept.department_name] = _department_from_row(dept)
+        finally:
+            db.close()
+
+        if isinstance(current, LazyCourseCatalog):
+            # Changed departments are dropped and reloaded on next access
+            catalog = current.refreshed(stamps, current.version + 1)
+            catalog.warm()
+        else:
+            for name, dept in current.departments.items():
+                if name in stamps:
+                    departments.setdefault(name, dept)
+            catalog = CourseCatalog(departments, current.version + 1, previous=current)
+            log_build_stats(catalog)
+
+        set_catalog(catalog)
+        logger.info("Catalog reloaded to version %d (changed: %s, removed: %s)",
+                    catalog.version, ", ".join(changed) or "-", ", ".join(removed) or "-")
+        return True
+
+
+class CatalogRefresher:
+    """
+    Background thread polling DepartmentCourses.updated_at every `interval` seconds.
+    """
+
+    def __init__(self, interval=CATALOG_REFRESH_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0:
+            logger.info("Catalog hot reload disabled")
+            return
+        self._thread = threading.Thread(target=self._run, name="catalog-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                refresh_catalog()
+            except Exception as e:
+                logger.error(f"Catalog refresh failed: {e}")
@@ -0,0 +1,601 @@
+import heapq
+import json
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from backend.data.consts import COURSES_FROM_DIFFERENT_YEARS
+from backend.app.core.compression import compress_payload, choose_encoding
+from backend.app.core.records import Course
+from backend.app.core.search import SearchIndex, normalize
+from backend.app.core.timetable import TimetableIndex
+
+GENERAL_DEPARTMENTS = ("אנגלית", "כללי")
+
+
+def encode_courses(courses):
+    """
+    Encode courses exactly like FastAPI's JSONResponse does.
+    """
+    return json.dumps(
+        courses,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def encode_department(courses):
+    """
+    (encoded_items, offsets): the exact JSON of every course, back to back, so bodies and pages are built by
+    slicing/concatenation. offsets[i] is where course i starts; offsets[-1] is one past the end
+    (as if followed by a comma).
+    """
+    encoded = [encode_courses(course) for course in courses]
+    offsets = array("Q", [0])
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item) + 1)
+    return b",".join(encoded), offsets
+
+
+def deep_sizeof(root):
+    """
+    Bytes held by `root` and everything it references (containers, record slots), each object counted once.
+    Objects shared with other structures (interned strings, small ints) are counted as if they were its own.
+    """
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif not isinstance(obj, (str, bytes, int, float, bool, type(None), memoryview, array)):
+            for cls in type(obj).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    if hasattr(obj, name):
+                        stack.append(getattr(obj, name))
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+    return total
+
+
+def payload_nbytes(payload, compressed):
+    """
+    Bytes of a cached /courses body and its compressed variants.
+    """
+    return len(payload) + sum(len(body) for body in compressed.values())
+
+
+# Course fields, and group fields (a course matches if one of its groups matches all of them), /courses filters on
+COURSE_FILTER_FIELDS = ("semester", "courseType")
+GROUP_FILTER_FIELDS = ("dayOfWeek", "lectureType")
+
+
+class DepartmentCatalog:
+    """
+    The courses of a single department, as compact Course records, with hash indexes over them.
+    Built once and never mutated, so it can be shared between catalog snapshots.
+    """
+
+    __slots__ = ("name", "courses", "updated_at", "by_real_code", "by_course_code",
+                 "filter_index", "encoded_items", "offsets", "search_index", "timetable", "_nbytes")
+
+    def __init__(self, name, courses, updated_at=None, encoded=None):
+        """
+        `courses` is the raw JSON list stored in DepartmentCourses.data; it is not kept.
+        `encoded` is its encode_department() result, when already at hand (e.g. mapped from a snapshot).
+        """
+        self.name = name
+        self.updated_at = updated_at
+        self.encoded_items, self.offsets = encoded if encoded is not None else encode_department(courses)
+
+        self.courses = tuple(Course.from_dict(course) for course in courses)
+        self.by_real_code = {}
+        self.by_course_code = {}
+        # {field: {value: (position, ...)}} with positions in ascending order,
+        # plus GROUP_FILTER_FIELDS itself, keyed by the tuple of group values, for filters on several group fields
+        self.filter_index = {field: {} for field in COURSE_FILTER_FIELDS + GROUP_FILTER_FIELDS}
+        self.filter_index[GROUP_FILTER_FIELDS] = {}
+
+        for position, course in enumerate(self.courses):
+            # The first occurrence wins, like the old linear scan
+            if course.get("realCourseCode"):
+                self.by_real_code.setdefault(course["realCourseCode"], course)
+            if course.get("courseCode"):
+                self.by_course_code.setdefault(course["courseCode"], course)
+            for field in COURSE_FILTER_FIELDS:
+                self.filter_index[field].setdefault(course.get(field), []).append(position)
+            group_values = {tuple(group.get(field) for field in GROUP_FILTER_FIELDS) for group in course.iter_groups()}
+            for i, field in enumerate(GROUP_FILTER_FIELDS):
+                for value in {values[i] for values in group_values}:
+                    self.filter_index[field].setdefault(value, []).append(position)
+            for values in group_values:
+                self.filter_index[GROUP_FILTER_FIELDS].setdefault(values, []).append(position)
+
+        for field, index in self.filter_index.items():
+            self.filter_index[field] = {value: tuple(positions) for value, positions in index.items()}
+
+        self.search_index = SearchIndex(self.courses)
+        self.timetable = TimetableIndex(self.courses)
+        self._nbytes = None
+
+    @classmethod
+    def from_encoded(cls, name, encoded_items, offsets, updated_at=None):
+        """
+        Rebuild a department from its encoded JSON, reusing (not copying) the buffers.
+        """
+        courses = json.loads(b"[" + encoded_items + b"]")
+        return cls(name, courses, updated_at, (encoded_items, offsets))
+
+    @property
+    def nbytes(self):
+        """
+        Footprint used for the lazy catalog budget: the records, every index and the encoded JSON (a mapped
+        snapshot buffer is shared, so only its view counts). Several times the JSON size; measured on first use.
+        """
+        if self._nbytes is None:
+            self._nbytes = deep_sizeof(self)
+        return self._nbytes
+
+    def encoded_course(self, position):
+        return self.encoded_items[self.offsets[position]:self.offsets[position + 1] - 1]
+
+    def matching(self, filters):
+        """
+        Positions of the courses matching every {field: value} filter, in catalog order.
+        """
+        if not filters:
+            return range(len(self.courses))
+        filters = dict(filters)
+        if all(field in filters for field in GROUP_FILTER_FIELDS):
+            # Both group filters must hold for the same group
+            filters[GROUP_FILTER_FIELDS] = tuple(filters.pop(field) for field in GROUP_FILTER_FIELDS)
+        candidates = sorted((self.filter_index[field].get(value, ()) for field, value in filters.items()), key=len)
+        if not candidates[0]:
+            return ()
+        if len(candidates) == 1:
+            return candidates[0]
+        selected = set(candidates[0]).intersection(*candidates[1:])
+        return sorted(selected)
+
+
+def encode_selection(selection, fields=None):
+    """
+    JSON array body of the selected (department_catalog, position) courses.
+    Whole courses reuse their pre-encoded bytes; `fields` projects each course to those keys.
+    """
+    if fields:
+        parts = [encode_courses({field: dept.courses[i][field] for field in fields if field in dept.courses[i]})
+                 for dept, i in selection]
+    else:
+        parts = [dept.encoded_course(i) for dept, i in selection]
+    return b"[" + b",".join(parts) + b"]"
+
+
+def _positions_by(records, key):
+    """
+    {record[key]: position}, or None if some record has no key or shares it with another.
+    """
+    positions = {}
+    for position, record in enumerate(records):
+        value = record.get(key)
+        if value is None or value in positions:
+            return None
+        positions[value] = position
+    return positions
+
+
+def _group_changes(old_course, new_course):
+    old_groups, new_groups = old_course.iter_groups(), new_course.iter_groups()
+    old_keys, new_keys = _positions_by(old_groups, "groupCode"), _positions_by(new_groups, "groupCode")
+    if old_keys is None or new_keys is None:
+        return None
+    changes = {"addedGroups": [], "removedGroups": [code for code in old_keys if code not in new_keys],
+               "modifiedGroups": []}
+    for code, position in new_keys.items():
+        group = new_groups[position].to_dict()
+        if code not in old_keys:
+            changes["addedGroups"].append(group)
+        elif old_groups[old_keys[code]].to_dict() != group:
+            changes["modifiedGroups"].append(group)
+    return changes
+
+
+def department_changes(old, new):
+    """
+    What changed between two versions of a department, with courses keyed by courseCode and groups by groupCode:
+        {"added": [course, ...], "removed": [courseCode, ...],
+         "modified": [{"courseCode", "course" (without groups), "addedGroups", "removedGroups", "modifiedGroups"}]}
+    None if courses or groups cannot be told apart by their codes.
+    """
+    if old is new:
+        return {"added": [], "removed": [], "modified": []}
+    old_keys, new_keys = _positions_by(old.courses, "courseCode"), _positions_by(new.courses, "courseCode")
+    if old_keys is None or new_keys is None:
+        return None
+
+    changes = {"added": [], "removed": [code for code in old_keys if code not in new_keys], "modified": []}
+    for code, position in new_keys.items():
+        old_position = old_keys.get(code)
+        if old_position is None:
+            changes["added"].append(new.courses[position].to_dict())
+            continue
+        # Byte comparison of the pre-encoded JSON skips unchanged courses cheaply
+        if old.encoded_course(old_position) == new.encoded_course(position):
+            continue
+        groups = _group_changes(old.courses[old_position], new.courses[position])
+        if groups is None:
+            return None
+        course = new.courses[position].to_dict()
+        course.pop("groups", None)
+        changes["modified"].append({"courseCode": code, "course": course, **groups})
+    return changes
+
+
+def _same_sources(previous, current):
+    return previous is not None and len(previous) == len(current) and all(
+        a is b for a, b in zip(previous, current))
+
+
+class CourseCatalog:
+    """
+    Immutable snapshot of every cached department.
+    Lookups for a department also search the general departments, in the same order
+    the merged /courses list has them.
+    """
+
+    def __init__(self, departments=None, version=0, previous=None):
+        self.departments = dict(departments or {})
+        self.version = version
+        self.payloads = {}
+        self.compressed = {}
+        self._payload_sources = {}
+        self.build_stats = {"payloads": 0, "reused": 0, "identity": 0, "seconds": 0.0}
+
+        started = time.perf_counter()
+        for department in self.departments:
+            for generalcourses in (True, False):
+                key = (department, generalcourses)
+                sources = tuple(self._search_order(department, generalcourses))
+                self._payload_sources[key] = sources
+
+                # Reuse the previous version's bodies when none of their departments changed
+                if previous is not None and _same_sources(previous._payload_sources.get(key), sources):
+                    self.payloads[key] = previous.payloads[key]
+                    self.compressed[key] = previous.compressed[key]
+                    self.build_stats["reused"] += 1
+                else:
+                    self.payloads[key] = self._build_payload(sources)
+                    self.compressed[key] = compress_payload(self.payloads[key])
+
+                self.build_stats["payloads"] += 1
+                self.build_stats["identity"] += len(self.payloads[key])
+                for encoding, body in self.compressed[key].items():
+                    self.build_stats[encoding] = self.build_stats.get(encoding, 0) + len(body)
+        self.build_stats["seconds"] = time.perf_counter() - started
+
+    @classmethod
+    def from_data(cls, data, version=0):
+        """
+        Build a catalog from a {department_name: [course, ...]} mapping.
+        """
+        return cls({name: DepartmentCatalog(name, courses) for name, courses in data.items()}, version)
+
+    def __contains__(self, department):
+        return department in self.departments
+
+    def __len__(self):
+        return len(self.departments)
+
+    def stamps(self):
+        """
+        {department_name: updated_at} of every department in the catalog.
+        """
+        return {name: dept.updated_at for name, dept in self.departments.items()}
+
+    def department_stamp(self, department):
+        """
+        Identifies the catalog data lookups for a student of `department` see; it changes when any
+        department in its search order is reloaded. Departments without updated_at fall back to the version.
+        """
+        stamps = self.stamps()
+        names = [department] + list(GENERAL_DEPARTMENTS)
+        return "|".join(f"{name}@{stamps[name].isoformat() if stamps[name] else self.version}"
+                        for name in names if name in stamps)
+
+    def _department(self, name):
+        return self.departments.get(name)
+
+    def _search_order(self, department, generalcourses=True):
+        dept = self._department(department)
+        if dept is not None:
+            yield dept
+        if generalcourses:
+            for gen_dept in GENERAL_DEPARTMENTS:
+                dept = self._department(gen_dept)
+                if dept is not None:
+                    yield dept
+
+    @staticmethod
+    def _build_payload(sources):
+        parts = [d.encoded_items for d in sources if d.encoded_items]
+        return b"[" + b",".join(parts) + b"]"
+
+    def payload(self, department, generalcourses=True):
+        """
+        Pre-serialized /courses response body, or None for an unknown department.
+        """
+        return self.payloads.get((department, generalcourses))
+
+    def payload_variants(self, department, generalcourses=True):
+        """
+        Precompressed variants of payload(), keyed by Content-Encoding.
+        """
+        return self.compressed.get((department, generalcourses), {})
+
+    def encoded_payload(self, department, generalcourses=True, accept_encoding=None):
+        """
+        (body, content_encoding) of the /courses response for the client's Accept-Encoding.
+        content_encoding is None when the body is sent uncompressed.
+        """
+        variants = self.payload_variants(department, generalcourses)
+        encoding = choose_encoding(accept_encoding, variants)
+        if encoding is not None:
+            return variants[encoding], encoding
+        return self.payload(department, generalcourses), None
+
+    def courses(self, department, generalcourses=True):
+        """
+        The department courses followed (optionally) by the general courses.
+        """
+        combined_courses = []
+        for dept in self._search_order(department, generalcourses):
+            combined_courses.extend(dept.courses)
+        return combined_courses
+
+    def match_course(self, real_course_code, department):
+        """
+        Find a course by realCourseCode for a student of `department`.
+        Falls back to COURSES_FROM_DIFFERENT_YEARS. The returned dict is shared - do not mutate it.
+        """
+        for dept in self._search_order(department):
+            course = dept.by_real_code.get(real_course_code)
+            if course is not None:
+                return course
+        return COURSES_FROM_DIFFERENT_YEARS.get(real_course_code)
+
+    def find_by_course_code(self, course_code, department, generalcourses=True):
+        for dept in self._search_order(department, generalcourses):
+            course = dept.by_course_code.get(course_code)
+            if course is not None:
+                return course
+        return None
+
+    def group_meetings(self, course_code, group_code, department, generalcourses=True):
+        """
+        The meetings (see TimetableIndex) of a group by courseCode and groupCode, None for an unknown group.
+        """
+        for dept in self._search_order(department, generalcourses):
+            meetings = dept.timetable.group_meetings(course_code, group_code)
+            if meetings is not None:
+                return meetings
+        return None
+
+    def group_mask(self, course_code, group_code, department, generalcourses=True):
+        """
+        The week slots (see TimetableIndex) a group occupies, None for an unknown group.
+        """
+        for dept in self._search_order(department, generalcourses):
+            mask = dept.timetable.masks.get((course_code, group_code))
+            if mask is not None:
+                return mask
+        return None
+
+    def by_semester(self, department, semester, generalcourses=True):
+        return [dept.courses[i] for dept, i in self.select(department, generalcourses, {"semester": semester})]
+
+    def by_course_type(self, department, course_type, generalcourses=True):
+        return [dept.courses[i] for dept, i in self.select(department, generalcourses, {"courseType": course_type})]
+
+    def loaded_departments(self):
+        """
+        {department_name: DepartmentCatalog} of every department currently in memory.
+        """
+        return dict(self.departments)
+
+    def iter_departments(self):
+        """
+        Every department in the catalog.
+        """
+        return iter(list(self.departments.values()))
+
+    def search(self, query, department=None, generalcourses=True, limit=20):
+        """
+        (department_catalog, position) of the best matches for `query` by course name, realCourseCode
+        or lecturer, best first. Searches every department when `department` is None.
+        """
+        query = normalize(query)
+        if department is None:
+            sources = self.iter_departments()
+        else:
+            # The general departments may already be in the list when searching one of them
+            sources = {id(dept): dept for dept in self._search_order(department, generalcourses)}.values()
+
+        best = []  # (-score, rank, position, department_catalog) of the best `limit` matches so far
+        for rank, dept in enumerate(sources):
+            matches = [(-score, rank, position, dept) for score, position in dept.search_index.search(query, limit)]
+            best = heapq.nsmallest(limit, best + matches)
+        return [(dept, position) for _, _, position, dept in best]
+
+    def changes_since(self, previous, department, generalcourses=True):
+        """
+        {department_name: department_changes(...)} of the departments in the /courses list of `department`
+        that differ from `previous` ({department_name: DepartmentCatalog} of an older version).
+        None when the difference cannot be expressed as a delta and a full snapshot is needed.
+        """
+        names = [department] + (list(GENERAL_DEPARTMENTS) if generalcourses else [])
+        changes = {}
+        for name in dict.fromkeys(names):
+            old, new = previous.get(name), self._department(name)
+            if new is None:
+                if old is not None:
+                    return None  # the department is gone
+                continue
+            if old is None:
+                return None  # unknown at that version (or not loaded then, in lazy mode)
+            delta = department_changes(old, new)
+            if delta is None:
+                return None
+            if any(delta.values()):
+                changes[name] = delta
+        return changes
+
+    def select(self, department, generalcourses=True, filters=None):
+        """
+        (department_catalog, position) of every course matching `filters`, in /courses order.
+        """
+        selected = []
+        for dept in self._search_order(department, generalcourses):
+            selected.extend((dept, position) for position in dept.matching(filters))
+        return selected
+
+
+class LazyCourseCatalog(CourseCatalog):
+    """
+    Catalog that only knows department names up front and loads each department on first access.
+    Loaded departments are kept in an LRU bounded by `max_bytes`, which counts their records and indexes
+    and the /courses bodies (with compressed variants) cached for them; pinned departments
+    (the warm list and the general departments every lookup needs) are never evicted.
+    """
+
+    def __init__(self, stamps, loader, max_bytes, pinned=(), version=0, loaded=None):
+        super().__init__(version=version)
+        self._stamps = dict(stamps)
+        self._loader = loader
+        self.max_bytes = max_bytes
+        self.pinned = frozenset(pinned) | frozenset(GENERAL_DEPARTMENTS)
+        self.departments = OrderedDict()
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+        for name, dept in (loaded or {}).items():
+            if name in self._stamps:
+                self._insert(name, dept)
+
+    def __contains__(self, department):
+        return department in self._stamps
+
+    def __len__(self):
+        return len(self._stamps)
+
+    def stamps(self):
+        return dict(self._stamps)
+
+    def loaded_departments(self):
+        # Only what is loaded; the change history must not pull every department into memory
+        with self._lock:
+            return dict(self.departments)
+
+    def iter_departments(self):
+        # One at a time, so a search of every department stays within the LRU budget: only the departments
+        # holding one of the best matches so far are referenced while the rest can be evicted behind it
+        for name in list(self._stamps):
+            dept = self._department(name)
+            if dept is not None:
+                yield dept
+
+    def refreshed(self, stamps, version):
+        """
+        A new catalog for `stamps` that keeps the already loaded departments that did not change.
+        """
+        with self._lock:
+            unchanged = {name: dept for name, dept in self.departments.items()
+                         if name in stamps and dept.updated_at == stamps[name]}
+        return LazyCourseCatalog(stamps, self._loader, self.max_bytes, self.pinned, version, unchanged)
+
+    def warm(self):
+        """
+        Load the pinned departments ahead of the first request.
+        """
+        for name in sorted(self.pinned):
+            self._department(name)
+
+    def _department(self, name):
+        with self._lock:
+            dept = self.departments.get(name)
+            if dept is not None:
+                self.departments.move_to_end(name)
+                return dept
+            if name not in self._stamps:
+                return None
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Only one thread loads a department, the others wait for it
+        with load_lock:
+            with self._lock:
+                dept = self.departments.get(name)
+            if dept is None:
+                dept = self._loader(name)
+                if dept is None:
+                    return None
+                dept.nbytes  # measured here, not under the lock
+                with self._lock:
+                    self._insert(name, dept)
+                    self._evict(keep=name)
+        return dept
+
+    def _insert(self, name, dept):
+        self.departments[name] = dept
+        self.nbytes += dept.nbytes
+
+    def _evict(self, keep):
+        for name in list(self.departments):
+            if self.nbytes <= self.max_bytes:
+                break
+            if name == keep or name in self.pinned:
+                continue
+            dept = self.departments.pop(name)
+            self.nbytes -= dept.nbytes
+            for generalcourses in (True, False):
+                payload = self.payloads.pop((name, generalcourses), None)
+                compressed = self.compressed.pop((name, generalcourses), None)
+                if payload is not None:
+                    self.nbytes -= payload_nbytes(payload, compressed)
+
+    def _payload_entry(self, department, generalcourses):
+        # Always go through _department() so payload hits keep the department warm in the LRU
+        if self._department(department) is None:
+            return None
+        key = (department, generalcourses)
+        with self._lock:
+            payload, compressed = self.payloads.get(key), self.compressed.get(key)
+        if payload is None:
+            payload = self._build_payload(tuple(self._search_order(department, generalcourses)))
+            compressed = compress_payload(payload)
+            with self._lock:
+                if department in self.departments and key not in self.payloads:
+                    # Merged bodies repeat the general departments, so they count on top of the departments
+                    self.payloads[key] = payload
+                    self.compressed[key] = compressed
+                    self.nbytes += payload_nbytes(payload, compressed)
+                    self._evict(keep=department)
+        return payload, compressed
+
+    def payload(self, department, generalcourses=True):
+        entry = self._payload_entry(department, generalcourses)
+        return None if entry is None else entry[0]
+
+    def payload_variants(self, department, generalcourses=True):
+        entry = self._payload_entry(department, generalcourses)
+        return {} if entry is None else entry[1]
@@ -0,0 +1,57 @@
+import gzip
+from backend.app.core.config import CATALOG_GZIP_LEVEL, CATALOG_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip variants are always built
+    brotli = None
+
+# Server preference when the client accepts several encodings with the same q-value
+PREFERRED_ENCODINGS = ("br", "gzip")
+
+
+def compress_payload(payload):
+    """
+    Build every compressed variant of a response body, keyed by Content-Encoding.
+    """
+    variants = {"gzip": gzip.compress(payload, compresslevel=CATALOG_GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(payload, quality=CATALOG_BROTLI_QUALITY)
+    return variants
+
+
+def parse_accept_encoding(accept_encoding):
+    """
+    Parse an Accept-Encoding header into {coding: q}.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding, available):
+    """
+    Pick the best available encoding the client accepts, or None to send the body as is.
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding not in available:
+            continue
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
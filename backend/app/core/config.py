@@ -0,0 +1,99 @@
+# backend/config.py
+
+from dotenv import load_dotenv
+import os
+
+# === Same local .env file as the DB layer (Railway sets real env vars) ===
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV_PATH = os.path.join(BASE_DIR, "db", "db_keys.env")
+
+if os.path.exists(ENV_PATH):
+    load_dotenv(ENV_PATH)
+
+# === Course catalog cache ===
+# Seconds between polls of DepartmentCourses.updated_at, 0 disables hot reload
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "60"))
+
+# Lazy mode loads each department on first access instead of all of them at startup
+CATALOG_LAZY = os.getenv("CATALOG_LAZY", "false").lower() in ("1", "true", "yes")
+
+# Lazy mode memory budget for loaded departments: their records, indexes and encoded JSON (several times the
+# JSON size) plus the /courses bodies cached for them. Cold departments are evicted first
+CATALOG_MAX_BYTES = int(os.getenv("CATALOG_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Comma separated departments preloaded and never evicted in lazy mode
+CATALOG_WARM_DEPARTMENTS = [d.strip() for d in os.getenv("CATALOG_WARM_DEPARTMENTS", "").split(",") if d.strip()]
+
+# Precompressed /courses variants, built once per catalog version
+CATALOG_GZIP_LEVEL = int(os.getenv("CATALOG_GZIP_LEVEL", "9"))
+CATALOG_BROTLI_QUALITY = int(os.getenv("CATALOG_BROTLI_QUALITY", "9"))
+
+# Superseded catalog versions kept for GET /courses/changes; clients further behind get a full snapshot
+CATALOG_HISTORY_VERSIONS = int(os.getenv("CATALOG_HISTORY_VERSIONS", "8"))
+
+# Directory (ideally on tmpfs, e.g. /dev/shm/happy-schedule) for a catalog snapshot shared by every worker.
+# One worker loads the DB and publishes, the others map the published file; empty disables.
+# Only the /courses bodies are shared: each worker still builds the records and indexes of the departments it
+# uses, within CATALOG_SNAPSHOT_MAX_BYTES instead of CATALOG_MAX_BYTES. Per-worker memory is bounded, not flat
+CATALOG_SNAPSHOT_DIR = os.getenv("CATALOG_SNAPSHOT_DIR", "")
+CATALOG_SNAPSHOT_MAX_BYTES = int(os.getenv("CATALOG_SNAPSHOT_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# How long a worker waits at startup for the leader's first snapshot before loading the DB itself
+CATALOG_SNAPSHOT_WAIT_SECONDS = float(os.getenv("CATALOG_SNAPSHOT_WAIT_SECONDS", "60"))
+
+# === Password hashing ===
+# bcrypt runs on its own pool of this many threads, with at most PASSWORD_HASH_QUEUE requests waiting;
+# anything beyond that is answered 503 + Retry-After right away
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
+
+# === Scraper signups ===
+# POST /auth/signup runs the grade scraper as a background job: at most SIGNUP_SCRAPER_WORKERS browsers at once,
+# SIGNUP_QUEUE more jobs waiting, and results kept for SIGNUP_JOB_TTL_SECONDS for GET /auth/signup/{job_id}
+SIGNUP_SCRAPER_WORKERS = int(os.getenv("SIGNUP_SCRAPER_WORKERS", "2"))
+SIGNUP_QUEUE = int(os.getenv("SIGNUP_QUEUE", "20"))
+SIGNUP_JOB_TTL_SECONDS = float(os.getenv("SIGNUP_JOB_TTL_SECONDS", "600"))
+
+# Warm headless Chrome drivers the scraper borrows instead of launching one per signup. A driver is
+# recycled after SCRAPER_DRIVER_MAX_USES sessions or any error; warm-on-startup pre-launches the pool
+SCRAPER_BROWSER_POOL_SIZE = int(os.getenv("SCRAPER_BROWSER_POOL_SIZE", str(SIGNUP_SCRAPER_WORKERS)))
+SCRAPER_DRIVER_MAX_USES = int(os.getenv("SCRAPER_DRIVER_MAX_USES", "20"))
+SCRAPER_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("SCRAPER_ACQUIRE_TIMEOUT_SECONDS", "120"))
+SCRAPER_BROWSER_WARM_ON_STARTUP = os.getenv("SCRAPER_BROWSER_WARM_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+# How signup reads a student's grades: "browser" drives headless Chrome through the pool above,
+# "http" does the same SSO login and Yedion navigation with plain HTTP requests
+GRADE_FETCHER = os.getenv("GRADE_FETCHER", "browser").lower()
+AFEKA_SSO_LOGIN_URL = os.getenv("AFEKA_SSO_LOGIN_URL", "https://sso.afeka.ac.il/my.policy")
+# Yedion entry URL for the HTTP fetcher; empty follows the Afeka-Net link on the SSO portal
+YEDION_URL = os.getenv("YEDION_URL", "")
+GRADE_FETCHER_TIMEOUT_SECONDS = float(os.getenv("GRADE_FETCHER_TIMEOUT_SECONDS", "30"))
+
+# === Session tokens ===
+# HMAC key for the tokens login/signup hand out (GET /auth/me, /schedule). Set it in production: when empty,
+# a random per-process key is used, so tokens stop working on restart and are not shared between workers
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SESSION_TOKEN_TTL_SECONDS = int(os.getenv("SESSION_TOKEN_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# === Schedule generator ===
+# Most time POST /schedule/generate spends searching per request (a request may ask for less)
+SCHEDULE_GENERATOR_BUDGET_MS = int(os.getenv("SCHEDULE_GENERATOR_BUDGET_MS", "250"))
+
+# Searches over more than SCHEDULE_PARALLEL_MIN_LEAVES combinations are split across SCHEDULE_SOLVER_WORKERS
+# processes (0 or 1 disables), at most SCHEDULE_SOLVER_SLOTS searches at once; more run in the request thread.
+# Smaller searches run in the request thread even when a request asks for mode="parallel". In bench_schedule_solver
+# the serial search reaches SCHEDULE_GENERATOR_BUDGET_MS around 7 courses (~2e8 leaves, 90-440 ms) and no longer
+# finishes within it from 8 (over 2.5e9 leaves, 0.5-2.5 s); below that, shipping subtrees to the workers costs more
+# (50 ms to over 1 s per search) than the whole serial search.
+SCHEDULE_SOLVER_WORKERS = int(os.getenv("SCHEDULE_SOLVER_WORKERS", str(min(4, os.cpu_count() or 1))))
+SCHEDULE_SOLVER_SLOTS = int(os.getenv("SCHEDULE_SOLVER_SLOTS", "2"))
+SCHEDULE_PARALLEL_MIN_LEAVES = int(os.getenv("SCHEDULE_PARALLEL_MIN_LEAVES", "250000000"))
+# Most time a parallel search may take (a request may ask for less)
+SCHEDULE_PARALLEL_BUDGET_MS = int(os.getenv("SCHEDULE_PARALLEL_BUDGET_MS", "1000"))
+SCHEDULE_SOLVER_WARM_ON_STARTUP = os.getenv("SCHEDULE_SOLVER_WARM_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+# === Shared schedules ===
+# GET /schedule/{share_code} bodies kept in memory per worker (0 disables). Deletes invalidate the local
+# entry only, so the TTL is how long another worker may still serve a deleted schedule
+SCHEDULE_CACHE_SIZE = int(os.getenv("SCHEDULE_CACHE_SIZE", "1024"))
+SCHEDULE_CACHE_TTL_SECONDS = float(os.getenv("SCHEDULE_CACHE_TTL_SECONDS", "60"))
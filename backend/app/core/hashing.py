@@ -0,0 +1,111 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from passlib.hash import bcrypt
+from backend.app.core.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE
+from backend.app.core.metrics import latency_summary
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised instead of queueing when the hashing queue is full; answered with 503 + Retry-After.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Password hashing queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    bcrypt on its own sized thread pool (bcrypt releases the GIL), so a burst of logins cannot take over
+    the threadpool every other sync endpoint runs on. At most `workers + max_queue` jobs are admitted;
+    callers beyond that get PasswordHasherBusy right away instead of waiting.
+    """
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_QUEUE, samples=1024):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        # Recent (queue wait, hash time) pairs in seconds
+        self._latencies = deque(maxlen=samples)
+
+    def hash(self, password):
+        return self._run(bcrypt.hash, password)
+
+    def verify(self, password, hashed):
+        return self._run(bcrypt.verify, password, hashed)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusy(self.retry_after())
+        with self._lock:
+            self._admitted += 1
+        try:
+            return self._executor.submit(self._timed, func, time.perf_counter(), *args).result()
+        finally:
+            with self._lock:
+                self._admitted -= 1
+            self._slots.release()
+
+    def _timed(self, func, submitted, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._latencies.append((started - submitted, finished - started))
+
+    def retry_after(self):
+        """
+        Whole seconds until the current queue should have drained, at least 1.
+        """
+        with self._lock:
+            average = (sum(hashed for _, hashed in self._latencies) / len(self._latencies)
+                       if self._latencies else 0.3)
+            waiting = self._admitted
+        return max(1, math.ceil(waiting * average / self.workers))
+
+    def metrics(self):
+        with self._lock:
+            waits = sorted(wait for wait, _ in self._latencies)
+            hashes = sorted(hashed for _, hashed in self._latencies)
+            return {
+                "workers": self.workers,
+                "queueLimit": self.max_queue,
+                "running": self._running,
+                "queueDepth": self._admitted - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "hashMs": latency_summary(hashes),
+                "queueWaitMs": latency_summary(waits),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+
+def verify_password(password, hashed):
+    return password_hasher.verify(password, hashed)
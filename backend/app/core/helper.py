@@ -1,11 +1,15 @@
-from passlib.hash import bcrypt
 from .logger import logger
+from .hashing import hash_password
 from ..db.db import SessionLocal
-from ..db.models import Student, StudentCourse
+from ..db.models import Student, StudentCourse, StudentProgress
 from backend.scripts.WebScraperStudent import scrape_student_grades
+from backend.scripts.http_grade_fetcher import fetch_student_grades
+from types import SimpleNamespace
+from sqlalchemy import insert, update, delete
 from sqlalchemy.exc import IntegrityError
-
-from ...data.consts import COURSES_FROM_DIFFERENT_YEARS
+from .cache import get_catalog
+from .progress import progress_values, set_progress
+from .config import GRADE_FETCHER
 
 
 def save_user(user: dict):
@@ -13,7 +17,8 @@ def save_user(user: dict):
     Save a single user's data by running WebScraperStudent script and saving to DB
     Returns success/failure status
     """
-    # Check if user already exists
+    # Check if user already exists, before spending a scraper slot and tens of seconds on the scrape.
+    # The insert in save_user_to_db still guards against a signup racing this check
     if check_user_exists(user['username']):
         logger.error("User already exists")
         return {"success": False, "error": "Username already exists"}
@@ -36,19 +41,29 @@ def check_user_exists(username):
     """
     db = SessionLocal()
     try:
-        user = db.query(Student).filter(Student.username == username).first()
+        user = db.query(Student.id).filter(Student.username == username).first()
         return user is not None
     finally:
         db.close()
 
 
+def get_grade_fetcher(name=GRADE_FETCHER):
+    """
+    The configured grade fetcher; both return the same {"UserName", "Courses"} dict.
+    """
+    fetchers = {"browser": scrape_student_grades, "http": fetch_student_grades}
+    if name not in fetchers:
+        raise ValueError(f"Unknown GRADE_FETCHER {name!r}, expected one of {', '.join(fetchers)}")
+    return fetchers[name]
+
+
 def run_web_scraper(username, password):
     """
     Run the WebScraperStudent script with user credentials and return the scraped data
     """
     try:
         logger.info("Trying to run scraper")
-        scraped_data = scrape_student_grades(username, password)
+        scraped_data = get_grade_fetcher()(username, password)
         scraped_data = clean_courses(scraped_data)
 
         # Return the Python object directly
@@ -58,17 +73,11 @@ def run_web_scraper(username, password):
         return {"success": False, "error": str(e)}
 
 
-def clean_courses(scraped_data):
+def latest_attempts(scraped_data):
     """
-    Clean the course data and calculate GPA and completed credits.
-    Only counts courses with grades of 60 or above for both GPA and completed credits.
+    {course_code: [grade, credits]} of the scraped courses that have credits, keeping the latest attempt.
     """
     cleaned_courses = {}
-    total_grade_points = 0
-    total_credits = 0
-    completed_credits = 0
-
-    # First pass: clean the data and store in a dictionary
     for course_entry in scraped_data.get("Courses", []):
         for course_code, details in course_entry.items():
             grade_str, credits_str = details
@@ -77,6 +86,20 @@ def clean_courses(scraped_data):
             if credits_str and credits_str.strip():
                 # Always overwrite to ensure the latest attempt is kept
                 cleaned_courses[course_code] = details
+    return cleaned_courses
+
+
+def clean_courses(scraped_data):
+    """
+    Clean the course data and calculate GPA and completed credits.
+    Only counts courses with grades of 60 or above for both GPA and completed credits.
+    """
+    total_grade_points = 0
+    total_credits = 0
+    completed_credits = 0
+
+    # First pass: clean the data and store in a dictionary
+    cleaned_courses = latest_attempts(scraped_data)
 
     # Second pass: calculate GPA and credits based on cleaned data
     for course_code, details in cleaned_courses.items():
@@ -121,54 +144,83 @@ def clean_courses(scraped_data):
     return scraped_data
 
 
+def _insert_student(db, values):
+    """
+    INSERT the student unless the username is taken (ON CONFLICT DO NOTHING), returning the new id or None.
+    Two signups for one username that both got past check_user_exists cannot both get past the insert.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        # No insert-or-ignore here: a plain INSERT, with the unique username constraint refusing the duplicate
+        try:
+            return db.execute(insert(Student).values(**values)).inserted_primary_key[0]
+        except IntegrityError:
+            db.rollback()
+            return None
+    statement = (dialect_insert(Student).values(**values)
+                 .on_conflict_do_nothing(index_elements=[Student.username])
+                 .returning(Student.id))
+    return db.execute(statement).scalar_one_or_none()
+
+
 def save_user_to_db(user_data, scraped_data=None):
     """
-    Save user data to the database
+    Save user data to the database: the student, all their courses and their progress summary,
+    in one transaction of three INSERTs
     """
+    # Hashed before opening a session, so a full hashing queue fails fast without touching the DB
+    password_hash = hash_password(user_data["password"])
+
+    # If we have scraped course data, add them
+    course_rows = []
+    if scraped_data and "Courses" in scraped_data:
+        for course_entry in scraped_data["Courses"]:
+            for course_code, details in course_entry.items():
+                course_rows.append({
+                    "course_code": course_code,
+                    "group_code": f"AUTO-{course_code}",  # Generate a default group code
+                    "lecture_type": 1,  # Default lecture type. TODO: fix or cut group_code &  lecture_type
+                    "grade": None if details[0] == "N/A" else float(details[0]),  # Parse grade, handling "N/A" case
+                    "credits": float(details[1]),
+                })
+
+    department = user_data["department"]
+    # Store the progress summary login returns, computed once here instead of on every login
+    progress = progress_values(department, [SimpleNamespace(**row) for row in course_rows])
+
     db = SessionLocal()
     try:
-        # Create new student object
-        new_student = Student(
-            username=user_data["username"],
-            password=bcrypt.hash(user_data["password"]),  # Note: Should be hashed in production
-            name=user_data.get("name", user_data["username"].split(".")[0]),  # name till dot
-            department=user_data["department"],
-            gpa=scraped_data.get("GPA") if scraped_data else None,
-            completedCredits=scraped_data.get("CompletedCredits") if scraped_data else None
-        )
-
-        # Add student to session
-        db.add(new_student)
-        db.flush()  # Flush to get the ID without committing
-
-        # If we have scraped course data, add them
-        if scraped_data and "Courses" in scraped_data:
-            for course_entry in scraped_data["Courses"]:
-                for course_code, details in course_entry.items():
-                    # Parse grade, handling "N/A" case
-                    grade = None if details[0] == "N/A" else float(details[0])
-
-                    # Add student course
-                    new_course = StudentCourse(
-                        student_id=new_student.id,
-                        course_code=course_code,
-                        group_code=f"AUTO-{course_code}",  # Generate a default group code
-                        lecture_type=1,  # Default lecture type. TODO: fix or cut group_code &  lecture_type
-                        grade=grade,
-                        credits=float(details[1])
-
-                    )
-                    db.add(new_course)
+        student_id = _insert_student(db, {
+            "username": user_data["username"],
+            "password": password_hash,
+            "name": user_data.get("name", user_data["username"].split(".")[0]),  # name till dot
+            "department": department,
+            "gpa": scraped_data.get("GPA") if scraped_data else None,
+            "completedCredits": scraped_data.get("CompletedCredits") if scraped_data else None,
+        })
+        if student_id is None:
+            db.rollback()
+            logger.error("User already exists")
+            return {"success": False, "error": "Username already exists"}
+
+        # One executemany for every course instead of a round trip per course. A Core insert on the table,
+        # as the ORM bulk insert splits the rows by which columns are None (enrolled courses have no grade).
+        # It skips the ORM events that mark the progress summary stale, which is written just below anyway
+        if course_rows:
+            db.execute(StudentCourse.__table__.insert(), [{"student_id": student_id, **row} for row in course_rows])
+        db.execute(insert(StudentProgress).values(student_id=student_id, **progress))
 
         # Commit the transaction
         db.commit()
         logger.info("User saved in DB")
-        return {"success": True, "user_id": new_student.id}
+        return {"success": True, "user_id": student_id}
 
     except IntegrityError as e:
         db.rollback()
-        if "unique constraint" in str(e).lower() and "username" in str(e).lower():
-            return {"success": False, "error": "Username already exists"}
         return {"success": False, "error": f"Database integrity error: {str(e)}"}
 
     except Exception as e:
@@ -179,12 +231,123 @@ def save_user_to_db(user_data, scraped_data=None):
         db.close()
 
 
-def match_course(course_code, all_data):  # Search for course_code
-    for course in all_data:
-        if course.get("realCourseCode") == course_code:
-            course_without_groups = course.copy()
-            course_without_groups.pop("groups", None)  # Remove 'groups' if it exists
-            return course_without_groups
-    if course_code in COURSES_FROM_DIFFERENT_YEARS:
-        return COURSES_FROM_DIFFERENT_YEARS[course_code]
-    return None
+def _parse_grade(grade_str):
+    try:
+        return None if grade_str == "N/A" else float(grade_str)
+    except ValueError:
+        return None
+
+
+def _gpa_share(grade, credits):
+    """
+    (grade points, completed credits) a course adds, counted like clean_courses: only grades of 60 or above.
+    """
+    if grade is None or not credits or grade < 60:
+        return 0.0, 0.0
+    return grade * credits, credits
+
+
+def diff_courses(existing, fresh):
+    """
+    Compare a student's stored scraped courses ({course_code: StudentCourse}) with a new scrape
+    (latest_attempts() output). Returns ({code: (grade, credits)} to insert, the same to update, codes to delete).
+    """
+    inserts, updates = {}, {}
+    for course_code, (grade_str, credits_str) in fresh.items():
+        try:
+            credits = float(credits_str)
+        except ValueError:
+            continue
+        grade = _parse_grade(grade_str)
+        row = existing.get(course_code)
+        if row is None:
+            inserts[course_code] = (grade, credits)
+        elif (row.grade, row.credits) != (grade, credits):
+            updates[course_code] = (grade, credits)
+    deletes = [course_code for course_code in existing if course_code not in fresh]
+    return inserts, updates, deletes
+
+
+def resync_user_grades(username, password):
+    """
+    Scrape a student's grades again and apply only what changed: one bulk INSERT, one bulk UPDATE and one
+    DELETE, with GPA and completed credits adjusted by the changed courses alone.
+    Returns success/failure status and the number of inserted, updated and deleted courses
+    """
+    try:
+        logger.info("Trying to run scraper")
+        fresh = latest_attempts(get_grade_fetcher()(username, password))
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+    db = SessionLocal()
+    try:
+        student = db.query(Student).filter(Student.username == username).one_or_none()
+        if student is None:
+            return {"success": False, "error": "User not found"}
+        courses = list(student.courses)
+        # Only the rows the scraper created (AUTO- group codes) are synced; anything else is left alone
+        existing = {row.course_code: row for row in courses if row.group_code == f"AUTO-{row.course_code}"}
+        inserts, updates, deletes = diff_courses(existing, fresh)
+
+        if inserts:
+            db.execute(insert(StudentCourse), [
+                {"student_id": student.id, "course_code": code, "group_code": f"AUTO-{code}", "lecture_type": 1,
+                 "grade": grade, "credits": credits}
+                for code, (grade, credits) in inserts.items()])
+        if updates:
+            db.execute(update(StudentCourse), [
+                {"student_id": student.id, "group_code": f"AUTO-{code}", "grade": grade, "credits": credits}
+                for code, (grade, credits) in updates.items()])
+        if deletes:
+            db.execute(delete(StudentCourse)
+                       .where(StudentCourse.student_id == student.id,
+                              StudentCourse.group_code.in_([f"AUTO-{code}" for code in deletes]))
+                       .execution_options(synchronize_session=False))
+
+        # GPA and completed credits move by the changed courses only. Grade points are rebuilt from the stored
+        # (2-decimal) GPA, or from the stored rows for a student that never had them computed
+        if student.completedCredits is None:
+            shares = [_gpa_share(row.grade, row.credits) for row in existing.values()]
+            points, completed = sum(p for p, _ in shares), sum(c for _, c in shares)
+        else:
+            completed = student.completedCredits
+            points = (student.gpa or 0) * completed
+        for code in deletes + list(updates):
+            old_points, old_credits = _gpa_share(existing[code].grade, existing[code].credits)
+            points, completed = points - old_points, completed - old_credits
+        for grade, credits in list(inserts.values()) + list(updates.values()):
+            new_points, new_credits = _gpa_share(grade, credits)
+            points, completed = points + new_points, completed + new_credits
+        student.completedCredits = completed
+        student.gpa = round(points / completed, 2) if completed > 0 else 0
+
+        # The bulk statements bypass the ORM events that mark the progress summary stale, so refresh it here
+        synced = {code: SimpleNamespace(course_code=code, grade=row.grade) for code, row in existing.items()
+                  if code not in deletes}
+        synced.update((code, SimpleNamespace(course_code=code, grade=grade))
+                      for code, (grade, _) in {**inserts, **updates}.items())
+        others = [row for row in courses if row.group_code != f"AUTO-{row.course_code}"]
+        set_progress(student, others + list(synced.values()))
+
+        db.commit()
+        changes = {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes)}
+        logger.info(f"Re-synced grades of {username}: {changes}")
+        return {"success": True, "changes": changes}
+
+    except Exception as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+
+    finally:
+        db.close()
+
+
+def match_course(course_code, department, catalog=None):  # Indexed lookup of course_code
+    """
+    Find the catalog course for a student's course_code (realCourseCode) in O(1).
+    The returned dict is shared with the cache and must not be mutated.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    return catalog.match_course(course_code, department)
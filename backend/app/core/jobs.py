@@ -0,0 +1,125 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+from fastapi import HTTPException
+from .logger import logger
+from .config import SIGNUP_SCRAPER_WORKERS, SIGNUP_QUEUE, SIGNUP_JOB_TTL_SECONDS
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFull(Exception):
+    """
+    Raised instead of queueing when every worker is busy and the queue is full; answered with 503 + Retry-After.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    __slots__ = ("id", "key", "status", "result", "error", "created", "finished", "done")
+
+    def __init__(self, key):
+        self.id = uuid4().hex
+        self.key = key
+        self.status = QUEUED
+        self.result = None
+        self.error = None  # (status_code, detail) of a failed job
+        self.created = time.monotonic()
+        self.finished = None
+        self.done = threading.Event()
+
+
+class JobQueue:
+    """
+    Long-running jobs on a fixed number of worker threads. At most `workers + max_queue` jobs are pending;
+    submitting beyond that raises JobQueueFull right away. Finished jobs are kept for `ttl` seconds
+    so their result can be polled, then dropped.
+    """
+
+    def __init__(self, workers, max_queue, ttl, name="jobs"):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._pending_keys = {}
+        self._durations = []
+
+    def submit(self, key, func, *args):
+        """
+        Queue func(*args) and return its Job. `key` identifies what the job works on; a second job
+        for a key that still has one pending is refused with 409.
+        """
+        with self._lock:
+            self._expire()
+            if key in self._pending_keys:
+                raise HTTPException(status_code=409, detail="A request for this user is already in progress")
+            pending = len(self._pending_keys)
+            if pending >= self.workers + self.max_queue:
+                raise JobQueueFull(self._retry_after(pending))
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._pending_keys[key] = job.id
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    def _run(self, job, func, args):
+        started = time.monotonic()
+        job.status = RUNNING
+        try:
+            job.result = func(*args)
+            job.status = DONE
+        except HTTPException as e:
+            job.error = (e.status_code, e.detail)
+            job.status = FAILED
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.error = (500, "Unexpected error")
+            job.status = FAILED
+        finally:
+            job.finished = time.monotonic()
+            with self._lock:
+                self._pending_keys.pop(job.key, None)
+                self._durations = (self._durations + [job.finished - started])[-64:]
+            job.done.set()
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout=None):
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
+    def position(self, job):
+        """
+        Jobs queued ahead of `job`, 0 once it runs.
+        """
+        with self._lock:
+            return sum(1 for other in self._jobs.values() if other.status == QUEUED and other.created < job.created)
+
+    def _retry_after(self, pending):
+        average = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        return max(1, math.ceil(pending * average / self.workers))
+
+    def _expire(self):
+        now = time.monotonic()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished is not None and now - job.finished > self.ttl]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Scraper signups and grade re-syncs: one headless browser per job, so `workers` caps concurrent browsers
+scraper_jobs = JobQueue(SIGNUP_SCRAPER_WORKERS, SIGNUP_QUEUE, SIGNUP_JOB_TTL_SECONDS, name="scraper")
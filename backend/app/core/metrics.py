@@ -0,0 +1,16 @@
+def latency_summary(values):
+    """
+    avg/p50/p95/max in milliseconds of `values`, a sorted list of durations in seconds.
+    """
+    if not values:
+        return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+    def ms(value):
+        return round(value * 1000, 2)
+
+    return {
+        "avg": ms(sum(values) / len(values)),
+        "p50": ms(values[len(values) // 2]),
+        "p95": ms(values[min(len(values) - 1, int(len(values) * 0.95))]),
+        "max": ms(values[-1]),
+    }
@@ -0,0 +1,110 @@
+from sqlalchemy.exc import SQLAlchemyError
+from .logger import logger
+from .cache import get_catalog
+from ..db.models import StudentProgress
+
+
+def summarize_courses(department, student_courses, catalog=None):
+    """
+    The degree-progress part of the login payload: completed and enrolled courses matched against the
+    catalog, and the credit totals per requirement category.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+
+    completed_courses = []
+    enrolled_courses = []
+    credits_mandatory = 0
+    credits_elective = 0
+    credits_general = 0
+    enrolled_credits_total = 0
+
+    for sc in student_courses:
+        matched = catalog.match_course(sc.course_code, department)
+        if matched:
+            course_credit = float(matched["courseCredit"]) if matched.get("courseCredit") and float(matched["courseCredit"]) > 0 else 0
+
+            if sc.grade is not None:
+                # Completed course
+                completed_courses.append({
+                    "courseId":  matched.get("realCourseCode", "") or sc.course_code,
+                    "grade": sc.grade
+                })
+
+                # Add to appropriate category totals
+                if 'בחירה' in matched["courseType"]:
+                    credits_elective += course_credit
+                if 'חובה' in matched["courseType"]:
+                    credits_mandatory += course_credit
+                if 'רוח' in matched["courseType"]:
+                    credits_general += course_credit
+            else:
+                # Enrolled course
+                course_id = matched.get("courseCode", "") or matched.get("realCourseCode", "") or sc.course_code
+
+                enrolled_courses.append({
+                    "courseName": matched.get("courseName", "Unknown Course"),
+                    "courseCredit": course_credit,
+                    "courseType": matched.get("courseType", "Unknown"),
+                    "courseCode": course_id,
+                    "semester": matched.get("semester", "")
+                })
+
+                # Add to enrolled credits total
+                enrolled_credits_total += course_credit
+
+    return {
+        "completedCourses": completed_courses,
+        "enrolledCourses": enrolled_courses,
+        "enrolledCredits": enrolled_credits_total,
+        "remainingRequirements": {
+            "general": credits_general,
+            "elective": credits_elective,
+            "mandatory": credits_mandatory
+        }
+    }
+
+
+def progress_values(department, student_courses, catalog=None):
+    """
+    Column values (catalog_stamp, summary) of a StudentProgress row for these courses.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    return {"catalog_stamp": catalog.department_stamp(department),
+            "summary": summarize_courses(department, student_courses, catalog)}
+
+
+def set_progress(student, student_courses, catalog=None):
+    """
+    Compute and attach the stored summary of `student`; the caller commits it with the courses it saved.
+    """
+    values = progress_values(student.department, student_courses, catalog)
+    stamp, summary = values["catalog_stamp"], values["summary"]
+    if student.progress is None:
+        student.progress = StudentProgress(catalog_stamp=stamp, summary=summary)
+    else:
+        student.progress.catalog_stamp = stamp
+        student.progress.summary = summary
+    return summary
+
+
+def get_progress(db, student, catalog=None):
+    """
+    The stored summary of `student`, recomputed (and stored again) only when their courses changed
+    since it was computed or the catalog departments it was matched against were reloaded.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    progress = student.progress
+    if progress is not None and progress.catalog_stamp == catalog.department_stamp(student.department):
+        return progress.summary
+
+    summary = set_progress(student, student.courses, catalog)
+    try:
+        db.commit()
+    except SQLAlchemyError as e:
+        # e.g. a concurrent login stored it first; the summary is still correct for this response
+        db.rollback()
+        logger.warning(f"Could not store progress summary for student {student.id}: {e}")
+    return summary
@@ -0,0 +1,148 @@
+import sys
+
+# JSON keys of a course/group, in the order the catalog files have them, mapped to the record attribute
+COURSE_FIELDS = {
+    "courseType": "course_type",
+    "courseName": "course_name",
+    "realCourseCode": "real_code",
+    "courseCode": "course_code",
+    "semester": "semester",
+    "department": "department",
+    "courseCredit": "credit",
+    "prerequisites": "prerequisites",
+    "prerequisitesAlt": "prerequisites_alt",
+    "groups": "groups",
+}
+
+GROUP_FIELDS = {
+    "groupCode": "group_code",
+    "lectureType": "lecture_type",
+    "startTime": "start",
+    "endTime": "end",
+    "room": "room",
+    "lecturer": "lecturer",
+    "dayOfWeek": "day",
+}
+
+_MISSING = object()
+
+
+def intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def parse_time(value):
+    """
+    "08:30" -> 510 minutes since midnight. Anything else is kept as is (interned).
+    """
+    if isinstance(value, str):
+        hours, sep, minutes = value.strip().partition(":")
+        if sep and hours.isdigit() and minutes.isdigit():
+            return int(hours) * 60 + int(minutes)
+    return intern(value)
+
+
+def format_time(value):
+    if isinstance(value, int):
+        return f"{value // 60:02d}:{value % 60:02d}"
+    return value
+
+
+class _Record:
+    """
+    Read-only view of a record under its JSON keys, so code written against the raw
+    catalog dicts (record["courseType"], record.get("courseCredit")) keeps working.
+    """
+
+    __slots__ = ("extra",)
+    FIELDS = {}
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key, default=None):
+        attr = self.FIELDS.get(key)
+        if attr is not None:
+            value = getattr(self, attr)
+            return default if value is _MISSING else self._json_value(key, value)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def _json_value(self, key, value):
+        return value
+
+    def to_dict(self):
+        """
+        The JSON view of the record, with the keys the catalog files use.
+        """
+        data = {}
+        for key, attr in self.FIELDS.items():
+            value = getattr(self, attr)
+            if value is not _MISSING:
+                data[key] = self._json_value(key, value)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def _split(cls, data, convert):
+        values = {attr: convert(key, data[key]) if key in data else _MISSING for key, attr in cls.FIELDS.items()}
+        extra = {key: value for key, value in data.items() if key not in cls.FIELDS} or None
+        return values, extra
+
+
+class Group(_Record):
+    __slots__ = tuple(GROUP_FIELDS.values())
+    FIELDS = GROUP_FIELDS
+
+    @classmethod
+    def from_dict(cls, data):
+        group = cls()
+        values, group.extra = cls._split(data, lambda key, value: parse_time(value) if key in ("startTime", "endTime")
+                                         else intern(value))
+        for attr, value in values.items():
+            setattr(group, attr, value)
+        return group
+
+    def _json_value(self, key, value):
+        if key in ("startTime", "endTime"):
+            return format_time(value)
+        return value
+
+
+class Course(_Record):
+    __slots__ = tuple(COURSE_FIELDS.values())
+    FIELDS = COURSE_FIELDS
+
+    @classmethod
+    def from_dict(cls, data):
+        course = cls()
+        values, course.extra = cls._split(data, cls._convert)
+        for attr, value in values.items():
+            setattr(course, attr, value)
+        return course
+
+    @staticmethod
+    def _convert(key, value):
+        if key == "groups":
+            return tuple(Group.from_dict(group) for group in value)
+        if key in ("prerequisites", "prerequisitesAlt") and isinstance(value, list):
+            return tuple(intern(item) for item in value)
+        return intern(value)
+
+    def _json_value(self, key, value):
+        if key == "groups":
+            return [group.to_dict() for group in value]
+        if isinstance(value, tuple):
+            return list(value)
+        return value
+
+    def iter_groups(self):
+        return self.groups if self.groups is not _MISSING else ()
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from fastapi.encoders import jsonable_encoder
+from backend.app.core.catalog import encode_courses
+from backend.app.core.config import SCHEDULE_CACHE_SIZE, SCHEDULE_CACHE_TTL_SECONDS
+from backend.app.core.schemas import SavedScheduleOut
+
+
+def encode_schedule(db_schedule):
+    """
+    A saved schedule as the JSON body GET /schedule/{share_code} would return through its response model.
+    """
+    return encode_courses(jsonable_encoder(SavedScheduleOut.model_validate(db_schedule)))
+
+
+class ScheduleCache:
+    """
+    Serialized saved schedules by share code, least recently used first. Entries live for `ttl` seconds,
+    which also bounds how long another worker process may keep serving a schedule deleted elsewhere.
+    Invalidating leaves a tombstone for `ttl` seconds, so a body read from the DB before a concurrent delete
+    is not cached after it.
+    """
+
+    def __init__(self, max_entries=SCHEDULE_CACHE_SIZE, ttl=SCHEDULE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # share_code -> (expires, body)
+        self._tombstones = OrderedDict()  # share_code -> when it was last invalidated, oldest first
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, share_code):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(share_code)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[share_code]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(share_code)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, share_code, body, read_at):
+        """
+        Cache `body`, read from the DB at `read_at` (time.monotonic()), unless it was invalidated since.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            invalidated = self._tombstones.get(share_code)
+            if invalidated is not None and invalidated >= read_at:
+                return
+            self._entries[share_code] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(share_code)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, share_code):
+        """
+        Drop a schedule that was changed or deleted; call it after the change is committed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._entries.pop(share_code, None) is not None:
+                self._invalidations += 1
+            self._tombstones.pop(share_code, None)
+            self._tombstones[share_code] = now
+            # Reads older than the TTL are long over, so their tombstones can go
+            while self._tombstones and next(iter(self._tombstones.values())) < now - self.ttl:
+                self._tombstones.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tombstones.clear()
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hitRate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "tombstones": len(self._tombstones),
+            }
+
+
+schedule_cache = ScheduleCache()
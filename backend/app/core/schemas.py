@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+from typing import List, Literal, Optional
 from datetime import datetime
 from pydantic import conlist
 
@@ -11,11 +11,43 @@ class GroupSelection(BaseModel):
 
 
 class SavedScheduleCreate(BaseModel):
-    student_id: int
+    student_id: Optional[int] = None  # taken from the session token when one is sent
     schedule_data: conlist(GroupSelection, min_length=1)
     schedule_name: str
 
 
+class ScheduleValidationRequest(BaseModel):
+    department: str
+    schedule_data: conlist(GroupSelection, min_length=1)
+
+
+class ScheduleFitsRequest(BaseModel):
+    department: str
+    schedule_data: List[GroupSelection] = []
+    course_type: Optional[str] = None
+    semester: Optional[str] = None
+    generalcourses: bool = True
+
+
+class ScheduleGenerateRequest(BaseModel):
+    department: str
+    semester: str
+    course_codes: conlist(str, min_length=1, max_length=15)
+    # Ranking criteria, most important first; lower is better for each
+    rank_by: conlist(Literal["days", "gaps", "finish"], min_length=1, max_length=3) = ["days", "gaps", "finish"]
+    limit: int = Field(10, ge=1, le=50)
+    time_budget_ms: Optional[int] = Field(None, ge=1)
+    # "auto" and "parallel" split searches over SCHEDULE_PARALLEL_MIN_LEAVES across the solver processes
+    mode: Literal["auto", "serial", "parallel"] = "auto"
+
+    @field_validator("rank_by")
+    @classmethod
+    def distinct_criteria(cls, rank_by):
+        if len(set(rank_by)) != len(rank_by):
+            raise ValueError("rank_by criteria must not repeat")
+        return rank_by
+
+
 # Output schema returned to the client
 class SavedScheduleOut(BaseModel):
     id: int
@@ -0,0 +1,172 @@
+import re
+
+# Final letters fold to their regular form, geresh/gershayim and quote marks disappear (ד"ר == דר, ג'אווה == גאווה),
+# niqqud and cantillation marks are dropped and maqaf separates words
+_FINAL_LETTERS = {"ך": "כ", "ם": "מ", "ן": "נ", "ף": "פ", "ץ": "צ"}
+_DROPPED = "׳״'\"`‘’“”"
+_TRANSLATION = str.maketrans({
+    **_FINAL_LETTERS,
+    **{char: None for char in _DROPPED},
+    **{chr(code): None for code in range(0x0591, 0x05C8) if code != 0x05BE},
+    "־": " ",
+})
+_SEPARATORS = re.compile(r"[\s\-_.,;:/\\()\[\]{}+&|]+")
+
+# Score of each way a query token can match a course; a token scores its best match,
+# a course the sum over the query tokens (+ NAME_EXACT_BONUS when the whole query is its name)
+CODE_EXACT, CODE_PREFIX = 100, 60
+NAME_WORD, NAME_PREFIX, NAME_SUBSTRING = 40, 30, 15
+LECTURER_WORD, LECTURER_PREFIX, LECTURER_SUBSTRING = 20, 15, 10
+NAME_EXACT_BONUS = 50
+
+# Ways a token can match, best first: an index looked up by the token, or (names/lecturers) a substring check
+_TIERS = ((CODE_EXACT, "code_exact"), (CODE_PREFIX, "code_prefix"), (NAME_WORD, "name_word"),
+          (NAME_PREFIX, "name_prefix"), (LECTURER_WORD, "lecturer_word"), (NAME_SUBSTRING, "names"),
+          (LECTURER_PREFIX, "lecturer_prefix"), (LECTURER_SUBSTRING, "lecturers"))
+
+# Tokens shorter than this match word prefixes only; longer ones also match substrings through trigrams
+TRIGRAM = 3
+
+
+def normalize(text):
+    """
+    Lowercase, Hebrew-folded, single-spaced form of `text` used on both sides of a search.
+    """
+    if not text:
+        return ""
+    return " ".join(_SEPARATORS.split(str(text).translate(_TRANSLATION).casefold())).strip()
+
+
+def trigrams(text):
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+def _add(index, key, bit):
+    index[key] = index.get(key, 0) | bit
+
+
+def _positions(mask):
+    """
+    Set bits of `mask`, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SearchIndex:
+    """
+    Word, prefix and trigram indexes over the name, realCourseCode and lecturers of a department's courses.
+    Postings are bitmasks of course positions, so candidate sets intersect and combine at C speed
+    and only the page that is returned is ever turned back into positions.
+    """
+
+    __slots__ = ("codes", "names", "lecturers", "code_exact", "code_prefix", "name_exact",
+                 "name_word", "name_prefix", "lecturer_word", "lecturer_prefix", "grams")
+
+    def __init__(self, courses):
+        self.codes, self.names, self.lecturers = [], [], []
+        indexes = {attr: {} for attr in ("code_exact", "code_prefix", "name_exact", "name_word", "name_prefix",
+                                         "lecturer_word", "lecturer_prefix", "grams")}
+
+        for position, course in enumerate(courses):
+            bit = 1 << position
+            code = normalize(course.get("realCourseCode"))
+            name = normalize(course.get("courseName"))
+            lecturers = " | ".join(sorted({normalize(group.get("lecturer")) for group in course.iter_groups()} - {""}))
+            self.codes.append(code)
+            self.names.append(name)
+            self.lecturers.append(lecturers)
+
+            _add(indexes["code_exact"], code, bit)
+            _add(indexes["name_exact"], name, bit)
+            for field, words in (("code", code.split()), ("name", name.split()),
+                                 ("lecturer", lecturers.replace("|", " ").split())):
+                for word in set(words):
+                    if field != "code":
+                        _add(indexes[f"{field}_word"], word, bit)
+                    for length in range(1, len(word) + 1):
+                        _add(indexes[f"{field}_prefix"], word[:length], bit)
+            for gram in trigrams(f"{name} {lecturers}"):
+                _add(indexes["grams"], gram, bit)
+
+        for attr, index in indexes.items():
+            setattr(self, attr, index)
+
+    def _substring_matches(self, token, fields, exclude):
+        """
+        Mask of the courses whose field contains `token`, among those not in `exclude`.
+        """
+        grams = trigrams(token)
+        mask = ~exclude
+        for gram in grams:
+            mask &= self.grams.get(gram, 0)
+            if not mask:
+                return 0
+        # Trigrams can match out of order; confirm the token really is a substring of the field
+        matched = 0
+        for position in _positions(mask):
+            if token in fields[position]:
+                matched |= 1 << position
+        return matched
+
+    def _token_tiers(self, token):
+        """
+        {score: mask} of the courses `token` matches, each course under the best way it matches.
+        """
+        tiers, covered = {}, 0
+        for score, attr in _TIERS:
+            if attr in ("names", "lecturers"):
+                if len(token) < TRIGRAM:
+                    continue
+                mask = self._substring_matches(token, getattr(self, attr), covered)
+            else:
+                mask = getattr(self, attr).get(token, 0) & ~covered
+            if mask:
+                tiers[score] = tiers.get(score, 0) | mask
+                covered |= mask
+        return tiers
+
+    def search(self, query, limit):
+        """
+        Up to `limit` [(score, position), ...] of the best courses matching every token of the normalized
+        `query`, best first (ties in catalog order).
+        """
+        tokens = query.split()
+        if not tokens:
+            return []
+
+        # {total score: mask of the courses with that score}, one query token at a time
+        totals = None
+        for token in tokens:
+            tiers = self._token_tiers(token)
+            if totals is None:
+                totals = tiers
+            else:
+                combined = {}
+                for score, mask in totals.items():
+                    for token_score, token_mask in tiers.items():
+                        both = mask & token_mask
+                        if both:
+                            combined[score + token_score] = combined.get(score + token_score, 0) | both
+                totals = combined
+            if not totals:
+                return []
+
+        exact = self.name_exact.get(query, 0)
+        if exact:
+            boosted = {}
+            for score, mask in totals.items():
+                for bonus, part in ((NAME_EXACT_BONUS, mask & exact), (0, mask & ~exact)):
+                    if part:
+                        boosted[score + bonus] = boosted.get(score + bonus, 0) | part
+            totals = boosted
+
+        results = []
+        for score in sorted(totals, reverse=True):
+            for position in _positions(totals[score]):
+                results.append((score, position))
+                if len(results) == limit:
+                    return results
+        return results
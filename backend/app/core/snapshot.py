@@ -0,0 +1,259 @@
+import json
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime
+from backend.app.core.catalog import (GENERAL_DEPARTMENTS, CourseCatalog, DepartmentCatalog, LazyCourseCatalog,
+                                      encode_department)
+from backend.app.core.compression import compress_payload
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; snapshot mode needs flock for leader election
+    fcntl = None
+
+# File layout: MAGIC, header length (little-endian u64), JSON header, then the data sections it points at.
+# Every section is 8-byte aligned so offset arrays can be mapped as "Q" directly
+MAGIC = b"HSCATv1\n"
+_LENGTH = struct.Struct("<Q")
+_ALIGN = 8
+
+POINTER_FILE = "CURRENT"
+LOCK_FILE = "leader.lock"
+
+# The encoded JSON of one department, as stored in (or about to be written to) a snapshot
+DepartmentSection = namedtuple("DepartmentSection", ("name", "updated_at", "encoded_items", "offsets"))
+
+
+def department_section(dept):
+    return DepartmentSection(dept.name, dept.updated_at, dept.encoded_items, dept.offsets)
+
+
+def encode_section(name, courses, updated_at=None):
+    """
+    Section for a department read from the DB, without building its records and indexes.
+    """
+    return DepartmentSection(name, updated_at, *encode_department(courses))
+
+
+def _payload_sources(sections, department, generalcourses):
+    names = [department] + (list(GENERAL_DEPARTMENTS) if generalcourses else [])
+    return tuple(sections[name] for name in names if name in sections)
+
+
+class CatalogSnapshot:
+    """
+    A read-only, memory-mapped catalog snapshot. Every worker mapping the same file shares its pages,
+    and payloads and department sections are memoryviews into the mapping (zero copies).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        header_end = len(MAGIC) + _LENGTH.size
+        (header_length,) = _LENGTH.unpack(view[len(MAGIC):header_end])
+        header = json.loads(bytes(view[header_end:header_end + header_length]))
+        data = view[header_end + header_length:]
+
+        def section(span):
+            return data[span[0]:span[0] + span[1]]
+
+        self.version = header["version"]
+        self.sections = {}
+        for name, dept in header["departments"].items():
+            updated_at = datetime.fromisoformat(dept["updated_at"]) if dept["updated_at"] else None
+            self.sections[name] = DepartmentSection(name, updated_at, section(dept["items"]),
+                                                    section(dept["offsets"]).cast("Q"))
+        self.payloads = {}
+        self.compressed = {}
+        for entry in header["payloads"]:
+            key = (entry["department"], entry["generalcourses"])
+            variants = {encoding: section(span) for encoding, span in entry["variants"].items()}
+            self.payloads[key] = variants.pop("identity")
+            self.compressed[key] = variants
+
+    def stamps(self):
+        return {name: section.updated_at for name, section in self.sections.items()}
+
+    def department(self, name):
+        """
+        Records and indexes for one department, built from the mapped JSON (no DB query).
+        """
+        section = self.sections.get(name)
+        if section is None:
+            return None
+        return DepartmentCatalog.from_encoded(name, section.encoded_items, section.offsets, section.updated_at)
+
+
+def write_snapshot(path, version, sections, previous=None):
+    """
+    Serialize `sections` ({name: DepartmentSection}) and every /courses body built from them to `path`.
+    Bodies whose departments are the same sections as in `previous` are copied from it instead of
+    being rebuilt and recompressed.
+    """
+    chunks, size = [], 0
+
+    def add(data):
+        nonlocal size
+        padding = -size % _ALIGN
+        if padding:
+            chunks.append(b"\0" * padding)
+            size += padding
+        span = [size, len(data)]
+        chunks.append(data)
+        size += len(data)
+        return span
+
+    header = {"version": version, "departments": {}, "payloads": []}
+    for name, section in sections.items():
+        header["departments"][name] = {
+            "updated_at": section.updated_at.isoformat() if section.updated_at else None,
+            "items": add(section.encoded_items),
+            "offsets": add(memoryview(section.offsets).cast("B")),
+        }
+
+    for department in sections:
+        for generalcourses in (True, False):
+            key = (department, generalcourses)
+            sources = _payload_sources(sections, department, generalcourses)
+            reusable = previous is not None and key in previous.payloads and all(
+                previous.sections.get(source.name) is source for source in sources)
+            if reusable:
+                variants = {"identity": previous.payloads[key], **previous.compressed[key]}
+            else:
+                payload = CourseCatalog._build_payload(sources)
+                variants = {"identity": payload, **compress_payload(payload)}
+            header["payloads"].append({
+                "department": department,
+                "generalcourses": generalcourses,
+                "variants": {encoding: add(body) for encoding, body in variants.items()},
+            })
+
+    encoded_header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(encoded_header)))
+        f.write(encoded_header)
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SnapshotStore:
+    """
+    A directory of snapshot generations (catalog-<version>.snap) plus a CURRENT pointer to the latest one.
+    Put it on tmpfs (e.g. /dev/shm) to keep it in shared memory. One process, the leader, reads the DB and
+    publishes; the others only map what it published.
+    """
+
+    def __init__(self, directory, keep=2):
+        self.directory = directory
+        self.keep = keep
+        self._lock_file = None
+        os.makedirs(directory, exist_ok=True)
+
+    def lead(self):
+        """
+        Try to become (or stay) the publishing process. The lock is released when the process exits,
+        so another worker takes over on its next attempt.
+        """
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            raise RuntimeError("Catalog snapshots need fcntl.flock, which this platform does not have")
+        lock_file = open(os.path.join(self.directory, LOCK_FILE), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def close(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def current_name(self):
+        try:
+            with open(os.path.join(self.directory, POINTER_FILE), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def open_current(self):
+        name = self.current_name()
+        if name is None:
+            return None
+        try:
+            return CatalogSnapshot(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            return None  # replaced between reading the pointer and opening it; caller retries
+
+    def wait_for_current(self, timeout, poll=0.1):
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self.open_current()
+            if snapshot is not None or time.monotonic() >= deadline:
+                return snapshot
+            time.sleep(poll)
+
+    def publish(self, version, sections, previous=None):
+        """
+        Write a new generation and point CURRENT at it. Older generations beyond `keep` are unlinked;
+        workers still mapping them keep their pages until they remap.
+        """
+        name = f"catalog-{version}.snap"
+        write_snapshot(os.path.join(self.directory, name), version, sections, previous)
+
+        pointer = os.path.join(self.directory, POINTER_FILE)
+        with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(f"{pointer}.tmp", pointer)
+
+        generations = sorted((entry for entry in os.listdir(self.directory)
+                              if entry.startswith("catalog-") and entry.endswith(".snap")),
+                             key=lambda entry: int(entry[len("catalog-"):-len(".snap")]))
+        for old in generations[:-self.keep]:
+            os.unlink(os.path.join(self.directory, old))
+        return name
+
+
+class SharedCourseCatalog(LazyCourseCatalog):
+    """
+    Catalog served from a mapped snapshot. Only the /courses bodies, their compressed variants and the encoded
+    department JSON are shared between workers. The records and indexes that lookups, search and schedules use
+    are built from the mapped JSON in each worker on first access, and kept in the lazy LRU, so their per-worker
+    memory is bounded by `max_bytes` (CATALOG_SNAPSHOT_MAX_BYTES, plus the pinned departments) rather than flat.
+    """
+
+    def __init__(self, snapshot, max_bytes, pinned=(), loaded=None):
+        super().__init__(snapshot.stamps(), snapshot.department, max_bytes, pinned, snapshot.version, loaded)
+        self.snapshot = snapshot
+
+    def payload(self, department, generalcourses=True):
+        return self.snapshot.payloads.get((department, generalcourses))
+
+    def payload_variants(self, department, generalcourses=True):
+        return self.snapshot.compressed.get((department, generalcourses), {})
+
+    def remapped(self, snapshot):
+        """
+        A catalog for a newer snapshot that keeps the already built departments that did not change.
+        """
+        stamps = snapshot.stamps()
+        with self._lock:
+            unchanged = {name: dept for name, dept in self.departments.items()
+                         if name in stamps and dept.updated_at == stamps[name]}
+        return SharedCourseCatalog(snapshot, self.max_bytes, self.pinned, unchanged)
@@ -0,0 +1,342 @@
+import heapq
+import multiprocessing
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from math import prod
+from backend.app.core.logger import logger
+from backend.app.core.config import SCHEDULE_SOLVER_WORKERS, SCHEDULE_SOLVER_SLOTS
+from backend.app.core.timetable import RANK_CRITERIA, ScheduleSearch
+
+# Subtrees queued per worker, so a worker that finishes early picks up more
+TASKS_PER_WORKER = 4
+
+# How long after the deadline the results of still running subtrees are waited for
+DEADLINE_GRACE_SECONDS = 0.05
+
+# Rank keys travel between processes as one integer, KEY_BITS per criterion, most important first.
+# The shared slots are signed 64-bit, so a key holds at most MAX_CRITERIA criteria and stays below NO_CUTOFF
+KEY_BITS = 16
+NO_CUTOFF = (1 << 62) - 1
+MAX_CRITERIA = 3
+
+# Worker side: the shared [cutoff, cancelled] pair of every slot
+_shared = None
+
+
+def encode_key(key):
+    """
+    A rank key as an int ordered like the key itself (each criterion clamped to KEY_BITS).
+    """
+    encoded = 0
+    for value in key:
+        encoded = (encoded << KEY_BITS) | min(int(value), (1 << KEY_BITS) - 1)
+    return encoded
+
+
+def decode_key(encoded, length):
+    mask = (1 << KEY_BITS) - 1
+    return tuple((encoded >> (KEY_BITS * (length - 1 - i))) & mask for i in range(length))
+
+
+def split_prefixes(levels, target):
+    """
+    Option indices of the first levels of the search tree, expanded level by level until there are at least
+    `target` subtrees (or only the last level is left); prefixes whose slots already collide are dropped.
+    """
+    prefixes = [((), 0)]
+    depth = 0
+    while len(prefixes) < target and depth < len(levels) - 1:
+        prefixes = [(indices + (i,), used | option.mask)
+                    for indices, used in prefixes
+                    for i, option in enumerate(levels[depth]) if not option.mask & used]
+        depth += 1
+    return [indices for indices, _ in prefixes]
+
+
+class SharedCutoffSearch(ScheduleSearch):
+    """
+    A ScheduleSearch over one subtree that prunes with the best cutoff any worker of its request published,
+    publishes its own, and stops when the request is cancelled.
+    Any worker's worst kept schedule is a real schedule, so the request's best `limit` can only rank at or
+    below it, and cutting branches that cannot beat it is safe.
+    """
+
+    def __init__(self, options_per_course, rank_by, limit, budget_seconds, slot):
+        super().__init__(options_per_course, rank_by, limit, budget_seconds)
+        self._slot = slot
+        self._shared_cutoff = None
+
+    def _cutoff(self):
+        local = super()._cutoff()
+        if self._shared_cutoff is None:
+            return local
+        return self._shared_cutoff if local is None else min(local, self._shared_cutoff)
+
+    def _out_of_time(self):
+        # Every CHECK_EVERY nodes: pick up what the other workers found, and whether the request is still wanted
+        shared = _shared[2 * self._slot]
+        if shared != NO_CUTOFF:
+            self._shared_cutoff = decode_key(shared, len(self.rank_by))
+        return bool(_shared[2 * self._slot + 1]) or super()._out_of_time()
+
+    def _keep(self, chosen):
+        schedule = super()._keep(chosen)
+        local = super()._cutoff()
+        if schedule is not None and local is not None:
+            # Unlocked read-then-write: losing a race leaves a higher (still valid) cutoff
+            encoded = encode_key(local)
+            if encoded < _shared[2 * self._slot]:
+                _shared[2 * self._slot] = encoded
+        return schedule
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def _solve_subtree(slot, levels, prefix, rank_by, limit, deadline):
+    options = [[levels[depth][index]] for depth, index in enumerate(prefix)] + levels[len(prefix):]
+    search = SharedCutoffSearch(options, rank_by, limit, max(0.0, deadline - time.monotonic()), slot)
+    for _ in search:
+        pass
+    return {"best": search.best(), "found": search.found, "nodes": search.nodes, "complete": search.complete}
+
+
+def _noop():
+    return None
+
+
+class SolverPool:
+    """
+    Worker processes for large schedule searches. At most `slots` searches run on them at once; each slot has
+    a shared cutoff its workers prune with and a cancel flag. Started on first use.
+    """
+
+    def __init__(self, workers=SCHEDULE_SOLVER_WORKERS, slots=SCHEDULE_SOLVER_SLOTS):
+        self.workers = workers
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._free = list(range(slots))
+        self._executor = None
+        self._shared = None
+
+    @property
+    def enabled(self):
+        return self.workers > 1 and self.slots > 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context("spawn")  # no fork of a threaded server
+                if self._shared is None:
+                    self._shared = context.RawArray("q", 2 * self.slots)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                     initializer=_init_worker, initargs=(self._shared,))
+            return self._executor
+
+    def warm(self):
+        """
+        Start the worker processes (spawning takes a while) before the first search needs them.
+        """
+        executor = self._get_executor()
+        for future in [executor.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+    def acquire(self):
+        """
+        A free slot, reset for a new search, or None when all are in use.
+        """
+        self._get_executor()
+        with self._lock:
+            if not self._free:
+                return None
+            slot = self._free.pop()
+        self._shared[2 * slot] = NO_CUTOFF
+        self._shared[2 * slot + 1] = 0
+        return slot
+
+    def cancel(self, slot):
+        self._shared[2 * slot + 1] = 1
+
+    def release(self, slot):
+        with self._lock:
+            self._free.append(slot)
+
+    def submit(self, *args):
+        return self._get_executor().submit(_solve_subtree, *args)
+
+    def discard_broken(self):
+        """
+        Drop the executor after one of its processes died, so the next search starts new ones.
+        """
+        with self._lock:
+            executor = self._executor
+            # A dead worker marks the executor broken; every pending and later future of it fails
+            if executor is None or not getattr(executor, "_broken", False):
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ParallelScheduleSearch:
+    """
+    ScheduleSearch split into subtrees on a SolverPool, with the same interface: it finds schedules of the same
+    ranks (equally ranked ones may come in another order). Iterating yields schedules as finished subtrees bring
+    them into the best `limit`. Closing the iterator early (e.g. the client went away) or running out of budget cancels the subtrees still running.
+    When every slot of the pool is taken the search runs in this thread instead (`parallel` is then False).
+    """
+
+    def __init__(self, options_per_course, rank_by=RANK_CRITERIA, limit=10, budget_seconds=1.0, pool=None):
+        if not 0 < len(rank_by) <= MAX_CRITERIA or len(set(rank_by)) != len(rank_by):
+            raise ValueError(f"rank_by takes 1 to {MAX_CRITERIA} distinct criteria")
+        self.levels = sorted(options_per_course, key=len)
+        self.rank_by = tuple(rank_by)
+        self.limit = limit
+        self.budget_seconds = budget_seconds
+        self.pool = pool if pool is not None else solver_pool
+        self.found = 0
+        self.nodes = 0
+        self.complete = True
+        self.elapsed = 0.0
+        self.parallel = True
+        self._best = []  # heap of (negated rank key, -order, schedule), as in ScheduleSearch
+
+    def _merge(self, task, result):
+        for position, (key, schedule) in enumerate(result["best"]):
+            entry = (tuple(-value for value in key), -(task * self.limit + position), schedule)
+            if len(self._best) < self.limit:
+                heapq.heappush(self._best, entry)
+            elif entry > self._best[0]:
+                heapq.heapreplace(self._best, entry)
+            else:
+                continue
+            yield schedule
+
+    def _run_serial(self, budget_seconds):
+        search = ScheduleSearch(self.levels, self.rank_by, self.limit, budget_seconds)
+        yield from search
+        self.found, self.nodes, self.complete = search.found, search.nodes, search.complete
+        self._best = [(tuple(-value for value in key), -position, schedule)
+                      for position, (key, schedule) in enumerate(search.best())]
+
+    def _finish_serially(self, deadline, streamed):
+        """
+        A worker process died: search the whole tree again in this thread with the time left,
+        streaming only schedules not sent yet.
+        """
+        logger.error("A schedule solver process died; finishing the search in the request thread")
+        self.pool.discard_broken()
+        self.parallel = False
+        for schedule in self._run_serial(max(0.0, deadline - time.monotonic())):
+            if _schedule_key(schedule) not in streamed:
+                yield schedule
+
+    def _release_when_done(self, slot, futures):
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def done(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.pool.release(slot)
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def __iter__(self):
+        started = time.monotonic()
+        deadline = started + self.budget_seconds
+        slot = self.pool.acquire() if self.pool.enabled else None
+        if slot is None:
+            self.parallel = False
+            try:
+                yield from self._run_serial(self.budget_seconds)
+            finally:
+                self.elapsed = time.monotonic() - started
+            return
+
+        prefixes = split_prefixes(self.levels, self.pool.workers * TASKS_PER_WORKER)
+        futures = {}
+        streamed = set()
+        broken = False
+        try:
+            for task, prefix in enumerate(prefixes):
+                futures[self.pool.submit(slot, self.levels, prefix, self.rank_by, self.limit, deadline)] = task
+        except BrokenProcessPool:
+            broken = True
+        finally:
+            if futures:
+                # The slot is reused only once no subtree of this search can touch its shared values any more
+                self._release_when_done(slot, list(futures))
+            else:
+                self.pool.release(slot)
+        if broken:
+            try:
+                yield from self._finish_serially(deadline, streamed)
+            finally:
+                self.elapsed = time.monotonic() - started
+            return
+
+        pending = set(futures)
+        try:
+            while pending:
+                timeout = max(0.0, deadline - time.monotonic()) + DEADLINE_GRACE_SECONDS
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                try:
+                    results = [(futures[future], future.result()) for future in sorted(done, key=futures.get)]
+                except BrokenProcessPool:
+                    self.found = self.nodes = 0
+                    self.complete = True
+                    pending = set()
+                    yield from self._finish_serially(deadline, streamed)
+                    break
+                for task, result in results:
+                    self.found += result["found"]
+                    self.nodes += result["nodes"]
+                    self.complete = self.complete and result["complete"]
+                    for schedule in self._merge(task, result):
+                        streamed.add(_schedule_key(schedule))
+                        yield schedule
+        finally:
+            if pending:
+                self.complete = False
+                self.pool.cancel(slot)
+                for future in pending:
+                    future.cancel()
+            self.elapsed = time.monotonic() - started
+            logger.info(f"Parallel schedule search: {len(prefixes)} subtrees, {self.found} found, "
+                        f"{self.nodes} nodes in {self.elapsed * 1000:.1f} ms (complete: {self.complete})")
+
+    def best(self):
+        return [(tuple(-value for value in negated), schedule)
+                for negated, _, schedule in sorted(self._best, reverse=True)]
+
+    def ranked(self):
+        return [schedule for _, schedule in self.best()]
+
+
+def _schedule_key(schedule):
+    return tuple((item["courseCode"], tuple(item["groups"])) for item in schedule["scheduleData"])
+
+
+def search_size(options_per_course):
+    """
+    Number of leaves of the unpruned search tree.
+    """
+    return prod(len(options) for options in options_per_course)
+
+
+solver_pool = SolverPool()
@@ -0,0 +1,353 @@
+import heapq
+import itertools
+import time
+from operator import itemgetter
+from backend.app.core.records import format_time
+
+# A meeting is (dayOfWeek, start, end, courseCode, groupCode) with start/end in minutes since midnight
+_DAY, _START, _END = 0, 1, 2
+_by_time = itemgetter(_DAY, _START, _END)
+
+
+# Weekly bitmasks: one bit per SLOT_MINUTES of the week, day after day
+SLOT_MINUTES = 5
+DAY_SLOTS = 24 * 60 // SLOT_MINUTES
+
+
+def meeting_mask(day, start, end):
+    """
+    The week slots a meeting occupies; partially used slots count as taken.
+    """
+    first, last = start // SLOT_MINUTES, -(-end // SLOT_MINUTES)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << (day * DAY_SLOTS + first)
+
+
+# Course fields "what still fits" lists with each course
+FIT_COURSE_FIELDS = ("courseCode", "realCourseCode", "courseName", "courseType", "semester")
+
+
+def _is_minutes(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class TimetableIndex:
+    """
+    The meetings of every group of a department, keyed by (courseCode, groupCode), with the times already in
+    minutes and sorted by day and start, so checking a selection never parses a time string or sorts, and the
+    week slots each group occupies. A group listed more than once (e.g. a lecture held on two days) has one
+    meeting per listing.
+    """
+
+    __slots__ = ("meetings", "masks", "course_groups")
+
+    def __init__(self, courses):
+        meetings = {}
+        self.masks = {}
+        # Per course position: (what fitting_courses lists of it, number of lecture types,
+        # ((groupCode, lectureType, mask), ...) with one entry per group code)
+        course_groups = []
+        for course in courses:
+            groups = {}
+            for group in course.iter_groups():
+                key = (course.get("courseCode"), group.get("groupCode"))
+                group_meetings = meetings.setdefault(key, [])
+                mask = self.masks.get(key, 0)
+                # A group without a usable time has no meetings, so it never conflicts
+                if _is_minutes(group.day) and _is_minutes(group.start) and _is_minutes(group.end):
+                    group_meetings.append((group.day, group.start, group.end) + key)
+                    mask |= meeting_mask(group.day, group.start, group.end)
+                self.masks[key] = mask
+                groups[key[1]] = (key[1], group.get("lectureType"), mask)
+            info = {field: course.get(field) for field in FIT_COURSE_FIELDS}
+            course_groups.append((info, len({lecture_type for _, lecture_type, _ in groups.values()}),
+                                  tuple(groups.values())))
+        self.meetings = {key: tuple(sorted(group_meetings, key=_by_time)) for key, group_meetings in meetings.items()}
+        self.course_groups = tuple(course_groups)
+
+    def group_meetings(self, course_code, group_code):
+        """
+        The meetings of a group, () for a group without times, None for an unknown group.
+        """
+        return self.meetings.get((course_code, group_code))
+
+
+def resolve_selection(catalog, department, selection):
+    """
+    (meetings, unknown) of a schedule selection ([{courseCode, groups: [groupCode, ...]}, ...]) for a student of
+    `department`: the meetings of each selected group as the index keeps them, and the {courseCode, groupCode}
+    not in the catalog.
+    """
+    meetings, unknown, seen = [], [], set()
+    for item in selection:
+        for group_code in item.groups:
+            key = (item.courseCode, group_code)
+            if key in seen:
+                continue
+            seen.add(key)
+            group_meetings = catalog.group_meetings(item.courseCode, group_code, department)
+            if group_meetings is None:
+                unknown.append({"courseCode": item.courseCode, "groupCode": group_code})
+            else:
+                meetings.append(group_meetings)
+    return meetings, unknown
+
+
+def find_conflicts(groups):
+    """
+    Every pair of meetings of different groups that overlap in time (start < other end and end > other start,
+    as the weekly schedule view checks). `groups` are meeting sequences already sorted by day and start, as
+    TimetableIndex keeps them, so one sweep over their merge finds every overlap without sorting.
+    """
+    conflicts = []
+    day, active = None, []  # meetings of `day` that started earlier and have not ended yet
+    for meeting in heapq.merge(*groups, key=_by_time):
+        start, end = meeting[_START], meeting[_END]
+        if meeting[_DAY] != day:
+            day, active = meeting[_DAY], []
+        else:
+            active = [other for other in active if other[_END] > start]
+        for other in active:
+            if other[_START] < end and other[3:] != meeting[3:]:
+                conflicts.append((other, meeting))
+        active.append(meeting)
+    return conflicts
+
+
+def _conflict_json(first, second):
+    return {
+        "dayOfWeek": first[_DAY],
+        # The overlapping part of the two meetings
+        "startTime": format_time(max(first[_START], second[_START])),
+        "endTime": format_time(min(first[_END], second[_END])),
+        "groups": [{"courseCode": meeting[3], "groupCode": meeting[4]} for meeting in (first, second)],
+    }
+
+
+def check_schedule(catalog, department, selection):
+    """
+    Validation result of a schedule selection: its time conflicts and the groups the catalog does not know.
+    """
+    meetings, unknown = resolve_selection(catalog, department, selection)
+    conflicts = [_conflict_json(first, second) for first, second in find_conflicts(meetings)]
+    return {"valid": not conflicts and not unknown, "conflicts": conflicts, "unknownGroups": unknown}
+
+
+# Ways generated schedules can be ranked, lower is better: campus days, minutes of gaps between meetings
+# on the same day, and the latest time any day ends
+RANK_CRITERIA = ("days", "gaps", "finish")
+
+
+class CourseOption:
+    """
+    One way to take a course: a group of each lecture type it has, with their combined slots.
+    """
+
+    __slots__ = ("course_code", "groups", "meetings", "mask", "day_bits", "finish")
+
+    def __init__(self, course_code, groups, meetings):
+        self.course_code = course_code
+        self.groups = groups
+        self.meetings = meetings
+        self.mask = 0
+        self.day_bits = 0
+        self.finish = 0
+        for day, start, end, *_ in meetings:
+            self.mask |= meeting_mask(day, start, end)
+            self.day_bits |= 1 << day
+            self.finish = max(self.finish, end)
+
+
+def course_options(catalog, department, course):
+    """
+    Every conflict-free combination of one group per lecture type of `course` (a catalog course record).
+    """
+    course_code = course.get("courseCode")
+    by_type = {}
+    for group in course.iter_groups():
+        group_codes = by_type.setdefault(group.get("lectureType"), [])
+        if group.get("groupCode") not in group_codes:
+            group_codes.append(group.get("groupCode"))
+
+    options = []
+    for groups in itertools.product(*by_type.values()):
+        group_meetings = [catalog.group_meetings(course_code, group_code, department) or () for group_code in groups]
+        # A lecture overlapping its own practice is no option; a group meeting twice may share slots with itself
+        if not find_conflicts(group_meetings):
+            options.append(CourseOption(course_code, groups, tuple(itertools.chain.from_iterable(group_meetings))))
+    return options
+
+
+def _schedule_metrics(options):
+    """
+    {"days", "gaps", "finish"} of a conflict-free set of course options.
+    """
+    spans = {}
+    for option in options:
+        for day, start, end, *_ in option.meetings:
+            first, last, busy = spans.get(day, (start, end, 0))
+            spans[day] = (min(first, start), max(last, end), busy + end - start)
+    return {
+        "days": len(spans),
+        "gaps": sum(last - first - busy for first, last, busy in spans.values()),
+        "finish": max((last for _, last, _ in spans.values()), default=0),
+    }
+
+
+class ScheduleSearch:
+    """
+    Backtracking over the options of each course, fewest options first, keeping the `limit` best schedules by
+    `rank_by`. A branch is cut as soon as its slots collide, or when a lower bound of its rank (campus days and
+    finish time only grow as courses are added; gaps may shrink, so they bound at 0) cannot beat the current
+    worst kept schedule. Iterating yields each schedule as it enters the best `limit`; the search stops
+    when `budget_seconds` run out, with `complete` False.
+    """
+
+    # Nodes between deadline checks
+    CHECK_EVERY = 512
+
+    def __init__(self, options_per_course, rank_by=RANK_CRITERIA, limit=10, budget_seconds=0.25):
+        self.options = sorted(options_per_course, key=len)
+        self.rank_by = tuple(rank_by)
+        self.limit = limit
+        self.budget_seconds = budget_seconds
+        self.found = 0
+        self.nodes = 0
+        self.complete = True
+        self.elapsed = 0.0
+        self._best = []  # heap of (negated rank key, -sequence, schedule): the worst kept schedule on top
+        self._deadline = None
+
+    def _rank_key(self, metrics):
+        return tuple(metrics[criterion] for criterion in self.rank_by)
+
+    def _bound(self, day_bits, finish):
+        bounds = {"days": bin(day_bits).count("1"), "gaps": 0, "finish": finish}
+        return tuple(bounds[criterion] for criterion in self.rank_by)
+
+    def _cutoff(self):
+        """
+        The rank key a schedule (or a branch's bound) must beat to be kept, None while fewer than `limit` are kept.
+        """
+        if len(self._best) < self.limit:
+            return None
+        return tuple(-value for value in self._best[0][0])
+
+    def _out_of_time(self):
+        return time.monotonic() > self._deadline
+
+    def _schedule_json(self, chosen, metrics):
+        return {
+            "scheduleData": [{"courseCode": option.course_code, "groups": list(option.groups)}
+                             for option in sorted(chosen, key=lambda option: option.course_code)],
+            "campusDays": metrics["days"],
+            "gapMinutes": metrics["gaps"],
+            "finishTime": format_time(metrics["finish"]),
+        }
+
+    def _keep(self, chosen):
+        """
+        The schedule JSON if it is among the best `limit` so far, else None.
+        """
+        self.found += 1
+        metrics = _schedule_metrics(chosen)
+        key = self._rank_key(metrics)
+        cutoff = self._cutoff()
+        if cutoff is not None and key >= cutoff:
+            return None
+        schedule = self._schedule_json(chosen, metrics)
+        entry = (tuple(-value for value in key), -self.found, schedule)
+        if len(self._best) == self.limit:
+            heapq.heapreplace(self._best, entry)
+        else:
+            heapq.heappush(self._best, entry)
+        return schedule
+
+    def _search(self, depth, chosen, used, day_bits, finish):
+        if depth == len(self.options):
+            schedule = self._keep(chosen)
+            if schedule is not None:
+                yield schedule
+            return
+        for option in self.options[depth]:
+            self.nodes += 1
+            if self.nodes % self.CHECK_EVERY == 0 and self._out_of_time():
+                self.complete = False
+            if not self.complete:
+                return
+            if option.mask & used:
+                continue
+            option_days, option_finish = day_bits | option.day_bits, max(finish, option.finish)
+            cutoff = self._cutoff()
+            if cutoff is not None and self._bound(option_days, option_finish) >= cutoff:
+                continue
+            chosen.append(option)
+            yield from self._search(depth + 1, chosen, used | option.mask, option_days, option_finish)
+            chosen.pop()
+
+    def __iter__(self):
+        started = time.monotonic()
+        self._deadline = started + self.budget_seconds
+        try:
+            yield from self._search(0, [], 0, 0, 0)
+        finally:
+            self.elapsed = time.monotonic() - started
+
+    def best(self):
+        """
+        [(rank key, schedule), ...] of the best schedules found, best first.
+        """
+        return [(tuple(-value for value in negated), schedule)
+                for negated, _, schedule in sorted(self._best, reverse=True)]
+
+    def ranked(self):
+        """
+        The best schedules found, best first.
+        """
+        return [schedule for _, schedule in self.best()]
+
+
+def _combinable(groups_per_type, used):
+    """
+    Whether one group of each lecture type ([(groupCode, mask), ...] per type) fits with `used` and each other.
+    """
+    if not groups_per_type:
+        return True
+    first, rest = groups_per_type[0], groups_per_type[1:]
+    return any(_combinable(rest, used | mask) for _, mask in first if not mask & used)
+
+
+def fitting_courses(catalog, department, selection, generalcourses=True, filters=None):
+    """
+    ({"courses": [...], "unknownGroups": [...]}) for a schedule selection: every course not in the selection
+    (optionally only those matching `filters`, as CourseCatalog.select) with the groups that fit the selection
+    without a conflict. `addable` tells whether one group of each of its lecture types fits at the same time.
+    """
+    used, unknown, selected_courses = 0, [], set()
+    for item in selection:
+        selected_courses.add(item.courseCode)
+        for group_code in item.groups:
+            mask = catalog.group_mask(item.courseCode, group_code, department)
+            if mask is None:
+                unknown.append({"courseCode": item.courseCode, "groupCode": group_code})
+            else:
+                used |= mask
+
+    courses = []
+    for dept, position in catalog.select(department, generalcourses, filters):
+        info, lecture_types, groups = dept.timetable.course_groups[position]
+        if info["courseCode"] in selected_courses:
+            continue
+        fitting = {}
+        for group_code, lecture_type, mask in groups:
+            if not mask & used:
+                fitting.setdefault(lecture_type, []).append((group_code, mask))
+        if not fitting:
+            continue
+        courses.append({
+            **info,
+            "addable": len(fitting) == lecture_types and _combinable(list(fitting.values()), used),
+            "groups": [group_code for group_code, _, mask in groups if not mask & used],
+        })
+    return {"courses": courses, "unknownGroups": unknown}
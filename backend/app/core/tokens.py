@@ -0,0 +1,77 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Optional
+from fastapi import Header, HTTPException
+from backend.app.core.logger import logger
+from backend.app.core.config import SESSION_SECRET, SESSION_TOKEN_TTL_SECONDS
+
+if SESSION_SECRET:
+    _key = SESSION_SECRET.encode()
+else:
+    logger.warning("SESSION_SECRET is not set; session tokens are signed with a random per-process key")
+    _key = secrets.token_bytes(32)
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return _b64encode(hmac.new(_key, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(student_id, ttl=SESSION_TOKEN_TTL_SECONDS, now=None):
+    """
+    "<base64url(student_id:expiry)>.<base64url(HMAC-SHA256)>", checked by verify_token without bcrypt or the DB.
+    """
+    expires = int((time.time() if now is None else now) + ttl)
+    payload = _b64encode(f"{student_id}:{expires}".encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token, now=None):
+    """
+    The student id a token was issued for, or None when it is malformed, tampered with or expired.
+    """
+    payload, _, signature = (token or "").partition(".")
+    if not payload or not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        return None
+    try:
+        student_id, expires = _b64decode(payload).decode().split(":")
+        student_id, expires = int(student_id), int(expires)
+    except ValueError:
+        return None
+    if expires < (time.time() if now is None else now):
+        return None
+    return student_id
+
+
+def optional_student_id(authorization: Optional[str] = Header(None)):
+    """
+    Dependency: the student id of an "Authorization: Bearer <token>" header, None without one, 401 for a bad one.
+    """
+    if authorization is None:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    student_id = verify_token(token.strip()) if scheme.lower() == "bearer" else None
+    if student_id is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired session token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return student_id
+
+
+def require_student_id(authorization: Optional[str] = Header(None)):
+    """
+    Dependency: like optional_student_id, but a missing token is 401 as well.
+    """
+    student_id = optional_student_id(authorization)
+    if student_id is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return student_id
@@ -1,6 +1,7 @@
 # backend/models.py
 
 from sqlalchemy import Column, Integer, String, ForeignKey, Float, PrimaryKeyConstraint, CheckConstraint, JSON, Boolean, TIMESTAMP, func
+from sqlalchemy import event, update
 from sqlalchemy.orm import relationship
 from backend.app.db.db import Base
 from uuid import uuid4
@@ -17,6 +18,8 @@ class Student(Base):
     gpa = Column(Float, nullable=True)
     completedCredits = Column(Float, nullable=True)
     courses = relationship("StudentCourse", back_populates="student", cascade="all, delete")
+    progress = relationship("StudentProgress", back_populates="student", uselist=False,
+                            cascade="all, delete-orphan")
 
 
 class StudentCourse(Base):
@@ -36,6 +39,31 @@ class StudentCourse(Base):
     )
 
 
+class StudentProgress(Base):
+    __tablename__ = "student_progress"
+
+    # Degree-progress summary login returns, computed from the student's courses against the catalog
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    catalog_stamp = Column(String, nullable=False)  # CourseCatalog.department_stamp() it was computed with
+    summary = Column(JSON, nullable=False)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    student = relationship("Student", back_populates="progress")
+
+
+# Stamp that never matches a catalog, marking a summary for recomputation
+STALE_PROGRESS = ""
+
+
+@event.listens_for(StudentCourse, "after_insert")
+@event.listens_for(StudentCourse, "after_update")
+@event.listens_for(StudentCourse, "after_delete")
+def _invalidate_progress(mapper, connection, target):
+    # Any change to a student's courses through the ORM makes their stored summary stale
+    connection.execute(update(StudentProgress.__table__)
+                       .where(StudentProgress.__table__.c.student_id == target.student_id)
+                       .values(catalog_stamp=STALE_PROGRESS))
+
+
 class DepartmentCourses(Base):
     __tablename__ = "department_courses"
 
@@ -1,6 +1,8 @@
+import threading
 import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -10,7 +12,12 @@ from backend.app.api.auth import router as auth_router
 from backend.app.api.coursesInfo import router as courses_info_router
 from backend.app.api.schedule import router as student_schedule_router
 from backend.app.core.logger import logger
-from backend.app.core.cache import load_courses_to_mem
+from backend.app.core.cache import load_courses_to_mem, CatalogRefresher
+from backend.app.core.hashing import PasswordHasherBusy
+from backend.app.core.jobs import JobQueueFull
+from backend.app.core.config import SCRAPER_BROWSER_WARM_ON_STARTUP, SCHEDULE_SOLVER_WARM_ON_STARTUP
+from backend.app.core.solver import solver_pool
+from backend.scripts.browser_pool import browser_pool
 from backend.data.consts import VALID_ENDPOINTS
 
 
@@ -21,8 +28,18 @@ limiter = Limiter(key_func=get_remote_address)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     load_courses_to_mem()
+    refresher = CatalogRefresher()
+    refresher.start()
+    if SCRAPER_BROWSER_WARM_ON_STARTUP:
+        # Launching Chrome takes seconds; do it off the startup path
+        threading.Thread(target=browser_pool.warm, name="browser-pool-warm", daemon=True).start()
+    if SCHEDULE_SOLVER_WARM_ON_STARTUP and solver_pool.enabled:
+        threading.Thread(target=solver_pool.warm, name="solver-pool-warm", daemon=True).start()
     logger.info("Startup tasks completed.")
     yield
+    refresher.stop()
+    browser_pool.close()
+    solver_pool.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -30,6 +47,21 @@ app = FastAPI(lifespan=lifespan)
 # Add rate limiting middleware
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    logger.warning(f"HASHING BUSY - {request.method} {request.url.path} | Retry-After: {exc.retry_after}s")
+    return JSONResponse(status_code=503, content={"detail": "Server busy, please try again shortly"},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+
+@app.exception_handler(JobQueueFull)
+async def job_queue_full_handler(request: Request, exc: JobQueueFull):
+    logger.warning(f"JOB QUEUE FULL - {request.method} {request.url.path} | Retry-After: {exc.retry_after}s")
+    return JSONResponse(status_code=503, content={"detail": "Server busy, please try again shortly"},
+                        headers={"Retry-After": str(exc.retry_after)})
+
 app.add_middleware(SlowAPIMiddleware)
 
 
@@ -96,6 +128,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Catalog-Version", "X-Total-Count", "X-Next-Cursor"],
 )
 
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
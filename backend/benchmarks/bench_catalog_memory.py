@@ -0,0 +1,62 @@
+"""
+Memory footprint of a cached department before (raw json dicts, as global_courses_cache held them)
+and after (compact Course/Group records with interned strings and minute times).
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_catalog_memory
+"""
+import gc
+import json
+import os
+import tracemalloc
+
+# The catalog module imports the DB layer, which refuses to load without a URL
+os.environ.setdefault("SUPABASE_DB_URL", "sqlite://")
+
+from backend.app.core.catalog import DepartmentCatalog
+from backend.app.core.records import Course
+from backend.benchmarks.synthetic import make_department
+
+
+def measure(build, source, inspect=None, repeat=3):
+    """
+    Smallest of `repeat` runs, to keep one-time allocations (e.g. intern table resizes) out of the numbers.
+    """
+    return min(measure_once(build, source, inspect) for _ in range(repeat))
+
+
+def measure_once(build, source, inspect=None):
+    """
+    Bytes still allocated by build(source) once the parsed source it was built from is gone.
+    The result is released before returning, so interned strings are not shared between runs.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    parsed = json.loads(source)  # as it comes back from the JSON column
+    result = build(parsed)
+    del parsed
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    extra = inspect(result) if inspect else None
+    del result
+    return size, extra
+
+
+def main():
+    for n_courses in (100, 400, 1200):
+        source = json.dumps(make_department("מדעי המחשב", n_courses), ensure_ascii=False)
+
+        raw, _ = measure(lambda parsed: parsed, source)
+        records, _ = measure(lambda parsed: [Course.from_dict(course) for course in parsed], source)
+        department, (json_bytes, estimate) = measure(lambda parsed: DepartmentCatalog("מדעי המחשב", parsed), source,
+                                                     lambda dept: (len(dept.encoded_items), dept.nbytes))
+
+        print(f"{n_courses:5d} courses: raw dicts {raw / 1024:8.1f} KiB | compact records {records / 1024:8.1f} KiB "
+              f"({raw / records:.1f}x smaller) | DepartmentCatalog incl. indexes + encoded JSON "
+              f"{department / 1024:8.1f} KiB (JSON {json_bytes / 1024:.1f} KiB, nbytes {estimate / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
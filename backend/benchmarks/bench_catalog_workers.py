@@ -0,0 +1,93 @@
+"""
+Private memory each worker adds for the course catalog: a catalog built in every worker (the default)
+against workers mapping one shared snapshot (CATALOG_SNAPSHOT_DIR). Only the /courses bodies are shared, so the
+snapshot is measured twice: serving bodies only, and after every department's records and indexes were built for
+lookups: CATALOG_SNAPSHOT_MAX_BYTES bounds the records kept alive, while the allocator keeps the pages of evicted
+ones. Every worker reads every body it serves; a mapped page read by a single worker counts as its private memory.
+Linux only (reads /proc/self/smaps_rollup).
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_catalog_workers
+"""
+import multiprocessing
+import os
+import tempfile
+import zlib
+
+# The catalog module imports the DB layer, which refuses to load without a URL
+os.environ.setdefault("SUPABASE_DB_URL", "sqlite://")
+
+from backend.app.core.catalog import CourseCatalog
+from backend.app.core.config import CATALOG_SNAPSHOT_MAX_BYTES
+from backend.app.core.snapshot import SharedCourseCatalog, SnapshotStore, encode_section
+from backend.benchmarks.synthetic import make_department
+
+DEPARTMENTS = 12
+COURSES_PER_DEPARTMENT = 400
+
+def make_data():
+    data = {f"מחלקה {i}": make_department(f"מחלקה {i}", COURSES_PER_DEPARTMENT, first_code=10000 + i * 1000, seed=i)
+            for i in range(DEPARTMENTS)}
+    data["אנגלית"] = make_department("אנגלית", 20, first_code=70000, seed=100)
+    data["כללי"] = make_department("כללי", 100, first_code=80000, seed=101)
+    return data
+
+
+def private_kib():
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return sum(int(fields[key].split()[0]) for key in ("Private_Clean", "Private_Dirty"))
+
+
+def worker(mode, snapshot_dir, results):
+    before = private_kib()
+    if mode == "private":
+        catalog = CourseCatalog.from_data(make_data())
+    else:
+        catalog = SharedCourseCatalog(SnapshotStore(snapshot_dir).open_current(), CATALOG_SNAPSHOT_MAX_BYTES)
+        catalog.warm()
+        if mode == "records":
+            for department in catalog.stamps():
+                catalog.match_course("0", department)
+    # Serve every body once; crc32 reads all of it, so the mapped pages are actually faulted in
+    served = 0
+    for department in catalog.stamps():
+        for body in (catalog.payload(department), *catalog.payload_variants(department).values()):
+            zlib.crc32(body)
+            served += len(body)
+    results.put((private_kib() - before, getattr(catalog, "nbytes", 0), served))
+
+
+def measure(mode, workers, snapshot_dir):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(mode, snapshot_dir, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    sizes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return (sum(size for size, _, _ in sizes) / len(sizes), max(live for _, live, _ in sizes) / 1024,
+            max(served for _, _, served in sizes) / 1024)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        store = SnapshotStore(snapshot_dir)
+        store.lead()
+        store.publish(1, {name: encode_section(name, courses) for name, courses in make_data().items()})
+        snapshot_kib = os.path.getsize(os.path.join(snapshot_dir, store.current_name())) / 1024
+        print(f"{DEPARTMENTS} departments x {COURSES_PER_DEPARTMENT} courses, snapshot file {snapshot_kib:.0f} KiB")
+
+        for workers in (1, 2, 4):
+            private, _, served = measure("private", workers, snapshot_dir)
+            shared, _, _ = measure("shared", workers, snapshot_dir)
+            records, live, _ = measure("records", workers, snapshot_dir)
+            print(f"  {workers} workers, {served:.0f} KiB of bodies read by each: own catalog {private:8.0f} KiB/worker | "
+                  f"mapped snapshot {shared:8.0f} KiB/worker ({private / shared:.1f}x less) | "
+                  f"+ records for every department {records:8.0f} KiB/worker "
+                  f"({live:.0f} KiB live, budget {CATALOG_SNAPSHOT_MAX_BYTES // 1024} KiB)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
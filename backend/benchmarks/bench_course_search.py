@@ -0,0 +1,32 @@
+"""
+Latency of GET /courses/search lookups against the per-department trigram/prefix index.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_course_search
+"""
+import os
+import timeit
+
+# The catalog module imports the DB layer, which refuses to load without a URL
+os.environ.setdefault("SUPABASE_DB_URL", "sqlite://")
+
+from backend.app.core.catalog import CourseCatalog
+from backend.benchmarks.synthetic import make_catalog
+
+QUERIES = ["מבני נתונים", "אלגו", "10042", "100", "כהן", "ד\"ר ישראלי", "מערכות הפעלה", "מ", "ג׳אווה", "לא קיים בכלל"]
+
+
+def main():
+    for n_courses in (400, 1200, 4000):
+        catalog = CourseCatalog.from_data(make_catalog(n_courses))
+        print(f"{n_courses} courses per department:")
+        for query in QUERIES:
+            number = 200
+            best = min(timeit.repeat(lambda: catalog.search(query, "מדעי המחשב"), number=number, repeat=3)) / number
+            everywhere = min(timeit.repeat(lambda: catalog.search(query), number=number, repeat=3)) / number
+            hits = len(catalog.search(query, "מדעי המחשב", limit=10 ** 6))
+            print(f"  {query!r:20} {hits:5d} hits | department {best * 1e6:8.1f} us | all {everywhere * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
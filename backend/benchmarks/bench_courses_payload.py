@@ -0,0 +1,58 @@
+"""
+Compare the old GET /courses path (copy + merge + jsonable_encoder + JSONResponse on every call)
+with returning the pre-serialized payload built once per CourseCatalog.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_courses_payload
+"""
+import os
+import timeit
+
+# The cache module imports the DB layer, which refuses to load without a URL
+os.environ.setdefault("SUPABASE_DB_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from backend.app.core import cache
+from backend.app.core.catalog import CourseCatalog
+from backend.app.api.coursesInfo import get_courses
+from backend.benchmarks.synthetic import make_catalog
+
+DEPARTMENT = "מדעי המחשב"
+
+# The old dict-of-lists cache
+raw_cache = {}
+
+
+def old_get_courses(department, generalcourses=True):
+    combined_courses = list(raw_cache[department])
+    if generalcourses:
+        for gen_dept in ["אנגלית", "כללי"]:
+            if gen_dept in raw_cache:
+                combined_courses.extend(raw_cache[gen_dept])
+    # What FastAPI does with a returned list
+    return JSONResponse(content=jsonable_encoder(combined_courses)).body
+
+
+def new_get_courses(department, generalcourses=True):
+    return get_courses(department, generalcourses).body
+
+
+def main():
+    for n_courses in (100, 400, 1200):
+        raw_cache.clear()
+        raw_cache.update(make_catalog(n_courses))
+        cache.set_catalog(CourseCatalog.from_data(raw_cache))
+
+        assert old_get_courses(DEPARTMENT) == new_get_courses(DEPARTMENT)
+        size = len(new_get_courses(DEPARTMENT))
+
+        number = 20
+        old = min(timeit.repeat(lambda: old_get_courses(DEPARTMENT), number=number, repeat=3)) / number
+        new = min(timeit.repeat(lambda: new_get_courses(DEPARTMENT), number=number, repeat=3)) / number
+        print(f"{n_courses:5d} courses ({size / 1024:8.1f} KiB): "
+              f"old {old * 1000:8.3f} ms | new {new * 1000:8.4f} ms | x{old / new:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
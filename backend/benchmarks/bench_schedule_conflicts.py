@@ -0,0 +1,67 @@
+"""
+Latency of POST /schedule/validate: resolving a selection through the catalog's per-group meeting index and
+sweeping each day in start order, against the pairwise rescan the weekly schedule view does (every block
+against every other, parsing the "HH:MM" times each time).
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_schedule_conflicts
+"""
+import os
+import random
+import timeit
+from types import SimpleNamespace
+
+# The catalog module imports the DB layer, which refuses to load without a URL
+os.environ.setdefault("SUPABASE_DB_URL", "sqlite://")
+
+from backend.app.core.catalog import CourseCatalog
+from backend.app.core.timetable import check_schedule
+from backend.benchmarks.synthetic import make_catalog
+
+DEPARTMENT = "מדעי המחשב"
+
+
+def _minutes(time):
+    hours, minutes = time.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def pairwise(catalog, selection):
+    """
+    The weekly schedule view's check: every selected group against every other one.
+    """
+    blocks = []
+    for item in selection:
+        course = catalog.find_by_course_code(item.courseCode, DEPARTMENT)
+        blocks.extend(group for group in course["groups"] if group["groupCode"] in item.groups)
+    conflicts = []
+    for i, group in enumerate(blocks):
+        for other in blocks[i + 1:]:
+            if (other["dayOfWeek"] == group["dayOfWeek"] and other["groupCode"] != group["groupCode"]
+                    and _minutes(group["startTime"]) < _minutes(other["endTime"])
+                    and _minutes(group["endTime"]) > _minutes(other["startTime"])):
+                conflicts.append((group["groupCode"], other["groupCode"]))
+    return conflicts
+
+
+def main():
+    catalog = CourseCatalog.from_data(make_catalog(1200, groups_per_course=6))
+    courses = catalog.courses(DEPARTMENT, generalcourses=False)
+    rng = random.Random(0)
+    for n_courses in (8, 20, 60, 200):
+        selection = [SimpleNamespace(courseCode=course["courseCode"],
+                                     groups=[group["groupCode"] for group in course["groups"]][:2])
+                     for course in rng.sample(courses, n_courses)]
+        result = check_schedule(catalog, DEPARTMENT, selection)
+        assert len(result["conflicts"]) == len(pairwise(catalog, selection))
+
+        number = 200
+        indexed = min(timeit.repeat(lambda: check_schedule(catalog, DEPARTMENT, selection),
+                                    number=number, repeat=3)) / number
+        rescan = min(timeit.repeat(lambda: pairwise(catalog, selection), number=number, repeat=3)) / number
+        print(f"{n_courses:4d} courses ({n_courses * 2} groups, {len(result['conflicts']):4d} conflicts): "
+              f"indexed sweep {indexed * 1e6:8.1f} us | pairwise rescan {rescan * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
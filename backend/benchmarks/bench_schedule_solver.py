@@ -0,0 +1,60 @@
+"""
+Latency of POST /schedule/generate for growing course sets: the single-threaded ScheduleSearch against the
+ParallelScheduleSearch that splits the search tree across the solver's worker processes, pruning with the
+best cutoff any of them found so far. Both get a budget large enough to finish, and must find the same ranks.
+The last column is what mode="auto" picks with SCHEDULE_PARALLEL_MIN_LEAVES; its default sits where the serial
+search stops finishing within SCHEDULE_GENERATOR_BUDGET_MS.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_schedule_solver
+"""
+import os
+import random
+import time
+
+# The catalog module imports the DB layer, which refuses to load without a URL
+os.environ.setdefault("SUPABASE_DB_URL", "sqlite://")
+
+from backend.app.core.catalog import CourseCatalog
+from backend.app.core.config import SCHEDULE_PARALLEL_MIN_LEAVES
+from backend.app.core.solver import ParallelScheduleSearch, SolverPool, search_size
+from backend.app.core.timetable import ScheduleSearch, course_options
+from backend.benchmarks.synthetic import make_catalog
+
+DEPARTMENT = "מדעי המחשב"
+BUDGET_SECONDS = 120.0
+
+
+def run(search):
+    started = time.perf_counter()
+    for _ in search:
+        pass
+    return time.perf_counter() - started
+
+
+def main():
+    catalog = CourseCatalog.from_data(make_catalog(400, groups_per_course=8))
+    courses = catalog.courses(DEPARTMENT, generalcourses=False)
+    pool = SolverPool(workers=max(4, os.cpu_count() or 1), slots=1)
+    pool.warm()
+    rng = random.Random(0)
+    try:
+        for n_courses in (4, 6, 7, 8, 10):
+            options = [course_options(catalog, DEPARTMENT, course) for course in rng.sample(courses, n_courses)]
+            serial = ScheduleSearch(options, limit=10, budget_seconds=BUDGET_SECONDS)
+            serial_seconds = run(serial)
+            parallel = ParallelScheduleSearch(options, limit=10, budget_seconds=BUDGET_SECONDS, pool=pool)
+            parallel_seconds = run(parallel)
+            assert serial.complete and parallel.complete
+            assert [key for key, _ in serial.best()] == [key for key, _ in parallel.best()], \
+                "the parallel search must find schedules of the same ranks"
+            print(f"{n_courses:3d} courses ({search_size(options):>14,} leaves, {serial.found:7d} schedules): "
+                  f"serial {serial_seconds * 1000:9.1f} ms ({serial.nodes:9d} nodes) | "
+                  f"parallel x{pool.workers} {parallel_seconds * 1000:9.1f} ms ({parallel.nodes:9d} nodes) | "
+                  f"auto: {'parallel' if search_size(options) >= SCHEDULE_PARALLEL_MIN_LEAVES else 'serial'}")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
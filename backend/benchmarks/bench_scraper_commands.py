@@ -0,0 +1,141 @@
+"""
+WebDriver commands (chromedriver round trips) the grade scraper spends reading the grade list: the former
+find_element/get_attribute walk over every <details>/Father/InRange element against the single outerHTML grab
+parsed in Python. Runs against a fake driver that answers from a synthetic page, so no browser is needed.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_scraper_commands
+"""
+import os
+import time
+from collections import Counter
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.locator_converter import LocatorConverter
+from selenium.webdriver.remote.webelement import WebElement
+
+# The scraper modules import the app config and logger, which load the DB settings
+os.environ.setdefault("SUPABASE_DB_URL", "sqlite://")
+
+from backend.benchmarks.synthetic import make_grade_page
+from backend.scripts.grade_parser import (MAIN_CONTAINER, clean_code, clean_grade, clean_nz, has_class, inner_html,
+                                          outer_html, parse_grade_list, parse_html)
+
+# A local chromedriver round trip is typically 1-5 ms; used to estimate the time the commands cost
+ROUND_TRIP_MS = 2.0
+
+
+class CountingDriver:
+    """
+    Answers the WebDriver commands the grade scraper sends for a parsed page, counting each one.
+    """
+
+    session_id = "benchmark"
+
+    def __init__(self, html):
+        self.locator_converter = LocatorConverter()
+        self.commands = Counter()
+        self._elements = {}
+        self.root = parse_html(html)
+
+    def _wrap(self, element):
+        self._elements[str(id(element))] = element
+        return WebElement(self, str(id(element)))
+
+    def _xpath(self, using, value):
+        if using == "tag name":
+            return f".//{value}"
+        if using == "css selector" and value.startswith("."):
+            return ".//*[{}]".format(" and ".join(has_class(name) for name in value[1:].split(".")))
+        if using == "xpath":
+            return value
+        raise NotImplementedError(f"{using} {value}")
+
+    def execute(self, command, params):
+        self.commands[command] += 1
+        element = self._elements[params["id"]]
+        if command in (Command.FIND_CHILD_ELEMENT, Command.FIND_CHILD_ELEMENTS):
+            found = [self._wrap(e) for e in element.xpath(self._xpath(params["using"], params["value"]))]
+            if command == Command.FIND_CHILD_ELEMENTS:
+                return {"value": found}
+            if not found:
+                raise LookupError(params["value"])
+            return {"value": found[0]}
+        if command == Command.GET_ELEMENT_TEXT:
+            return {"value": element.text_content()}
+        raise NotImplementedError(command)
+
+    def execute_script(self, script, *args):
+        self.commands[Command.W3C_EXECUTE_SCRIPT] += 1
+        element = self._elements[args[0]._id]
+        if "outerHTML" in script:
+            return outer_html(element)
+        if "getAttribute" in script and args[1] == "innerHTML":
+            return inner_html(element)
+        raise NotImplementedError(script[:40])
+
+    def main_container(self):
+        return self._wrap(self.root.xpath(MAIN_CONTAINER)[0])
+
+
+def per_element(driver, main_container, username):
+    """
+    The former extraction loop of scrape_student_grades, one WebDriver command per element access.
+    """
+    results = {"UserName": username, "Courses": []}
+    for details in main_container.find_elements(By.TAG_NAME, "details"):
+        try:
+            summary_element = details.find_element(By.TAG_NAME, "summary")
+            summary_element.find_element(By.TAG_NAME, "h3").text.strip()
+            for father in details.find_elements(By.CLASS_NAME, "Father"):
+                nz_grade = ''
+                for inrange in father.find_elements(By.CLASS_NAME, "InRange"):
+                    inrange_text = inrange.get_attribute("innerHTML").strip()
+                    nz_temp = clean_nz(inrange_text)
+                    if nz_temp != "N/A":
+                        nz_grade = nz_temp
+                    if "סופי-הרצאה" in inrange_text:
+                        try:
+                            strong_div = father.find_element(By.XPATH, ".//div[strong]")
+                            strong_element = strong_div.find_element(By.TAG_NAME, "strong")
+                            grade = clean_grade(strong_element.get_attribute("innerHTML").strip())
+                            code_div = father.find_element(By.CLASS_NAME, "pagetitle.InRange")
+                            code = clean_code(code_div.get_attribute("innerHTML").strip())
+                            results["Courses"].append({code: [grade, nz_grade]})
+                        except LookupError:
+                            pass
+                        continue
+        except LookupError:
+            pass
+    return results
+
+
+def batched(driver, main_container, username):
+    """
+    The current extraction: one execute_script for the container's outerHTML, parsed in Python.
+    """
+    return parse_grade_list(driver.execute_script("return arguments[0].outerHTML;", main_container), username)
+
+
+def measure(extract, html):
+    driver = CountingDriver(html)
+    container = driver.main_container()
+    started = time.perf_counter()
+    result = extract(driver, container, "Bench.Student")
+    return result, sum(driver.commands.values()), time.perf_counter() - started
+
+
+def main():
+    for n_courses in (20, 60, 120):
+        html = make_grade_page(n_courses, seed=n_courses)
+        before, before_commands, before_seconds = measure(per_element, html)
+        after, after_commands, after_seconds = measure(batched, html)
+        assert before == after, "batched extraction must return what the per-element walk returned"
+        print(f"{n_courses:4d} courses ({len(after['Courses'])} graded): "
+              f"per-element {before_commands:5d} commands (~{before_commands * ROUND_TRIP_MS:7.0f} ms round trips) | "
+              f"batched {after_commands} command (~{after_commands * ROUND_TRIP_MS:.0f} ms) + "
+              f"{after_seconds * 1000:.1f} ms parsing")
+
+
+if __name__ == "__main__":
+    main()
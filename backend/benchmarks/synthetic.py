@@ -0,0 +1,84 @@
+import random
+
+COURSE_TYPES = ["חובה", "בחירה", "רוח", "בחירה התמחות סייבר", "חובה התמחות"]
+LECTURERS = ["ד\"ר ישראל ישראלי", "פרופ' שרה כהן", "מר דוד לוי", "גב' רחל אברהם", "ד\"ר משה פרץ"]
+ROOMS = ["ביה\"ס 101", "ביה\"ס 204", "ספריה 12", "מעבדה 3", "אודיטוריום"]
+SEMESTERS = ["א", "ב", "קיץ"]
+DAY_HOURS = ["08:30", "10:30", "12:30", "14:30", "16:30", "18:30"]
+NAME_WORDS = ["מבוא", "מבני", "נתונים", "אלגוריתמים", "מערכות", "הפעלה", "רשתות", "תקשורת", "למידת", "מכונה",
+              "בינה", "מלאכותית", "חשבון", "דיפרנציאלי", "אינטגרלי", "אלגברה", "לינארית", "הסתברות", "סטטיסטיקה",
+              "תכנות", "מונחה", "עצמים", "פיזיקה", "חשמל", "מגנטיות", "אבטחת", "מידע", "קומפילציה", "גרפיקה",
+              "ממוחשבת", "עיבוד", "תמונה", "אותות", "בקרה", "ג'אווה", "פרויקט", "גמר", "סמינר", "מתקדם", "יסודות"]
+
+
+def make_group(rng, course_code, lecture_type, index):
+    start = rng.randrange(len(DAY_HOURS) - 1)
+    return {
+        "groupCode": f"{course_code}-{index}/1" if lecture_type == 1 else f"{course_code}-{index}",
+        "lectureType": lecture_type,
+        "startTime": DAY_HOURS[start],
+        "endTime": DAY_HOURS[start + 1],
+        "room": rng.choice(ROOMS),
+        "lecturer": rng.choice(LECTURERS),
+        "dayOfWeek": rng.randrange(6),
+    }
+
+
+def make_department(department, n_courses, groups_per_course=4, first_code=10000, seed=0):
+    """
+    Build a department course list shaped like the JSON stored in DepartmentCourses.data.
+    """
+    rng = random.Random(seed)
+    courses = []
+    for i in range(n_courses):
+        real_code = str(first_code + i)
+        course_code = str(first_code * 10 + i)
+        groups = [make_group(rng, real_code, 0, g) for g in range(max(1, groups_per_course // 2))]
+        groups += [make_group(rng, real_code, 1, g) for g in range(groups_per_course - len(groups))]
+        courses.append({
+            "courseType": rng.choice(COURSE_TYPES),
+            "courseName": " ".join(rng.sample(NAME_WORDS, rng.randint(2, 4))) + f" {i % 7 + 1}",
+            "realCourseCode": real_code,
+            "courseCode": course_code,
+            "semester": rng.choice(SEMESTERS),
+            "department": department,
+            "courseCredit": str(rng.choice([2, 3, 3.5, 4, 5])),
+            "prerequisites": [],
+            "prerequisitesAlt": [],
+            "groups": groups,
+        })
+    return courses
+
+
+def make_catalog(n_courses=400, groups_per_course=4, seed=0):
+    """
+    A department catalog plus the two general departments, keyed by department name.
+    """
+    return {
+        "מדעי המחשב": make_department("מדעי המחשב", n_courses, groups_per_course, 10000, seed),
+        "אנגלית": make_department("אנגלית", max(1, n_courses // 20), groups_per_course, 70000, seed + 1),
+        "כללי": make_department("כללי", max(1, n_courses // 4), groups_per_course, 80000, seed + 2),
+    }
+
+
+def make_grade_page(n_courses, per_year=12, seed=0):
+    """
+    A Yedion grade list page (the markup the grade scraper reads) with `n_courses` course blocks.
+    """
+    rng = random.Random(seed)
+    years = []
+    for start in range(0, n_courses, per_year):
+        blocks = []
+        for i in range(start, min(start + per_year, n_courses)):
+            name = " ".join(rng.sample(NAME_WORDS, 2))
+            credits = rng.choice(["2", "3", "3.5", "4", "5"])
+            parts = [f'<div class="pagetitle InRange">{10000 + i} - {name}</div>',
+                     f'<div class="InRange">נ&quot;ז {credits} | ש"ס {rng.randint(2, 6)}</div>',
+                     '<div class="InRange">מועד א - בחינה</div>']
+            if rng.random() < 0.85:
+                parts.append(f"<div><strong>ציון: {rng.randint(40, 100)}</strong></div>")
+                parts.append('<div class="InRange">סופי-הרצאה</div>')
+            blocks.append(f'<div class="Father row">{"".join(parts)}</div>')
+        years.append(f'<details><summary><h3>שנה {start // per_year + 1}</h3></summary>{"".join(blocks)}</details>')
+    return ('<html dir="rtl"><body><div class="col-md-12 row NoPadding NoMarging">'
+            f'{"".join(years)}</div></body></html>')
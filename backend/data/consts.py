@@ -38,8 +38,12 @@ VALID_ENDPOINTS = {
     "/",
     "/auth/login",
     "/auth/signup",
+    "/auth/signup/",
     "/auth/signuplight",
+    "/auth/resync",
     "/auth/guest",
+    "/auth/me",
+    "/auth/metrics",
     "/courses",
     "/schedule/",
     "/schedule/student/",
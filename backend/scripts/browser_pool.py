@@ -0,0 +1,235 @@
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from ..app.core.logger import logger
+from ..app.core.metrics import latency_summary
+from ..app.core.config import (SCRAPER_BROWSER_POOL_SIZE, SCRAPER_DRIVER_MAX_USES, SCRAPER_ACQUIRE_TIMEOUT_SECONDS)
+
+
+class BrowserPoolTimeout(Exception):
+    """
+    No driver became free within the acquire timeout.
+    """
+
+
+def launch_chrome(profile_dir):
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    # Every pooled driver has its own throwaway profile, so students never share browser state between drivers
+    options.add_argument(f"--user-data-dir={profile_dir}")
+    return webdriver.Chrome(options=options)
+
+
+def reset_session(driver):
+    """
+    Leave `driver` as a fresh browser for the next student: one new blank tab, with cookies, cache and every
+    origin's storage cleared. Raises if the storage can't be cleared, so the pool recycles the driver instead.
+    """
+    # sessionStorage and history belong to the tab, so replace the tabs rather than reuse one
+    stale = driver.window_handles
+    driver.switch_to.new_window("tab")
+    fresh = driver.current_window_handle
+    for handle in stale:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(fresh)
+    # For every origin, unlike delete_all_cookies() which only sees the current page's domain. Storage type "all"
+    # covers localStorage, IndexedDB, Cache Storage and service workers; the HTTP cache is cleared separately
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": "*", "storageTypes": "all"})
+
+
+def is_healthy(driver):
+    try:
+        return driver.execute_script("return 1") == 1 and len(driver.window_handles) > 0
+    except Exception:
+        return False
+
+
+class PooledDriver:
+    __slots__ = ("driver", "profile_dir", "uses")
+
+    def __init__(self, driver, profile_dir):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    Up to `size` pre-launched headless drivers. A session borrows one, gets a reset browser, and returns it;
+    a driver is quit and replaced after `max_uses` sessions, a failed health check or any error in a session.
+    """
+
+    def __init__(self, size=SCRAPER_BROWSER_POOL_SIZE, max_uses=SCRAPER_DRIVER_MAX_USES,
+                 acquire_timeout=SCRAPER_ACQUIRE_TIMEOUT_SECONDS, launcher=launch_chrome, samples=256):
+        self.size = size
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self._launcher = launcher
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._total = 0  # idle + leased + being launched
+        self._leased = 0
+        self._launched = 0
+        self._recycled = 0
+        self._unhealthy = 0
+        self._timeouts = 0
+        self._closed = False
+        self._busy_seconds = 0.0
+        self._started = time.monotonic()
+        self._acquire_latencies = deque(maxlen=samples)
+
+    def _launch(self):
+        profile_dir = tempfile.mkdtemp(prefix="scraper-profile-")
+        try:
+            driver = self._launcher(profile_dir)
+        except Exception:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+        with self._cond:
+            self._launched += 1
+        return PooledDriver(driver, profile_dir)
+
+    def _discard(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Failed to quit pooled driver: {e}")
+        shutil.rmtree(pooled.profile_dir, ignore_errors=True)
+
+    def warm(self):
+        """
+        Launch drivers until the pool is full.
+        """
+        while True:
+            with self._cond:
+                if self._closed or self._total >= self.size:
+                    return
+                self._total += 1
+            try:
+                pooled = self._launch()
+            except Exception as e:
+                logger.error(f"Failed to pre-launch a pooled driver: {e}")
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                return
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while not self._idle and self._total >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise BrowserPoolTimeout(f"No browser free after {self.acquire_timeout}s")
+                self._cond.wait(remaining)
+            if self._idle:
+                pooled = self._idle.popleft()
+            else:
+                pooled = None
+                self._total += 1
+
+        if pooled is not None and not is_healthy(pooled.driver):
+            with self._cond:
+                self._unhealthy += 1
+            self._discard(pooled)
+            pooled = None
+        if pooled is None:
+            try:
+                pooled = self._launch()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+        return pooled
+
+    def _release(self, pooled, failed):
+        pooled.uses += 1
+        recycle = failed or pooled.uses >= self.max_uses
+        if not recycle:
+            try:
+                reset_session(pooled.driver)
+            except Exception as e:
+                logger.warning(f"Failed to reset pooled driver, recycling it: {e}")
+                recycle = True
+        if recycle:
+            self._discard(pooled)
+            with self._cond:
+                self._recycled += 1
+                self._total -= 1
+                self._cond.notify()
+            # Keep the pool warm for the next session
+            threading.Thread(target=self.warm, daemon=True).start()
+        else:
+            with self._cond:
+                closed = self._closed
+                if closed:
+                    self._total -= 1
+                else:
+                    self._idle.append(pooled)
+                    self._cond.notify()
+            if closed:
+                # Leased while close() quit the idle drivers, so nothing else will quit this one
+                self._discard(pooled)
+
+    @contextmanager
+    def session(self):
+        """
+        Borrow a driver for one student's scrape.
+        """
+        requested = time.perf_counter()
+        pooled = self._acquire()
+        acquired = time.perf_counter()
+        with self._cond:
+            self._leased += 1
+            self._acquire_latencies.append(acquired - requested)
+        failed = True
+        try:
+            yield pooled.driver
+            failed = False
+        finally:
+            with self._cond:
+                self._leased -= 1
+                self._busy_seconds += time.perf_counter() - acquired
+            self._release(pooled, failed)
+
+    def metrics(self):
+        with self._cond:
+            elapsed = time.monotonic() - self._started
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "inUse": self._leased,
+                "launched": self._launched,
+                "recycled": self._recycled,
+                "unhealthy": self._unhealthy,
+                "timeouts": self._timeouts,
+                # Share of the pool's capacity spent in sessions since it was created
+                "utilization": round(self._busy_seconds / (self.size * elapsed), 4) if elapsed > 0 else 0.0,
+                "acquireMs": latency_summary(sorted(self._acquire_latencies)),
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._total -= len(idle)
+        for pooled in idle:
+            self._discard(pooled)
+
+
+browser_pool = BrowserPool()
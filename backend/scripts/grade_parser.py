@@ -0,0 +1,140 @@
+import re
+import lxml.html
+from html import escape
+from lxml import etree
+from ..app.core.logger import logger
+
+VOID_ELEMENTS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+                           "source", "track", "wbr"))
+RAW_TEXT_ELEMENTS = frozenset(("script", "style"))
+
+# The grade list sits in the first div whose class attribute contains all of these (substring match, as the
+# XPath `contains(@class, ...)` the browser scraper used)
+MAIN_CONTAINER_CLASSES = ("col-md-12", "row", "NoPadding", "NoMarging")
+FINAL_GRADE_MARKER = "סופי-הרצאה"
+
+
+# Function to clean the grade value (get only the number after "ציון:")
+def clean_grade(grade_text_in):
+    match = re.search(r"ציון:\s*(\d+)", grade_text_in)
+    return match.group(1) if match else "N/A"  # Return "N/A" if not found
+
+
+def clean_nz(grade_text_in):
+    credits_pattern = r"נ\"ז (\d+(\.\d+)?)"
+    match = re.search(credits_pattern, grade_text_in)
+    return match.group(1) if match else "N/A"  # Return "N/A" if not found
+
+
+# Function to clean the course code (get only the number before the first non-digit character)
+def clean_code(code_text_in):
+    match = re.match(r"(\d+)", code_text_in)
+    return match.group(1) if match else "N/A"  # Return "N/A" if not found
+
+
+_utf8_parser = lxml.html.HTMLParser(encoding="utf-8")
+
+
+def parse_html(html):
+    """
+    The document tree of a page (text, as requests decoded it); an empty page is an empty document.
+    """
+    if not html.strip():
+        html = "<html></html>"
+    if html.lstrip().startswith("<?xml"):
+        # lxml refuses text that still declares its encoding, so hand it the bytes
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=_utf8_parser)
+    return lxml.html.document_fromstring(html)
+
+
+def has_class(name):
+    """
+    XPath test for a class token, what By.CLASS_NAME and a ".name" CSS selector match.
+    """
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# The browser scraper's queries, compiled once
+MAIN_CONTAINER = "//div[{}]".format(" and ".join(f"contains(@class, '{name}')" for name in MAIN_CONTAINER_CLASSES))
+_main_container = etree.XPath(f"({MAIN_CONTAINER})[1]")
+_details = etree.XPath(".//details")
+_summary_title = etree.XPath("(.//summary)[1]//h3")
+_fathers = etree.XPath(f".//*[{has_class('Father')}]")
+_in_ranges = etree.XPath(f".//*[{has_class('InRange')}]")
+_grade_strong = etree.XPath("(.//div[strong])[1]/strong[1]")
+_code_div = etree.XPath(f"(.//*[{has_class('pagetitle')} and {has_class('InRange')}])[1]")
+
+
+def _escape_text(text):
+    return escape(text or "", quote=False).replace("\xa0", "&nbsp;")
+
+
+def outer_html(element):
+    """
+    The element serialized the way a browser's outerHTML does.
+    """
+    if not isinstance(element.tag, str):
+        return f"<!--{element.text}-->" if element.tag is etree.Comment else ""
+    attrs = "".join(f' {name}="{_escape_text(value).replace(chr(34), "&quot;")}"'
+                    for name, value in element.attrib.items())
+    if element.tag in VOID_ELEMENTS:
+        return f"<{element.tag}{attrs}>"
+    return f"<{element.tag}{attrs}>{inner_html(element)}</{element.tag}>"
+
+
+def inner_html(element):
+    """
+    The element's content serialized the way a browser's innerHTML does.
+    """
+    raw = element.tag in RAW_TEXT_ELEMENTS
+    parts = [(element.text or "") if raw else _escape_text(element.text)]
+    for child in element:
+        parts.append(outer_html(child))
+        parts.append(_escape_text(child.tail))
+    return "".join(parts)
+
+
+class GradeListNotFound(Exception):
+    """
+    The page has no grade list container (not logged in, or the page layout changed).
+    """
+
+
+def parse_grade_list(html, username):
+    """
+    {"UserName": ..., "Courses": [{course_code: [grade, credits]}, ...]} from the grade list page, exactly
+    as the browser scraper reads it: every <details> with a summary title, every "Father" block in it, and
+    for each "InRange" part marked סופי-הרצאה the block's grade, course code and the credits seen so far.
+    """
+    containers = _main_container(parse_html(html))
+    if not containers:
+        raise GradeListNotFound("Failed to locate the main container")
+
+    details_list = _details(containers[0])
+    logger.info(f"Found {len(details_list)} <details> elements.")
+
+    results = {"UserName": username, "Courses": []}
+    for details in details_list:
+        if not _summary_title(details):
+            continue  # the browser scraper skipped a <details> without a title
+
+        for father in _fathers(details):
+            nz_grade = ''
+            for inrange in _in_ranges(father):
+                inrange_text = inner_html(inrange).strip()
+                nz_temp = clean_nz(inrange_text)
+                if nz_temp != "N/A":
+                    nz_grade = nz_temp
+                if FINAL_GRADE_MARKER not in inrange_text:
+                    continue
+
+                strong = _grade_strong(father)
+                code_div = _code_div(father)
+                if not strong or not code_div:
+                    logger.debug("      Warning: <strong> element not found")
+                    continue
+                grade = clean_grade(inner_html(strong[0]).strip())
+                code = clean_code(inner_html(code_div[0]).strip())
+                results["Courses"].append({code: [grade, nz_grade]})
+                logger.info(f"      Extracted course: {code} | Grade: {grade}")
+    return results
@@ -0,0 +1,161 @@
+import itertools
+import re
+import requests
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ..app.core.logger import logger
+from ..app.core.config import (AFEKA_SSO_LOGIN_URL, YEDION_URL, GRADE_FETCHER_TIMEOUT_SECONDS,
+                               SIGNUP_SCRAPER_WORKERS)
+from .grade_parser import parse_html, parse_grade_list
+
+GRADES_MENU_TEXT = "רשימת ציונים"
+YEDION_RESOURCE_ID = "/Common/Yedion"
+ALL_YEARS, YEARLY = "-1", "0"  # R1C1 כל השנים, R1C2 שנתי
+
+
+class _SharedAdapter(HTTPAdapter):
+    """
+    Mounted on every student's Session; closing a Session leaves the shared connection pool open.
+    """
+
+    def close(self):
+        pass
+
+
+# One connection pool shared by every student session (kept-alive TLS connections to the SSO and Yedion
+# hosts); cookies stay per student because each fetch gets its own Session
+_adapter = _SharedAdapter(pool_connections=4, pool_maxsize=max(4, SIGNUP_SCRAPER_WORKERS * 2),
+                          max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.3,
+                                            allowed_methods=frozenset(("GET",))))
+
+
+class GradeFetchError(Exception):
+    """
+    The SSO login or the Yedion navigation did not go as expected.
+    """
+
+
+def _prepare_session(session):
+    session.mount("https://", _adapter)
+    session.mount("http://", _adapter)
+    session.headers["User-Agent"] = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                                     "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+
+def _first(elements):
+    return elements[0] if elements else None
+
+
+def form_fields(form):
+    """
+    The name/value pairs a browser would submit for `form` (without any submit button).
+    """
+    fields = {}
+    for element in form.inputs:
+        if not element.name or element.get("disabled") is not None:
+            continue
+        if element.tag == "input":
+            if element.type in ("submit", "button", "image", "reset", "file"):
+                continue
+            if element.checkable and not element.checked:
+                continue
+            fields[element.name] = element.value or ""
+        elif element.value is not None:  # a select without options submits nothing
+            fields[element.name] = element.value
+    return fields
+
+
+def _submit(session, page_url, form, fields):
+    action = urljoin(page_url, form.get("action") or page_url)
+    if (form.get("method") or "get").lower() == "post":
+        response = session.post(action, data=fields, timeout=GRADE_FETCHER_TIMEOUT_SECONDS)
+    else:
+        response = session.get(action, params=fields, timeout=GRADE_FETCHER_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response
+
+
+def _get(session, url):
+    response = session.get(url, timeout=GRADE_FETCHER_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response
+
+
+def _enclosing_form(document, field_xpath):
+    return _first(document.xpath(f"({field_xpath})[1]/ancestor::form[1]"))
+
+
+def _link_target(element):
+    """
+    The URL an element (or the link around it) navigates to.
+    """
+    if element is None:
+        return None
+    for node in itertools.chain((element,), element.iterancestors()):
+        href = node.get("href")
+        if href and not href.lower().startswith("javascript:"):
+            return href
+        onclick = node.get("onclick") or ""
+        match = re.search(r"""['"]((?:https?:)?/[^'"]+)['"]""", onclick)
+        if match:
+            return match.group(1)
+    return None
+
+
+def _login(session, username, password, login_url):
+    logger.info("Opening login page...")
+    page = _get(session, login_url)
+    form = _enclosing_form(parse_html(page.text), "//input[@name='username']")
+    if form is None:
+        raise GradeFetchError("Login form not found")
+
+    fields = form_fields(form)
+    fields.update(username=username, password=password)
+    submit = _first(form.xpath(".//input[@value='כניסה' and @name]"))
+    if submit is not None:
+        fields[submit.get("name")] = submit.get("value")
+
+    logger.info("Submitting login form...")
+    response = _submit(session, page.url, form, fields)
+    document = parse_html(response.text)
+    if document.xpath("//input[@name='password']"):
+        raise GradeFetchError("Login failed")
+    logger.info("Logged in successfully!")
+    return response, document
+
+
+def fetch_student_grades(username, password, login_url=AFEKA_SSO_LOGIN_URL, yedion_url=YEDION_URL):
+    """
+    What scrape_student_grades returns, fetched with plain HTTP requests instead of a browser:
+    SSO form login, the Yedion resource, the grade list menu and its all-years form.
+    """
+    with requests.Session() as session:
+        _prepare_session(session)
+        webtop, document = _login(session, username, password, login_url)
+
+        logger.info("Opening Afeka-Net...")
+        target = yedion_url or _link_target(_first(document.xpath("//*[@id=$id]", id=YEDION_RESOURCE_ID)))
+        if not target:
+            raise GradeFetchError("Afeka-Net link not found")
+        yedion = _get(session, urljoin(webtop.url, target))
+
+        logger.info("Opening grade list...")
+        menu = _first(parse_html(yedion.text).xpath("//a[contains(., $text)]", text=GRADES_MENU_TEXT))
+        target = _link_target(menu)
+        if not target:
+            raise GradeFetchError("Grade list menu item not found")
+        grades_form_page = _get(session, urljoin(yedion.url, target))
+
+        form = _enclosing_form(parse_html(grades_form_page.text), "//*[@id='R1C1']")
+        if form is None:
+            raise GradeFetchError("Grade list filter form not found")
+        fields = form_fields(form)
+        for select_id, value in (("R1C1", ALL_YEARS), ("R1C2", YEARLY)):
+            select = _first(form.xpath(".//*[@id=$id]", id=select_id))
+            if select is not None:
+                fields[select.get("name") or select_id] = value
+
+        logger.info("Loading all years...")
+        grades = _submit(session, grades_form_page.url, form, fields)
+        return parse_grade_list(grades.text, username)
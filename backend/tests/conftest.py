@@ -1,3 +1,4 @@
+import copy
 import pytest
 import asyncio
 from fastapi.testclient import TestClient
@@ -7,6 +8,9 @@ from sqlalchemy.pool import StaticPool
 from backend.app.main import app
 from backend.app.db.models import Base
 from backend.app.api.auth import get_db
+from backend.app.core import cache
+from backend.app.core.catalog import CourseCatalog
+from backend.app.core.schedule_cache import schedule_cache
 
 # Test database - using SQLite for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -35,6 +39,13 @@ def test_db():
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture
+def db_session(test_db):
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+
+
 @pytest.fixture
 def client(test_db):
     # Override the database dependency
@@ -45,10 +56,106 @@ def client(test_db):
 
     # Clean up after each test
     app.dependency_overrides.clear()
+    schedule_cache.clear()
 
 
 @pytest.fixture(scope="session")
 def event_loop():
     loop = asyncio.get_event_loop_policy().new_event_loop()
     yield loop
-    loop.close()
\ No newline at end of file
+    loop.close()
+
+SAMPLE_COURSES = {
+    "מדעי המחשב": [
+        {
+            "courseType": "חובה",
+            "courseName": "מבני נתונים",
+            "realCourseCode": "10120",
+            "courseCode": "2001",
+            "semester": "א",
+            "department": "מדעי המחשב",
+            "courseCredit": "4",
+            "prerequisites": [],
+            "prerequisitesAlt": [],
+            "groups": [
+                {"groupCode": "10120-1", "lectureType": 0, "startTime": "08:30", "endTime": "10:30",
+                 "room": "101", "lecturer": "ד\"ר כהן", "dayOfWeek": 0},
+                {"groupCode": "10120-1/1", "lectureType": 1, "startTime": "10:30", "endTime": "12:30",
+                 "room": "204", "lecturer": "מר לוי", "dayOfWeek": 2},
+            ],
+        },
+        {
+            "courseType": "בחירה",
+            "courseName": "למידת מכונה",
+            "realCourseCode": "10350",
+            "courseCode": "2002",
+            "semester": "ב",
+            "department": "מדעי המחשב",
+            "courseCredit": "3",
+            "prerequisites": [],
+            "prerequisitesAlt": [],
+            "groups": [
+                {"groupCode": "10350-1", "lectureType": 0, "startTime": "09:30", "endTime": "12:30",
+                 "room": "101", "lecturer": "פרופ' שרה", "dayOfWeek": 0},
+            ],
+        },
+    ],
+    "אנגלית": [
+        {
+            "courseType": "אנגלית",
+            "courseName": "אנגלית מתקדמים",
+            "realCourseCode": "70001",
+            "courseCode": "3001",
+            "semester": "א",
+            "department": "אנגלית",
+            "courseCredit": "0",
+            "prerequisites": [],
+            "prerequisitesAlt": [],
+            "groups": [
+                {"groupCode": "70001-1", "lectureType": 0, "startTime": "12:30", "endTime": "14:30",
+                 "room": "12", "lecturer": "Ms. Smith", "dayOfWeek": 1},
+            ],
+        },
+    ],
+    "כללי": [
+        {
+            "courseType": "רוח",
+            "courseName": "פילוסופיה",
+            "realCourseCode": "80001",
+            "courseCode": "4001",
+            "semester": "א",
+            "department": "כללי",
+            "courseCredit": "2",
+            "prerequisites": [],
+            "prerequisitesAlt": [],
+            "groups": [
+                {"groupCode": "80001-1", "lectureType": 0, "startTime": "16:30", "endTime": "18:30",
+                 "room": "5", "lecturer": "ד\"ר פרץ", "dayOfWeek": 3},
+            ],
+        },
+    ],
+}
+
+
+@pytest.fixture
+def sample_courses():
+    return copy.deepcopy(SAMPLE_COURSES)
+
+
+@pytest.fixture
+def catalog_db(test_db, monkeypatch):
+    # Point the catalog loader at the test database
+    monkeypatch.setattr(cache, "SessionLocal", TestingSessionLocal)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    cache.set_catalog(CourseCatalog())
+
+
+@pytest.fixture
+def course_catalog(client, sample_courses):
+    # Replace whatever the lifespan loaded with a small known catalog
+    catalog = CourseCatalog.from_data(sample_courses)
+    cache.set_catalog(catalog)
+    yield catalog
+    cache.set_catalog(CourseCatalog())
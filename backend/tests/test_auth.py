@@ -1,7 +1,24 @@
-from fastapi import HTTPException
+import threading
+import time
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
 from unittest.mock import patch
+from sqlalchemy import event
+from backend.app.core import cache
+from backend.app.core.catalog import CourseCatalog
+from backend.app.core.jobs import JobQueue, JobQueueFull, scraper_jobs
+from backend.app.core.progress import summarize_courses
+
+
+
+def run_signup(client, signup_data):
+    """POST /auth/signup, wait for its job and return the poll response"""
+    response = client.post("/auth/signup", json=signup_data)
+    assert response.status_code == 202
+    job_id = response.json()["jobId"]
+    assert scraper_jobs.wait(job_id, timeout=30).done.is_set()
+    return client.get(f"/auth/signup/{job_id}")
 
 
 class TestGuestAccess:
@@ -162,7 +179,7 @@ class TestRegularSignup:
             "department": "מדעי המחשב"
         }
 
-        response = client.post("/auth/signup", json=signup_data)
+        response = run_signup(client, signup_data)
         assert response.status_code == 401
         data = response.json()
         assert "afeka credentials" in data["detail"].lower()
@@ -252,6 +269,116 @@ class TestLogin:
         assert response.status_code == 422
 
 
+class TestLoginWithCatalog:
+    """Test that login resolves student courses through the catalog"""
+
+    def test_login_credits_from_catalog(self, client: TestClient, course_catalog, db_session):
+        """Completed and enrolled courses are matched and summed"""
+        from backend.app.db.models import Student, StudentCourse
+
+        signup_data = {"username": "Catalog.User", "password": "catalogpass", "department": "מדעי המחשב"}
+        assert client.post("/auth/signuplight", json=signup_data).status_code == 200
+
+        student = db_session.query(Student).filter_by(username="Catalog.User").one()
+        db_session.add_all([
+            StudentCourse(student_id=student.id, course_code="10120", group_code="AUTO-10120", lecture_type=1, grade=90),
+            StudentCourse(student_id=student.id, course_code="80001", group_code="AUTO-80001", lecture_type=1, grade=80),
+            StudentCourse(student_id=student.id, course_code="10350", group_code="AUTO-10350", lecture_type=1),
+        ])
+        db_session.commit()
+
+        response = client.post("/auth/login", json={"username": "Catalog.User", "password": "catalogpass"})
+        assert response.status_code == 200
+        user = response.json()["user"]
+        assert [c["courseId"] for c in user["completedCourses"]] == ["10120", "80001"]
+        assert user["enrolledCourses"][0]["courseCode"] == "2002"
+        assert user["credits"]["enrolled"] == 3
+        assert user["remainingRequirements"] == {"general": 2, "elective": 0, "mandatory": 4}
+
+    def _signup_with_courses(self, client, db_session, username):
+        from backend.app.db.models import Student, StudentCourse
+
+        signup_data = {"username": username, "password": "querypass", "department": "מדעי המחשב"}
+        assert client.post("/auth/signuplight", json=signup_data).status_code == 200
+        student = db_session.query(Student).filter_by(username=username).one()
+        db_session.add_all([
+            StudentCourse(student_id=student.id, course_code="10120", group_code="AUTO-10120", lecture_type=1, grade=90),
+            StudentCourse(student_id=student.id, course_code="10350", group_code="AUTO-10350", lecture_type=1),
+        ])
+        db_session.commit()
+        return student
+
+    def _login_statements(self, client, db_session, username):
+        engine = db_session.get_bind()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.post("/auth/login", json={"username": username, "password": "querypass"})
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 200
+        return response.json()["user"], statements
+
+    def test_login_is_one_query(self, client: TestClient, course_catalog, db_session):
+        """With a current progress summary, a login is a single SELECT"""
+        self._signup_with_courses(client, db_session, "Query.User")
+
+        # The courses changed after signup, so the first login recomputes and stores the summary
+        user, statements = self._login_statements(client, db_session, "Query.User")
+        assert len(user["completedCourses"]) == 1
+        assert len(user["enrolledCourses"]) == 1
+        assert len(statements) > 1
+
+        user, statements = self._login_statements(client, db_session, "Query.User")
+        assert len(user["completedCourses"]) == 1
+        assert len(user["enrolledCourses"]) == 1
+        assert user["credits"]["enrolled"] == 3
+        assert len(statements) == 1
+        assert statements[0].lstrip().upper().startswith("SELECT")
+
+    def test_login_reads_stored_progress(self, client: TestClient, course_catalog, db_session):
+        """The summary is recomputed only after the student's courses or the catalog change"""
+        from backend.app.db.models import StudentCourse
+
+        student = self._signup_with_courses(client, db_session, "Progress.User")
+        client.post("/auth/login", json={"username": "Progress.User", "password": "querypass"})
+
+        with patch("backend.app.core.progress.summarize_courses") as summarize:
+            client.post("/auth/login", json={"username": "Progress.User", "password": "querypass"})
+        summarize.assert_not_called()
+
+        # A course change marks the summary stale
+        course = db_session.query(StudentCourse).filter_by(student_id=student.id, group_code="AUTO-10350").one()
+        course.grade = 75
+        db_session.commit()
+        user, _ = self._login_statements(client, db_session, "Progress.User")
+        assert [c["courseId"] for c in user["completedCourses"]] == ["10120", "10350"]
+        assert user["remainingRequirements"] == {"general": 0, "elective": 3, "mandatory": 4}
+
+        # So does a new catalog version for departments without updated_at
+        catalog = CourseCatalog(course_catalog.departments, course_catalog.version + 1)
+        cache.set_catalog(catalog)
+        with patch("backend.app.core.progress.summarize_courses", wraps=summarize_courses) as summarize:
+            client.post("/auth/login", json={"username": "Progress.User", "password": "querypass"})
+            client.post("/auth/login", json={"username": "Progress.User", "password": "querypass"})
+        assert summarize.call_count == 1
+
+    def test_signuplight_does_not_verify_again(self, client: TestClient, course_catalog):
+        """The login payload after signup is built without another bcrypt verify"""
+        signup_data = {"username": "Fresh.User", "password": "freshpass", "department": "מדעי המחשב"}
+        with patch("backend.app.api.auth.verify_password") as verify:
+            response = client.post("/auth/signuplight", json=signup_data)
+
+        assert response.status_code == 200
+        assert response.json()["user"]["username"] == "Fresh.User"
+        assert response.json()["user"]["completedCourses"] == []
+        verify.assert_not_called()
+
+
 class TestPasswordSecurity:
     """Test password hashing and security"""
 
@@ -412,22 +539,21 @@ class TestErrorHandling:
         """Test signup when save_user succeeds but auto-login fails"""
         mock_save_user.return_value = {"success": True}
 
-        # Use an invalid username format that would cause login to fail
         signup_data = {
             "username": "Valid.User",
             "password": "validpass123",
             "department": "מדעי המחשב"
         }
 
-        # Mock the login to fail
-        with patch('backend.app.api.auth.login') as mock_login:
-            mock_login.side_effect = HTTPException(status_code=401, detail="Login failed")
-
-            response = client.post("/auth/signup", json=signup_data)
+        # The saved student can't be read back, so the automatic login fails
+        with patch('backend.app.api.auth._get_student', return_value=None) as mock_get_student:
+            response = run_signup(client, signup_data)
             assert response.status_code == 200
             data = response.json()
             assert data["status"] == "partial"
             assert "manual" in data["message"].lower()
+            assert "user" not in data
+        mock_get_student.assert_called_once()
 
     @patch('backend.app.api.auth.save_user')
     def test_signup_save_user_failure(self, mock_save_user, client: TestClient):
@@ -441,7 +567,376 @@ class TestErrorHandling:
             "department": "מדעי המחשב"
         }
 
-        response = client.post("/auth/signup", json=signup_data)
+        response = run_signup(client, signup_data)
         assert response.status_code == 401
         data = response.json()
         assert "afeka credentials" in data["detail"].lower()
+
+
+class TestPasswordHashing:
+    """Test the bounded bcrypt executor"""
+
+    @contextmanager
+    def _occupied(self, hasher, count):
+        """Keep `count` jobs running or queued until the block exits"""
+        release = threading.Event()
+        threads = [threading.Thread(target=hasher._run, args=(release.wait,)) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        try:
+            running = min(count, hasher.workers)
+            while (hasher.metrics()["running"], hasher.metrics()["queueDepth"]) != (running, count - running):
+                time.sleep(0.01)
+            yield
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+
+    def test_queue_is_bounded(self):
+        """Jobs beyond workers + queue are rejected immediately"""
+        from backend.app.core.hashing import PasswordHasher, PasswordHasherBusy
+        hasher = PasswordHasher(workers=1, max_queue=1)
+        with self._occupied(hasher, 2):
+            with pytest.raises(PasswordHasherBusy) as busy:
+                hasher.hash("password")
+            assert busy.value.retry_after >= 1
+            metrics = hasher.metrics()
+            assert (metrics["running"], metrics["queueDepth"], metrics["rejected"]) == (1, 1, 1)
+
+        assert hasher.verify("password", hasher.hash("password")) is True
+        assert hasher.metrics()["completed"] == 4
+        hasher.shutdown()
+
+    def test_busy_returns_503(self, client: TestClient, monkeypatch):
+        """A full hashing queue answers 503 with Retry-After instead of waiting"""
+        from backend.app.core import hashing
+        hasher = hashing.PasswordHasher(workers=1, max_queue=0)
+        monkeypatch.setattr(hashing, "password_hasher", hasher)
+
+        signup_data = {"username": "Busy.User", "password": "busypass123", "department": "מדעי המחשב"}
+        with self._occupied(hasher, 1):
+            response = client.post("/auth/signuplight", json=signup_data)
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        hasher.shutdown()
+
+    def test_metrics_endpoint(self, client: TestClient):
+        """Queue depth and latency are exposed"""
+        from backend.app.core.hashing import hash_password
+        hash_password("password")
+        metrics = client.get("/auth/metrics").json()
+        assert metrics["completed"] >= 1
+        assert metrics["queueDepth"] == 0
+        assert metrics["hashMs"]["max"] > 0
+        assert set(metrics["queueWaitMs"]) == {"avg", "p50", "p95", "max"}
+
+
+class TestSaveUser:
+    """Test persisting a scraped student"""
+
+    SCRAPED = {"Courses": [{"10120": ["90", "4"]}, {"10350": ["N/A", "3"]}, {"10144": ["70", "2"]}],
+               "GPA": 84.67, "CompletedCredits": 6}
+
+    def _save_statements(self, user):
+        from sqlalchemy import event
+        from backend.app.db.db import engine
+        from backend.app.core.helper import save_user_to_db
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.lstrip().split()[0].upper())
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            result = save_user_to_db(user, self.SCRAPED)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        return result, statements
+
+    def test_save_is_three_inserts(self, test_db, db_session):
+        """The student, all of their courses and their progress are three INSERTs in one transaction"""
+        from backend.app.db.models import Student
+
+        user = {"username": "Bulk.Student", "password": "bulkpass123", "department": "מדעי המחשב"}
+        result, statements = self._save_statements(user)
+        assert result["success"]
+        assert statements == ["INSERT", "INSERT", "INSERT"]
+
+        student = db_session.query(Student).filter(Student.username == "Bulk.Student").one()
+        assert student.id == result["user_id"]
+        assert sorted(c.course_code for c in student.courses) == ["10120", "10144", "10350"]
+        assert student.completedCredits == 6
+        assert student.progress is not None
+
+    def test_existing_username_is_not_overwritten(self, test_db, db_session):
+        """A taken username stops at the first INSERT and leaves the stored student untouched"""
+        from backend.app.db.models import Student
+
+        user = {"username": "Taken.Student", "password": "takenpass123", "department": "מדעי המחשב"}
+        assert self._save_statements(user)[0]["success"]
+
+        result, statements = self._save_statements({**user, "password": "otherpass123"})
+        assert result == {"success": False, "error": "Username already exists"}
+        assert statements == ["INSERT"]
+        student = db_session.query(Student).filter(Student.username == "Taken.Student").one()
+        assert len(student.courses) == 3
+
+    def test_existing_username_skips_the_scrape(self, test_db):
+        """save_user checks the username before running the scraper"""
+        from backend.app.core.helper import save_user
+
+        user = {"username": "Scraped.Student", "password": "scrapepass123", "department": "מדעי המחשב"}
+        assert self._save_statements(user)[0]["success"]
+        with patch('backend.app.core.helper.run_web_scraper') as scraper:
+            assert save_user(user) == {"success": False, "error": "Username already exists"}
+        assert not scraper.called
+
+    def test_plain_insert_on_other_dialects(self, test_db):
+        """Without ON CONFLICT support the unique constraint refuses a taken username"""
+        from backend.app.db.db import engine
+
+        user = {"username": "Plain.Student", "password": "plainpass123", "department": "מדעי המחשב"}
+        with patch.object(engine.dialect, "name", "mysql"):
+            assert self._save_statements(user)[0]["success"]
+            result, _ = self._save_statements(user)
+        assert result == {"success": False, "error": "Username already exists"}
+
+
+class TestSignupJobs:
+    """Test scraper signups running as polled background jobs"""
+
+    @patch('backend.app.api.auth.save_user')
+    def test_signup_job_returns_login_payload(self, mock_save_user, client: TestClient, course_catalog):
+        """The job saves the scraped student and its result is the login payload"""
+        from backend.app.core.helper import save_user_to_db
+
+        scraped = {"Courses": [{"10120": ["90", "4"]}, {"10350": ["N/A", "3"]}], "GPA": 90, "CompletedCredits": 4}
+        mock_save_user.side_effect = lambda user: save_user_to_db(user, scraped)
+
+        signup_data = {"username": "Job.Student", "password": "jobpass123", "department": "מדעי המחשב"}
+        response = run_signup(client, signup_data)
+        assert response.status_code == 200
+        user = response.json()["user"]
+        assert user["username"] == "Job.Student"
+        assert [c["courseId"] for c in user["completedCourses"]] == ["10120"]
+        assert user["credits"]["enrolled"] == 3
+
+    @patch('backend.app.api.auth.save_user')
+    def test_taken_username_is_refused_up_front(self, mock_save_user, client: TestClient, db_session):
+        """A signup for an existing username is a 400 before any job is queued"""
+        from backend.app.db.models import Student
+
+        db_session.add(Student(username="Taken.Signup", password="x", name="Taken", department="מדעי המחשב"))
+        db_session.commit()
+        signup_data = {"username": "Taken.Signup", "password": "takenpass123", "department": "מדעי המחשב"}
+        response = client.post("/auth/signup", json=signup_data)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Username already taken"
+        assert not mock_save_user.called
+
+    def test_unknown_job(self, client: TestClient):
+        """Unknown or expired job ids are 404"""
+        response = client.get("/auth/signup/doesnotexist")
+        assert response.status_code == 404
+
+    @patch('backend.app.api.auth.save_user')
+    def test_pending_job_and_duplicate(self, mock_save_user, client: TestClient):
+        """A pending job reports its status, and a second signup for the same user is refused"""
+        release = threading.Event()
+        mock_save_user.side_effect = lambda user: release.wait(10) and {"success": False}
+        signup_data = {"username": "Slow.Student", "password": "slowpass123", "department": "מדעי המחשב"}
+        try:
+            response = client.post("/auth/signup", json=signup_data)
+            assert response.status_code == 202
+            job_id = response.json()["jobId"]
+
+            status = client.get(f"/auth/signup/{job_id}")
+            assert status.status_code == 200
+            assert status.json()["status"] in ("queued", "running")
+
+            assert client.post("/auth/signup", json=signup_data).status_code == 409
+        finally:
+            release.set()
+        scraper_jobs.wait(job_id, timeout=10)
+        assert client.get(f"/auth/signup/{job_id}").status_code == 401
+
+    def test_workers_cap_concurrency(self):
+        """No more than `workers` jobs run at once; beyond the queue, submit fails fast"""
+        queue = JobQueue(workers=1, max_queue=1, ttl=60, name="test-signup")
+        release = threading.Event()
+        try:
+            first = queue.submit("a", release.wait, 10)
+            second = queue.submit("b", release.wait, 10)
+            deadline = time.monotonic() + 5
+            while first.status != "running" and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert first.status == "running"
+            assert second.status == "queued"
+            with pytest.raises(JobQueueFull) as exc:
+                queue.submit("c", release.wait, 10)
+            assert exc.value.retry_after >= 1
+        finally:
+            release.set()
+        assert queue.wait(second.id, timeout=10).status == "done"
+        queue.shutdown()
+
+    def test_finished_jobs_expire(self):
+        """Results are dropped `ttl` seconds after the job finished"""
+        queue = JobQueue(workers=1, max_queue=1, ttl=0, name="test-signup")
+        job = queue.submit("a", lambda: {"status": "success"})
+        job.done.wait(5)
+        time.sleep(0.01)
+        assert queue.get(job.id) is None
+        queue.shutdown()
+
+
+class TestGradeResync:
+    """Test re-scraping a student's grades and applying only the differences"""
+
+    SCRAPED = {"Courses": [{"10120": ["90", "4"]}, {"10350": ["N/A", "3"]}, {"10144": ["70", "2"]}]}
+
+    def _signup(self, client: TestClient, username="Resync.Student"):
+        from backend.app.core.helper import save_user_to_db
+
+        signup_data = {"username": username, "password": "resyncpass123", "department": "מדעי המחשב"}
+        with patch('backend.app.api.auth.save_user',
+                   side_effect=lambda user: save_user_to_db(user, self.SCRAPED)):
+            assert run_signup(client, signup_data).status_code == 200
+        return signup_data
+
+    def _resync(self, client: TestClient, credentials, scraped):
+        with patch('backend.app.core.helper.get_grade_fetcher', return_value=lambda username, password: scraped):
+            response = client.post("/auth/resync", json={"username": credentials["username"],
+                                                          "password": credentials["password"]})
+            assert response.status_code == 202
+            job_id = response.json()["jobId"]
+            scraper_jobs.wait(job_id, timeout=30)
+        return client.get(f"/auth/resync/{job_id}")
+
+    def test_diff_courses(self):
+        """Only new, changed and vanished courses show up in the diff"""
+        from types import SimpleNamespace
+        from backend.app.core.helper import diff_courses
+
+        existing = {"1": SimpleNamespace(grade=90.0, credits=4.0), "2": SimpleNamespace(grade=None, credits=3.0),
+                    "3": SimpleNamespace(grade=70.0, credits=2.0)}
+        fresh = {"1": ["90", "4"], "2": ["85", "3"], "4": ["N/A", "2"], "5": ["80", "x"]}
+        inserts, updates, deletes = diff_courses(existing, fresh)
+        assert inserts == {"4": (None, 2.0)}
+        assert updates == {"2": (85.0, 3.0)}
+        assert deletes == ["3"]
+
+    def test_resync_applies_changes(self, client: TestClient, course_catalog, db_session):
+        """Changed courses are written, GPA/credits move by the difference and the progress summary follows"""
+        from backend.app.db.models import Student
+
+        credentials = self._signup(client)
+        scraped = {"Courses": [{"10120": ["90", "4"]}, {"10350": ["80", "3"]}, {"10220": ["N/A", "5"]}]}
+        response = self._resync(client, credentials, scraped)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["changes"] == {"inserted": 1, "updated": 1, "deleted": 1}
+        assert sorted(c["courseId"] for c in body["user"]["completedCourses"]) == ["10120", "10350"]
+
+        student = db_session.query(Student).filter(Student.username == credentials["username"]).one()
+        assert {c.course_code: c.grade for c in student.courses} == {"10120": 90.0, "10350": 80.0, "10220": None}
+        assert student.completedCredits == 7
+        assert student.gpa == round((90 * 4 + 80 * 3) / 7, 2)
+
+        # Nothing changed: nothing is written
+        response = self._resync(client, credentials, scraped)
+        assert response.json()["changes"] == {"inserted": 0, "updated": 0, "deleted": 0}
+
+    def test_resync_student_gone(self, client: TestClient, course_catalog):
+        """A student deleted while the job waited fails the job with 401, not a 500"""
+        credentials = self._signup(client, "Resync.Gone")
+        with patch('backend.app.api.auth._get_student', return_value=None):
+            response = self._resync(client, credentials, self.SCRAPED)
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Invalid username or password"
+
+    def test_resync_wrong_password(self, client: TestClient, course_catalog):
+        """The account password is checked before any scraping is queued"""
+        credentials = self._signup(client, "Resync.Wrong")
+        response = client.post("/auth/resync", json={"username": credentials["username"], "password": "nope12345"})
+        assert response.status_code == 401
+
+    def test_resync_scraper_failure(self, client: TestClient, course_catalog):
+        """A failed scrape leaves the stored courses as they were and reports the credential error"""
+        credentials = self._signup(client, "Resync.Failure")
+
+        def failing_fetcher(username, password):
+            raise RuntimeError("Login failed")
+
+        with patch('backend.app.core.helper.get_grade_fetcher', return_value=failing_fetcher):
+            job_id = client.post("/auth/resync", json=credentials).json()["jobId"]
+            scraper_jobs.wait(job_id, timeout=30)
+        assert client.get(f"/auth/resync/{job_id}").status_code == 401
+
+
+class TestSessionTokens:
+    """Test the signed session tokens handed out at login"""
+
+    def _login(self, client: TestClient, username="Token.User"):
+        signup_data = {"username": username, "password": "tokenpass123", "department": "מדעי המחשב"}
+        response = client.post("/auth/signuplight", json=signup_data)
+        assert response.status_code == 200
+        return response.json()
+
+    def test_token_round_trip(self):
+        """A token names its student until it expires; tampering or expiry make it invalid"""
+        from backend.app.core.tokens import issue_token, verify_token
+
+        token = issue_token(42, ttl=60, now=1000)
+        assert verify_token(token, now=1030) == 42
+        assert verify_token(token, now=1061) is None
+
+        payload, signature = token.split(".")
+        forged = issue_token(43, ttl=60, now=1000).split(".")[0]
+        assert verify_token(f"{forged}.{signature}", now=1030) is None
+        assert verify_token(payload, now=1030) is None
+        assert verify_token("", now=1030) is None
+
+    def test_me_returns_login_payload_without_bcrypt(self, client: TestClient, course_catalog):
+        """GET /auth/me answers from the token alone, without verifying a password"""
+        login = self._login(client)
+        assert login["token"]
+
+        with patch('backend.app.api.auth.verify_password') as verify:
+            response = client.get("/auth/me", headers={"Authorization": f"Bearer {login['token']}"})
+        assert response.status_code == 200
+        assert not verify.called
+        assert response.json()["user"] == login["user"]
+
+    def test_me_requires_valid_token(self, client: TestClient):
+        """Missing, malformed or forged tokens are 401"""
+        assert client.get("/auth/me").status_code == 401
+        assert client.get("/auth/me", headers={"Authorization": "Bearer nope"}).status_code == 401
+        assert client.get("/auth/me", headers={"Authorization": "Basic abc"}).status_code == 401
+
+    def test_schedules_use_token(self, client: TestClient, course_catalog):
+        """Schedules are saved, listed and deleted for the token's student"""
+        owner = self._login(client, "Schedule.Owner")
+        other = self._login(client, "Schedule.Other")
+        headers = {"Authorization": f"Bearer {owner['token']}"}
+        schedule = {"schedule_name": "Mine", "schedule_data": [{"courseCode": "10120", "groups": ["1"]}]}
+
+        response = client.post("/schedule", json=schedule, headers=headers)
+        assert response.status_code == 200
+        share_code = response.json()["share_code"]
+        assert str(response.json()["student_id"]) == owner["user"]["id"]
+
+        mine = client.get("/schedule/student/me", headers=headers)
+        assert [s["share_code"] for s in mine.json()] == [share_code]
+
+        # A token only acts for its own student
+        other_headers = {"Authorization": f"Bearer {other['token']}"}
+        assert client.post("/schedule", json={**schedule, "student_id": int(owner["user"]["id"])},
+                           headers=other_headers).status_code == 403
+        assert client.delete(f"/schedule/{share_code}", headers=other_headers).status_code == 403
+        assert client.delete(f"/schedule/{share_code}", headers=headers).status_code == 200
+
+        # Without a token or a student id there is nobody to save for
+        assert client.post("/schedule", json=schedule).status_code == 401
@@ -0,0 +1,604 @@
+import threading
+import time
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from backend.app.core import cache
+from backend.app.core.catalog import CourseCatalog, DepartmentCatalog, LazyCourseCatalog
+from backend.app.db.models import DepartmentCourses
+
+
+class TestGetCourses:
+    """Test the pre-serialized /courses endpoint"""
+
+    def test_department_with_general_courses(self, client: TestClient, course_catalog):
+        """Department courses are followed by the English and general courses"""
+        response = client.get("/courses", params={"department": "מדעי המחשב"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        codes = [course["realCourseCode"] for course in response.json()]
+        assert codes == ["10120", "10350", "70001", "80001"]
+
+    def test_department_without_general_courses(self, client: TestClient, course_catalog, sample_courses):
+        """generalcourses=false returns only the department courses"""
+        response = client.get("/courses", params={"department": "מדעי המחשב", "generalcourses": False})
+        assert response.status_code == 200
+        assert response.json() == sample_courses["מדעי המחשב"]
+
+    def test_payload_matches_plain_json_response(self, client: TestClient, course_catalog):
+        """The cached body is byte-identical to what FastAPI would have encoded"""
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.responses import JSONResponse
+
+        response = client.get("/courses", params={"department": "מדעי המחשב"})
+        courses = [course.to_dict() for course in course_catalog.courses("מדעי המחשב")]
+        expected = JSONResponse(content=jsonable_encoder(courses)).body
+        assert response.content == expected
+
+    def test_unknown_department(self, client: TestClient, course_catalog):
+        """Unknown departments return 404"""
+        response = client.get("/courses", params={"department": "לא קיים"})
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Department not found"
+
+
+class TestFilteredCourses:
+    """Test server-side filtering, projection and cursor pagination on /courses"""
+
+    def _codes(self, client, **params):
+        response = client.get("/courses", params={"department": "מדעי המחשב", **params})
+        assert response.status_code == 200
+        return [course["courseCode"] for course in response.json()]
+
+    def test_filters(self, client: TestClient, course_catalog):
+        """Course and group level filters, alone and combined"""
+        assert self._codes(client, semester="א") == ["2001", "3001", "4001"]
+        assert self._codes(client, courseType="בחירה") == ["2002"]
+        assert self._codes(client, dayOfWeek=0) == ["2001", "2002"]
+        assert self._codes(client, dayOfWeek=2, lectureType=1) == ["2001"]
+        assert self._codes(client, dayOfWeek=2, lectureType=0) == []
+        assert self._codes(client, semester="א", generalcourses=False) == ["2001"]
+
+    def test_projection(self, client: TestClient, course_catalog):
+        """fields= keeps only the requested keys"""
+        response = client.get("/courses", params={"department": "מדעי המחשב", "fields": "courseCode,courseName"})
+        assert response.json()[0] == {"courseCode": "2001", "courseName": "מבני נתונים"}
+        assert all("groups" not in course for course in response.json())
+
+    def test_cursor_pagination(self, client: TestClient, course_catalog):
+        """Pages follow X-Next-Cursor until it is missing"""
+        first = client.get("/courses", params={"department": "מדעי המחשב", "limit": 3})
+        assert [c["courseCode"] for c in first.json()] == ["2001", "2002", "3001"]
+        assert first.headers["X-Total-Count"] == "4"
+
+        cursor = first.headers["X-Next-Cursor"]
+        second = client.get("/courses", params={"department": "מדעי המחשב", "limit": 3, "cursor": cursor})
+        assert [c["courseCode"] for c in second.json()] == ["4001"]
+        assert "X-Next-Cursor" not in second.headers
+
+    def test_stale_and_invalid_cursor(self, client: TestClient, course_catalog):
+        """A cursor from another catalog version is rejected"""
+        from backend.app.api.coursesInfo import encode_cursor
+        stale = encode_cursor(course_catalog.version + 1, 2)
+        response = client.get("/courses", params={"department": "מדעי המחשב", "cursor": stale})
+        assert response.status_code == 409
+        response = client.get("/courses", params={"department": "מדעי המחשב", "cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+    def test_cursor_offset_must_be_a_position(self, client: TestClient, course_catalog):
+        """Negative or non-integer offsets are rejected instead of returning the wrong page"""
+        import base64
+        for offset in ("-1", "1.5", " 2", "+2", "٢"):
+            raw = f"{course_catalog.version}:{offset}".encode()
+            cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+            response = client.get("/courses", params={"department": "מדעי המחשב", "limit": 3, "cursor": cursor})
+            assert response.status_code == 400, offset
+
+    def test_limit_bounds(self, client: TestClient, course_catalog):
+        """Page size is validated"""
+        assert client.get("/courses", params={"department": "מדעי המחשב", "limit": 0}).status_code == 422
+        assert client.get("/courses", params={"department": "מדעי המחשב", "limit": 10000}).status_code == 422
+
+
+class TestCompressedCourses:
+    """Test the precompressed gzip/brotli variants of /courses"""
+
+    def test_gzip_variant(self, client: TestClient, course_catalog):
+        """gzip clients get the precompressed body"""
+        import gzip
+        response = client.get("/courses", params={"department": "מדעי המחשב"}, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(course_catalog.payload_variants("מדעי המחשב")["gzip"]) == course_catalog.payload("מדעי המחשב")
+        assert [c["courseCode"] for c in response.json()] == ["2001", "2002", "3001", "4001"]
+
+    def test_brotli_preferred(self, client: TestClient, course_catalog):
+        """Brotli is chosen over gzip when both are accepted"""
+        pytest.importorskip("brotli")
+        response = client.get("/courses", params={"department": "מדעי המחשב"}, headers={"Accept-Encoding": "gzip, br"})
+        assert response.headers["Content-Encoding"] == "br"
+        assert len(response.json()) == 4
+
+    def test_identity(self, client: TestClient, course_catalog):
+        """Clients that accept no compression get the plain body"""
+        response = client.get("/courses", params={"department": "מדעי המחשב"}, headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in response.headers
+        assert response.content == course_catalog.payload("מדעי המחשב")
+
+    @pytest.mark.parametrize("accept_encoding,expected", [
+        ("gzip, deflate, br", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("*", "br"),
+        ("deflate", None),
+        ("", None),
+        (None, None),
+    ])
+    def test_choose_encoding(self, accept_encoding, expected):
+        """Accept-Encoding q-values are honoured"""
+        from backend.app.core.compression import choose_encoding
+        assert choose_encoding(accept_encoding, {"gzip": b"", "br": b""}) == expected
+
+
+class TestCourseCatalog:
+    """Test the indexed CourseCatalog lookups"""
+
+    def test_match_course_by_real_code(self, course_catalog):
+        """Department courses are found without copying them"""
+        matched = course_catalog.match_course("10120", "מדעי המחשב")
+        assert matched is course_catalog.departments["מדעי המחשב"].courses[0]
+
+    def test_match_course_in_general_departments(self, course_catalog):
+        """English and general courses count for every department"""
+        assert course_catalog.match_course("80001", "מדעי המחשב")["courseName"] == "פילוסופיה"
+
+    def test_match_course_from_different_years(self, course_catalog):
+        """Courses no longer running fall back to COURSES_FROM_DIFFERENT_YEARS"""
+        assert course_catalog.match_course("10006", "מדעי המחשב") == {"courseCredit": "5", "courseType": "חובה"}
+        assert course_catalog.match_course("99999", "מדעי המחשב") is None
+
+    def test_secondary_indexes(self, course_catalog):
+        """courseCode, semester and courseType indexes"""
+        assert course_catalog.find_by_course_code("2002", "מדעי המחשב")["realCourseCode"] == "10350"
+        assert [c["courseCode"] for c in course_catalog.by_semester("מדעי המחשב", "א")] == ["2001", "3001", "4001"]
+        assert [c["courseCode"] for c in course_catalog.by_course_type("מדעי המחשב", "בחירה")] == ["2002"]
+
+
+class TestCourseRecords:
+    """Test the compact Course/Group representation"""
+
+    def test_json_view_round_trip(self, sample_courses):
+        """to_dict() gives back exactly the catalog JSON"""
+        from backend.app.core.records import Course
+        for courses in sample_courses.values():
+            for course in courses:
+                assert Course.from_dict(course).to_dict() == course
+
+    def test_times_as_minutes_and_interned_strings(self, course_catalog):
+        """Group times are minute integers and repeated strings are shared"""
+        first, second = course_catalog.departments["מדעי המחשב"].courses
+        lecture = first.groups[0]
+        assert (lecture.start, lecture.end) == (510, 630)
+        assert lecture["startTime"] == "08:30"
+        assert first.groups[0].room is second.groups[0].room
+        assert first.department is second.department
+
+    def test_unknown_keys_preserved(self):
+        """Keys outside the known schema survive in the JSON view"""
+        from backend.app.core.records import Course
+        course = Course.from_dict({"courseCode": "1", "notes": "x", "groups": [{"startTime": "TBD"}]})
+        assert course.to_dict() == {"courseCode": "1", "groups": [{"startTime": "TBD"}], "notes": "x"}
+        assert course["notes"] == "x" and "courseName" not in course
+
+
+class TestCourseSearch:
+    """Test GET /courses/search and the per-department search index"""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("ד\"ר כהן", "דר כהנ"),
+        ("פרופ' שרה", "פרופ שרה"),
+        ("ג׳אווה", "גאווה"),
+        ("מבני־נתונים", "מבני נתונימ"),
+        ("  Machine   Learning ", "machine learning"),
+    ])
+    def test_normalize(self, text, expected):
+        """Geresh/gershayim dropped, final letters folded, maqaf splits words"""
+        from backend.app.core.search import normalize
+        assert normalize(text) == expected
+
+    def test_search_by_name_code_and_lecturer(self, course_catalog):
+        """Names, real course codes and lecturers are all searchable"""
+        def codes(query):
+            return [dept.courses[i]["realCourseCode"] for dept, i in course_catalog.search(query, "מדעי המחשב")]
+
+        assert codes("מבני נתונים") == ["10120"]
+        assert codes("10350") == ["10350"]
+        assert codes("103") == ["10350"]
+        assert codes("כהן") == ["10120"]
+        assert codes("דר") == ["10120", "80001"]
+        assert codes("נתונ") == ["10120"]  # final nun typed as a regular one mid-word
+        assert codes("מכונה למידת") == ["10350"]
+        assert codes("לא קיים") == []
+
+    def test_ranking(self, course_catalog):
+        """An exact code beats a name match, a name match beats a lecturer match"""
+        from backend.app.core.search import normalize
+        dept = course_catalog.departments["מדעי המחשב"]
+        assert dept.search_index.search("80001", 10) == []
+        # Two name words plus the whole-name bonus
+        assert [score for score, _ in dept.search_index.search(normalize("מבני נתונים"), 10)] == [130]
+        results = course_catalog.search("ש", "מדעי המחשב")
+        assert [dept.courses[i]["courseName"] for dept, i in results] == ["למידת מכונה"]
+
+    def test_endpoint(self, client: TestClient, course_catalog):
+        """Results come back as full course objects, best first"""
+        response = client.get("/courses/search", params={"q": "פילוסופיה"})
+        assert response.status_code == 200
+        assert [course["realCourseCode"] for course in response.json()] == ["80001"]
+
+        response = client.get("/courses/search", params={"q": "כהן", "department": "מדעי המחשב"})
+        assert response.json()[0]["groups"][0]["lecturer"] == "ד\"ר כהן"
+
+        response = client.get("/courses/search", params={"q": "דר", "department": "מדעי המחשב",
+                                                          "generalcourses": False})
+        assert [course["realCourseCode"] for course in response.json()] == ["10120"]
+
+        assert len(client.get("/courses/search", params={"q": "1", "limit": 1}).json()) == 1
+        assert client.get("/courses/search", params={"q": "x", "department": "לא קיים"}).status_code == 404
+        assert client.get("/courses/search", params={"q": ""}).status_code == 422
+
+
+class TestCatalogReload:
+    """Test hot reload driven by DepartmentCourses.updated_at"""
+
+    def _insert(self, db, name, data, updated_at):
+        db.add(DepartmentCourses(department_name=name, data=data, updated_at=updated_at))
+        db.commit()
+
+    def test_refresh_reloads_only_changed_departments(self, catalog_db, sample_courses):
+        """Unchanged departments are reused, changed ones are rebuilt and the version bumps"""
+        for name, courses in sample_courses.items():
+            self._insert(catalog_db, name, courses, datetime(2025, 1, 1))
+
+        cache.load_courses_to_mem()
+        before = cache.get_catalog()
+        assert cache.refresh_catalog() is False
+        assert cache.get_catalog() is before
+
+        row = catalog_db.query(DepartmentCourses).filter_by(department_name="כללי").one()
+        row.data = []
+        row.updated_at = datetime(2025, 2, 1)
+        catalog_db.commit()
+
+        assert cache.refresh_catalog() is True
+        after = cache.get_catalog()
+        assert after.version == before.version + 1
+        assert after.departments["מדעי המחשב"] is before.departments["מדעי המחשב"]
+        # Bodies that do not include the changed department are not rebuilt or recompressed
+        assert after.payloads[("מדעי המחשב", False)] is before.payloads[("מדעי המחשב", False)]
+        assert after.compressed[("מדעי המחשב", False)] is before.compressed[("מדעי המחשב", False)]
+        assert after.departments["כללי"].courses == ()
+        assert after.match_course("80001", "מדעי המחשב") is None
+        # The previous snapshot is untouched for in-flight readers
+        assert before.match_course("80001", "מדעי המחשב")["courseName"] == "פילוסופיה"
+
+    def test_refresh_drops_removed_departments(self, catalog_db):
+        """Departments deleted from the table disappear from the catalog"""
+        self._insert(catalog_db, "מדעי המחשב", [], datetime(2025, 1, 1))
+        self._insert(catalog_db, "אנגלית", [], datetime(2025, 1, 1))
+        cache.load_courses_to_mem()
+
+        catalog_db.query(DepartmentCourses).filter_by(department_name="אנגלית").delete()
+        catalog_db.commit()
+
+        assert cache.refresh_catalog() is True
+        assert "אנגלית" not in cache.get_catalog()
+
+    def test_version_endpoint(self, client: TestClient, course_catalog):
+        """The current catalog version is exposed and sent with /courses"""
+        response = client.get("/courses/version")
+        assert response.status_code == 200
+        assert response.json()["version"] == course_catalog.version
+        assert set(response.json()["departments"]) == {"מדעי המחשב", "אנגלית", "כללי"}
+
+        response = client.get("/courses", params={"department": "מדעי המחשב"})
+        assert response.headers["X-Catalog-Version"] == str(course_catalog.version)
+
+
+class TestCatalogChanges:
+    """Test GET /courses/changes deltas between catalog versions"""
+
+    def _publish(self, data, version):
+        catalog = CourseCatalog.from_data(data, version)
+        cache.set_catalog(catalog)
+        return catalog
+
+    def _changes(self, client, since, **params):
+        response = client.get("/courses/changes", params={"department": "מדעי המחשב", "since": since, **params})
+        assert response.status_code == 200
+        return response.json()
+
+    def test_delta_since_older_version(self, client: TestClient, course_catalog, sample_courses):
+        """Only added, removed and modified courses and groups are returned"""
+        self._publish(sample_courses, 1)
+        cs = sample_courses["מדעי המחשב"]
+        cs[0]["groups"][1]["room"] = "305"
+        cs[0]["groups"].append({"groupCode": "10120-2", "lectureType": 0, "startTime": "14:30",
+                                "endTime": "16:30", "room": "101", "lecturer": "ד\"ר כהן", "dayOfWeek": 4})
+        cs[0]["courseCredit"] = "5"
+        removed = cs.pop(1)
+        cs.append(dict(removed, courseCode="2003", realCourseCode="10400", courseName="ראייה ממוחשבת"))
+        self._publish(sample_courses, 2)
+
+        changes = self._changes(client, 1)
+        assert changes["version"] == 2 and changes["full"] is False
+        # The unchanged general departments are left out
+        assert list(changes["departments"]) == ["מדעי המחשב"]
+        delta = changes["departments"]["מדעי המחשב"]
+        assert delta["removed"] == ["2002"]
+        assert [course["courseCode"] for course in delta["added"]] == ["2003"]
+        modified, = delta["modified"]
+        assert modified["courseCode"] == "2001"
+        assert modified["course"]["courseCredit"] == "5" and "groups" not in modified["course"]
+        assert [group["groupCode"] for group in modified["addedGroups"]] == ["10120-2"]
+        assert modified["removedGroups"] == []
+        assert modified["modifiedGroups"] == [cs[0]["groups"][1]]
+
+    def test_up_to_date_client(self, client: TestClient, course_catalog, sample_courses):
+        """A client at the current version gets an empty delta"""
+        catalog = self._publish(sample_courses, 1)
+        response = client.get("/courses/changes", params={"department": "מדעי המחשב", "since": 1})
+        assert response.json() == {"version": 1, "since": 1, "full": False, "departments": {}}
+        assert response.headers["X-Catalog-Version"] == str(catalog.version)
+
+    def test_full_snapshot_when_too_old(self, client: TestClient, course_catalog, sample_courses, monkeypatch):
+        """Versions no longer kept, or never seen, get the whole /courses list"""
+        monkeypatch.setattr(cache, "CATALOG_HISTORY_VERSIONS", 1)
+        for version in (1, 2, 3):
+            sample_courses["כללי"][0]["courseCredit"] = str(version)
+            self._publish(sample_courses, version)
+
+        assert self._changes(client, 2)["departments"]["כללי"]["modified"][0]["course"]["courseCredit"] == "3"
+        for since in (1, 42):
+            changes = self._changes(client, since)
+            assert changes["full"] is True
+            assert changes["courses"] == client.get("/courses", params={"department": "מדעי המחשב"}).json()
+
+    def test_duplicate_codes_fall_back_to_full(self, client: TestClient, course_catalog, sample_courses):
+        """Courses that cannot be told apart by courseCode are not diffed"""
+        self._publish(sample_courses, 1)
+        sample_courses["מדעי המחשב"][1]["courseCode"] = "2001"
+        self._publish(sample_courses, 2)
+        assert self._changes(client, 1)["full"] is True
+
+
+class TestLazyCatalog:
+    """Test lazy per-department loading with a byte-bounded LRU"""
+
+    def _catalog(self, sample_courses, max_bytes=10 ** 9, pinned=(), delay=0):
+        calls = []
+
+        def loader(name):
+            calls.append(name)
+            time.sleep(delay)
+            return DepartmentCatalog(name, sample_courses[name])
+
+        sample_courses["הנדסת תוכנה"] = list(sample_courses["מדעי המחשב"])
+        stamps = {name: None for name in sample_courses}
+        return LazyCourseCatalog(stamps, loader, max_bytes, pinned), calls
+
+    def test_department_loaded_on_first_access(self, sample_courses):
+        """Nothing is loaded until a department is used, then it is loaded once"""
+        catalog, calls = self._catalog(sample_courses)
+        assert "מדעי המחשב" in catalog and calls == []
+
+        assert catalog.match_course("10120", "מדעי המחשב")["courseName"] == "מבני נתונים"
+        assert catalog.payload("מדעי המחשב") == catalog.payload("מדעי המחשב")
+        assert sorted(calls) == sorted(["מדעי המחשב", "אנגלית", "כללי"])
+        assert catalog.payload("לא קיים") is None
+
+    def test_concurrent_first_access_loads_once(self, sample_courses):
+        """Concurrent first requests share a single load"""
+        catalog, calls = self._catalog(sample_courses, delay=0.05)
+        threads = [threading.Thread(target=catalog.payload, args=("מדעי המחשב",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert calls.count("מדעי המחשב") == 1
+
+    def _accounted(self, catalog):
+        from backend.app.core.catalog import payload_nbytes
+
+        return (sum(dept.nbytes for dept in catalog.departments.values())
+                + sum(payload_nbytes(body, catalog.compressed[key]) for key, body in catalog.payloads.items()))
+
+    def test_cold_departments_evicted_over_budget(self, sample_courses):
+        """The least recently used department is evicted with its cached bodies, pinned ones never are"""
+        catalog, calls = self._catalog(sample_courses)
+        catalog.payload("מדעי המחשב")
+        assert catalog.nbytes == self._accounted(catalog)
+        # Room for what is loaded now (with a little slack), not for a second department
+        catalog.max_bytes = catalog.nbytes + 1024
+
+        catalog.payload("הנדסת תוכנה")
+        assert "מדעי המחשב" not in catalog.departments
+        assert ("מדעי המחשב", True) not in catalog.payloads
+        assert {"הנדסת תוכנה", "אנגלית", "כללי"} <= set(catalog.departments)
+        assert catalog.nbytes == self._accounted(catalog) <= catalog.max_bytes
+
+        catalog.payload("מדעי המחשב")
+        assert calls.count("מדעי המחשב") == 2
+        assert catalog.build_stats["payloads"] == 0
+
+    def test_nbytes_is_the_real_footprint(self, sample_courses):
+        """A department's budget share is what building it allocates, several times its JSON"""
+        import gc
+        import json
+        import tracemalloc
+
+        source = json.dumps(sample_courses["מדעי המחשב"] * 50, ensure_ascii=False)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        parsed = json.loads(source)
+        dept = DepartmentCatalog("x", parsed)
+        del parsed
+        gc.collect()
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        assert 0.8 * allocated <= dept.nbytes <= 1.25 * allocated
+        assert dept.nbytes > 3 * len(dept.encoded_items)
+
+    def test_warm_list_preloaded(self, sample_courses):
+        """Warm departments are loaded ahead of time and pinned"""
+        catalog, calls = self._catalog(sample_courses, max_bytes=0, pinned=["מדעי המחשב"])
+        catalog.warm()
+        assert set(calls) == {"מדעי המחשב", "אנגלית", "כללי"}
+        catalog.payload("הנדסת תוכנה")
+        assert "מדעי המחשב" in catalog.departments
+
+    def test_search_everywhere_loads_departments(self, sample_courses):
+        """A search without a department covers every known department, evicting behind it over budget"""
+        catalog, calls = self._catalog(sample_courses, max_bytes=0)
+        eager = CourseCatalog.from_data(sample_courses)
+
+        found = [(dept.name, position) for dept, position in catalog.search("נתונים")]
+        assert found == [(dept.name, position) for dept, position in eager.search("נתונים")]
+        assert {"מדעי המחשב", "הנדסת תוכנה"} <= {name for name, _ in found}
+        assert sorted(calls) == sorted(sample_courses)
+        assert len(set(catalog.departments) - catalog.pinned) <= 1
+
+    def test_lazy_load_and_refresh_from_db(self, catalog_db, sample_courses):
+        """load_courses_to_mem(lazy=True) reads only names; refresh drops changed departments"""
+        for name, courses in sample_courses.items():
+            catalog_db.add(DepartmentCourses(department_name=name, data=courses, updated_at=datetime(2025, 1, 1)))
+        catalog_db.commit()
+
+        cache.load_courses_to_mem(lazy=True)
+        catalog = cache.get_catalog()
+        assert isinstance(catalog, LazyCourseCatalog)
+        assert set(catalog.departments) == {"אנגלית", "כללי"}
+        assert catalog.match_course("10120", "מדעי המחשב") is not None
+
+        row = catalog_db.query(DepartmentCourses).filter_by(department_name="מדעי המחשב").one()
+        row.data = []
+        row.updated_at = datetime(2025, 2, 1)
+        catalog_db.commit()
+
+        assert cache.refresh_catalog() is True
+        refreshed = cache.get_catalog()
+        assert refreshed.version == catalog.version + 1
+        assert refreshed.departments["כללי"] is catalog.departments["כללי"]
+        assert refreshed.match_course("10120", "מדעי המחשב") is None
+
+
+class TestSharedSnapshot:
+    """Test the memory-mapped catalog snapshot shared by workers"""
+
+    @pytest.fixture
+    def snapshot_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(cache, "CATALOG_SNAPSHOT_DIR", str(tmp_path))
+        yield tmp_path
+        if cache._snapshot_store is not None:
+            cache._snapshot_store.close()
+            cache._snapshot_store = None
+
+    def _publish(self, store, data, version, previous=None):
+        from backend.app.core.snapshot import encode_section
+        sections = dict(previous.sections) if previous is not None else {}
+        sections.update({name: encode_section(name, courses) for name, courses in data.items()})
+        store.publish(version, sections, previous)
+        return store.open_current()
+
+    def test_workers_map_the_same_bodies(self, tmp_path, sample_courses):
+        """Mapped bodies equal the in-process ones and are views, not copies"""
+        from backend.app.core.snapshot import SnapshotStore, SharedCourseCatalog
+        leader, follower = SnapshotStore(str(tmp_path)), SnapshotStore(str(tmp_path))
+        assert leader.lead() is True
+        assert follower.lead() is False
+
+        self._publish(leader, sample_courses, 1)
+        expected = CourseCatalog.from_data(sample_courses)
+        catalog = SharedCourseCatalog(follower.open_current(), 10 ** 9)
+        body = catalog.payload("מדעי המחשב")
+        assert isinstance(body, memoryview)
+        assert bytes(body) == expected.payload("מדעי המחשב")
+        assert {encoding: bytes(v) for encoding, v in catalog.payload_variants("מדעי המחשב").items()} == \
+            expected.payload_variants("מדעי המחשב")
+        # Records are only built on first use, from the mapped JSON
+        assert "מדעי המחשב" not in catalog.departments
+        assert catalog.match_course("10120", "מדעי המחשב")["courseName"] == "מבני נתונים"
+        assert catalog.departments["מדעי המחשב"].courses[0].to_dict() == sample_courses["מדעי המחשב"][0]
+        leader.close()
+        assert follower.lead() is True
+        follower.close()
+
+    def test_worker_records_bounded_by_budget(self, tmp_path, sample_courses):
+        """Records built from the mapping are evicted within the budget; bodies stay shared and are not counted"""
+        from backend.app.core.snapshot import SnapshotStore, SharedCourseCatalog
+        sample_courses["הנדסת תוכנה"] = list(sample_courses["מדעי המחשב"])
+        store = SnapshotStore(str(tmp_path))
+        store.lead()
+        catalog = SharedCourseCatalog(self._publish(store, sample_courses, 1), 10 ** 9)
+
+        catalog.match_course("10120", "מדעי המחשב")
+        mapped = catalog.departments["מדעי המחשב"]
+        # The encoded JSON stays in the mapping, so only the worker's own records and indexes count
+        private = DepartmentCatalog("מדעי המחשב", sample_courses["מדעי המחשב"]).nbytes
+        assert mapped.nbytes <= private - len(mapped.encoded_items) + 1024
+        catalog.max_bytes = catalog.nbytes + 1024
+
+        catalog.match_course("10120", "הנדסת תוכנה")
+        assert "מדעי המחשב" not in catalog.departments
+        assert catalog.nbytes <= catalog.max_bytes
+        assert isinstance(catalog.payload("מדעי המחשב"), memoryview)
+        store.close()
+
+    def test_new_generation_reuses_unchanged_bodies(self, tmp_path, sample_courses):
+        """Only bodies that include a changed department are rebuilt; old generations are pruned"""
+        from backend.app.core.snapshot import SnapshotStore
+        store = SnapshotStore(str(tmp_path), keep=2)
+        store.lead()
+        first = self._publish(store, sample_courses, 1)
+        second = self._publish(store, {"כללי": []}, 2, previous=first)
+        third = self._publish(store, {}, 3, previous=second)
+
+        assert bytes(second.payloads[("מדעי המחשב", False)]) == bytes(first.payloads[("מדעי המחשב", False)])
+        assert b"80001" not in bytes(second.payloads[("מדעי המחשב", True)])
+        assert sorted(p.name for p in tmp_path.glob("*.snap")) == ["catalog-2.snap", "catalog-3.snap"]
+        # Still readable by a worker that mapped it before it was unlinked
+        assert bytes(first.payloads[("כללי", True)]).startswith(b"[")
+        assert third.version == 3
+        store.close()
+
+    def test_load_and_refresh_through_snapshot(self, client: TestClient, catalog_db, sample_courses, snapshot_dir):
+        """Startup publishes and maps a snapshot; a DB change publishes the next generation"""
+        from backend.app.core.snapshot import SharedCourseCatalog
+        for name, courses in sample_courses.items():
+            catalog_db.add(DepartmentCourses(department_name=name, data=courses, updated_at=datetime(2025, 1, 1)))
+        catalog_db.commit()
+
+        cache.load_courses_to_mem()
+        catalog = cache.get_catalog()
+        assert isinstance(catalog, SharedCourseCatalog)
+        response = client.get("/courses", params={"department": "מדעי המחשב"})
+        assert [c["realCourseCode"] for c in response.json()] == ["10120", "10350", "70001", "80001"]
+        assert cache.refresh_catalog() is False
+        assert catalog.match_course("10120", "מדעי המחשב") is not None
+
+        row = catalog_db.query(DepartmentCourses).filter_by(department_name="כללי").one()
+        row.data = []
+        row.updated_at = datetime(2025, 2, 1)
+        catalog_db.commit()
+
+        assert cache.refresh_catalog() is True
+        refreshed = cache.get_catalog()
+        assert refreshed.version == catalog.version + 1
+        assert refreshed.snapshot.name != catalog.snapshot.name
+        assert refreshed.departments["מדעי המחשב"] is catalog.departments["מדעי המחשב"]
+        assert refreshed.match_course("80001", "מדעי המחשב") is None
+        changes = client.get("/courses/changes", params={"department": "מדעי המחשב", "since": catalog.version})
+        assert changes.json()["departments"]["כללי"]["removed"] == ["4001"]
@@ -0,0 +1,444 @@
+import time
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from backend.app.core.catalog import CourseCatalog
+
+
+class TestScheduleConflicts:
+    """Test finding time conflicts in a schedule selection"""
+
+    def test_find_conflicts(self):
+        """Overlaps are reported once per pair; back-to-back meetings and a group's own meetings are not"""
+        from backend.app.core.timetable import find_conflicts
+
+        groups = [
+            [(0, 510, 630, "1", "a"),    # 08:30-10:30
+             (1, 510, 630, "1", "a"),    # a meets again on Monday
+             (1, 600, 700, "1", "a")],   # and overlaps itself
+            [(0, 630, 750, "2", "b")],   # 10:30-12:30, right after a
+            [(0, 540, 600, "3", "c")],   # 09:00-10:00, inside a
+            [(1, 620, 700, "4", "d")],
+        ]
+        pairs = {(first[3], second[3], first[0]) for first, second in find_conflicts(groups)}
+        assert pairs == {("1", "3", 0), ("1", "4", 1)}
+
+    def test_index_sorts_group_meetings(self):
+        """The index keeps each group's meetings by day and start, the order find_conflicts merges"""
+        catalog = CourseCatalog.from_data({"מדעי המחשב": [_timetable_course("A", "א", [
+            ("L1", 0, 3, "12:00", "14:00"), ("L1", 0, 1, "10:00", "12:00"), ("L1", 0, 1, "08:30", "09:30")])]})
+        meetings = catalog.group_meetings("A", "L1", "מדעי המחשב")
+        assert [meeting[:3] for meeting in meetings] == [(1, 510, 570), (1, 600, 720), (3, 720, 840)]
+
+    def test_validate_endpoint(self, client: TestClient, course_catalog):
+        """Conflicting pairs come back with their overlap; general courses resolve, unknown groups are listed"""
+        selection = {"department": "מדעי המחשב", "schedule_data": [
+            {"courseCode": "2001", "groups": ["10120-1", "10120-1/1"]},
+            {"courseCode": "2002", "groups": ["10350-1"]},
+            {"courseCode": "3001", "groups": ["70001-1"]},
+            {"courseCode": "9999", "groups": ["1"]},
+        ]}
+        response = client.post("/schedule/validate", json=selection)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["valid"] is False
+        assert data["conflicts"] == [{
+            "dayOfWeek": 0, "startTime": "09:30", "endTime": "10:30",
+            "groups": [{"courseCode": "2001", "groupCode": "10120-1"}, {"courseCode": "2002", "groupCode": "10350-1"}],
+        }]
+        assert data["unknownGroups"] == [{"courseCode": "9999", "groupCode": "1"}]
+
+        selection["schedule_data"] = selection["schedule_data"][:1]
+        assert client.post("/schedule/validate", json=selection).json() == {
+            "valid": True, "conflicts": [], "unknownGroups": []}
+
+        selection["department"] = "לא קיימת"
+        assert client.post("/schedule/validate", json=selection).status_code == 404
+
+    def test_save_checks_conflicts_when_asked(self, client: TestClient, course_catalog):
+        """?checkConflicts=true refuses a conflicting schedule; saving without it is unchanged"""
+        signup = client.post("/auth/signuplight", json={
+            "username": "Conflict.User", "password": "conflictpass", "department": "מדעי המחשב"}).json()
+        headers = {"Authorization": f"Bearer {signup['token']}"}
+        schedule = {"schedule_name": "Clash", "schedule_data": [
+            {"courseCode": "2001", "groups": ["10120-1"]}, {"courseCode": "2002", "groups": ["10350-1"]}]}
+
+        response = client.post("/schedule?checkConflicts=true", json=schedule, headers=headers)
+        assert response.status_code == 409
+        assert len(response.json()["detail"]["conflicts"]) == 1
+
+        assert client.post("/schedule", json=schedule, headers=headers).status_code == 200
+
+
+def _timetable_course(course_code, semester, groups):
+    return {"courseType": "חובה", "courseName": f"Course {course_code}", "realCourseCode": f"9{course_code}",
+            "courseCode": course_code, "semester": semester, "department": "מדעי המחשב", "courseCredit": "3",
+            "prerequisites": [], "prerequisitesAlt": [],
+            "groups": [{"groupCode": code, "lectureType": lecture_type, "startTime": start, "endTime": end,
+                        "room": "1", "lecturer": "x", "dayOfWeek": day}
+                       for code, lecture_type, day, start, end in groups]}
+
+
+class TestScheduleGenerator:
+    """Test generating conflict-free timetables"""
+
+    COURSES = [
+        _timetable_course("A", "א", [("L1", 0, 0, "08:30", "10:30"), ("L2", 0, 1, "08:30", "10:30"),
+                                     ("P1", 1, 0, "10:30", "12:30"), ("P2", 1, 0, "09:30", "11:30")]),
+        _timetable_course("B", "א", [("B1", 0, 0, "08:30", "10:30"), ("B2", 0, 2, "08:30", "10:30")]),
+    ]
+
+    def _search(self, **kwargs):
+        from backend.app.core.timetable import ScheduleSearch, course_options
+
+        catalog = CourseCatalog.from_data({"מדעי המחשב": self.COURSES})
+        options = [course_options(catalog, "מדעי המחשב", course) for course in catalog.courses("מדעי המחשב")]
+        search = ScheduleSearch(options, **kwargs)
+        return search, list(search)
+
+    def test_course_options(self):
+        """One group per lecture type; a lecture overlapping its own practice is dropped"""
+        from backend.app.core.timetable import course_options
+
+        catalog = CourseCatalog.from_data({"מדעי המחשב": self.COURSES})
+        options = course_options(catalog, "מדעי המחשב", catalog.find_by_course_code("A", "מדעי המחשב"))
+        assert sorted(option.groups for option in options) == [("L1", "P1"), ("L2", "P1"), ("L2", "P2")]
+
+    def test_enumerates_and_ranks(self):
+        """Every valid combination is found and the best come first"""
+        search, streamed = self._search(limit=10)
+        assert search.complete
+        assert search.found == 4
+        assert len(streamed) == 4
+
+        ranked = search.ranked()
+        assert [schedule["campusDays"] for schedule in ranked] == [2, 2, 3, 3]
+        # Equally ranked schedules keep the order they were found in
+        assert sorted(sorted(group for item in schedule["scheduleData"] for group in item["groups"])
+                      for schedule in ranked[:2]) == [["B1", "L2", "P1"], ["B2", "L1", "P1"]]
+        assert ranked[0]["finishTime"] == "12:30"
+
+    def test_rank_by_gaps_and_pruning(self):
+        """With limit 1 only improving schedules are streamed and worse branches are cut"""
+        search, streamed = self._search(rank_by=["gaps", "days"], limit=1)
+        best = search.ranked()
+        assert len(best) == 1
+        assert best[0]["gapMinutes"] == 0 and best[0]["campusDays"] == 2
+        assert len(streamed) <= search.found <= 4
+
+    def test_time_budget(self):
+        """The search stops when its budget runs out"""
+        from backend.app.core.timetable import CourseOption, ScheduleSearch
+
+        options = [[CourseOption(str(course), (f"{course}-{g}",), ()) for g in range(4)] for course in range(20)]
+        search = ScheduleSearch(options, limit=5, budget_seconds=0)
+        search.CHECK_EVERY = 1
+        assert list(search) == []
+        assert not search.complete
+        assert search.nodes == 1
+
+    def test_generate_endpoint(self, client: TestClient, course_catalog):
+        """Schedules stream as NDJSON, ending with the ranked summary; courses of another semester are refused"""
+        import json
+
+        request = {"department": "מדעי המחשב", "semester": "א", "course_codes": ["2001", "3001"]}
+        response = client.post("/schedule/generate", json=request)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["type"] for line in lines] == ["schedule", "done"]
+        done = lines[-1]
+        assert done["complete"] and done["found"] == 1
+        assert done["schedules"][0]["scheduleData"] == [{"courseCode": "2001", "groups": ["10120-1", "10120-1/1"]},
+                                                        {"courseCode": "3001", "groups": ["70001-1"]}]
+        assert done["schedules"][0]["campusDays"] == 3
+
+        response = client.post("/schedule/generate", json={**request, "course_codes": ["2001", "2002"]})
+        assert response.status_code == 422
+        assert response.json()["detail"]["unknownCourses"] == ["2002"]
+
+
+@pytest.fixture(scope="class")
+def solver_pool():
+    from backend.app.core.solver import SolverPool
+
+    pool = SolverPool(workers=2, slots=1)
+    yield pool
+    pool.shutdown()
+
+
+class TestParallelScheduleSolver:
+    """Test splitting the timetable search across the solver processes"""
+
+    def _options(self, n_courses, per_course, seed=1):
+        import random
+        from backend.app.core.timetable import CourseOption
+
+        rng = random.Random(seed)
+        options = []
+        for course in range(n_courses):
+            options.append([])
+            for option in range(per_course):
+                start = rng.choice([510, 630, 750, 870])
+                meetings = ((rng.randrange(6), start, start + 110, str(course), f"{course}-{option}"),)
+                options[-1].append(CourseOption(str(course), (f"{course}-{option}",), meetings))
+        return options
+
+    def test_encode_key_keeps_order(self):
+        """Encoded rank keys compare like the keys"""
+        from backend.app.core.solver import decode_key, encode_key
+
+        keys = [(2, 0, 750), (2, 30, 600), (3, 0, 600), (2, 0, 751)]
+        assert sorted(keys, key=encode_key) == sorted(keys)
+        assert all(decode_key(encode_key(key), 3) == key for key in keys)
+
+    def test_same_ranks_as_serial(self, solver_pool):
+        """The parallel search finds schedules of the ranks the serial one finds"""
+        from backend.app.core.solver import ParallelScheduleSearch
+        from backend.app.core.timetable import ScheduleSearch
+
+        options = self._options(6, 6)
+        serial = ScheduleSearch(options, limit=5, budget_seconds=30)
+        list(serial)
+        parallel = ParallelScheduleSearch(options, limit=5, budget_seconds=30, pool=solver_pool)
+        streamed = list(parallel)
+        assert parallel.parallel and parallel.complete and serial.complete
+        assert [key for key, _ in parallel.best()] == [key for key, _ in serial.best()]
+        assert len(parallel.ranked()) == 5 and len(streamed) >= 5
+
+    def test_busy_pool_runs_serially(self, solver_pool):
+        """With every slot taken the search runs in the calling thread"""
+        from backend.app.core.solver import ParallelScheduleSearch
+
+        slot = solver_pool.acquire()
+        try:
+            search = ParallelScheduleSearch(self._options(4, 4), limit=3, budget_seconds=30, pool=solver_pool)
+            list(search)
+            assert not search.parallel and search.complete
+            assert len(search.ranked()) == 3
+        finally:
+            solver_pool.release(slot)
+
+    def test_closing_cancels(self, solver_pool):
+        """Closing the stream early cancels the running subtrees and frees the slot"""
+        from backend.app.core.solver import ParallelScheduleSearch
+
+        search = ParallelScheduleSearch(self._options(12, 8), limit=3, budget_seconds=30, pool=solver_pool)
+        stream = iter(search)
+        next(stream)
+        stream.close()
+        assert not search.complete
+        for _ in range(100):
+            slot = solver_pool.acquire()
+            if slot is not None:
+                break
+            time.sleep(0.1)
+        else:
+            pytest.fail("the slot was not released")
+        solver_pool.release(slot)
+
+    def test_dead_worker_falls_back(self, solver_pool):
+        """A killed worker process ends the search in the calling thread; the next one gets new processes"""
+        import json
+        import os
+        import signal
+        from backend.app.core.solver import ParallelScheduleSearch
+        from backend.app.core.timetable import ScheduleSearch
+
+        options = self._options(6, 6)
+        serial = ScheduleSearch(options, limit=5, budget_seconds=30)
+        list(serial)
+
+        solver_pool.warm()
+        os.kill(next(iter(solver_pool._executor._processes)), signal.SIGKILL)
+        search = ParallelScheduleSearch(options, limit=5, budget_seconds=30, pool=solver_pool)
+        streamed = list(search)
+        assert not search.parallel and search.complete
+        assert [key for key, _ in search.best()] == [key for key, _ in serial.best()]
+        assert len({json.dumps(schedule) for schedule in streamed}) == len(streamed)
+
+        for _ in range(100):
+            slot = solver_pool.acquire()
+            if slot is not None:
+                break
+            time.sleep(0.1)
+        else:
+            pytest.fail("the slot was not released")
+        solver_pool.release(slot)
+        search = ParallelScheduleSearch(options, limit=5, budget_seconds=30, pool=solver_pool)
+        list(search)
+        assert search.parallel and search.complete
+
+    def test_small_search_stays_serial(self, client: TestClient, course_catalog, solver_pool):
+        """mode="parallel" takes the solver pool only for searches over SCHEDULE_PARALLEL_MIN_LEAVES"""
+        import json
+
+        request = {"department": "מדעי המחשב", "semester": "א", "course_codes": ["2001", "3001"], "mode": "parallel"}
+        with patch("backend.app.api.schedule.solver_pool", solver_pool), \
+                patch("backend.app.core.solver.solver_pool", solver_pool):
+            done = json.loads(client.post("/schedule/generate", json=request).text.splitlines()[-1])
+            assert done["type"] == "done" and done["parallel"] is False and done["found"] == 1
+
+            with patch("backend.app.api.schedule.SCHEDULE_PARALLEL_MIN_LEAVES", 1):
+                done = json.loads(client.post("/schedule/generate", json=request).text.splitlines()[-1])
+            assert done["parallel"] is True and done["found"] == 1
+
+    def test_rank_by_is_bounded(self, client: TestClient, course_catalog):
+        """At most three distinct criteria, so a rank key fits the shared cutoff"""
+        from backend.app.core.solver import ParallelScheduleSearch
+
+        request = {"department": "מדעי המחשב", "semester": "א", "course_codes": ["2001"]}
+        for rank_by in (["days", "days"], ["days", "gaps", "finish", "days"]):
+            assert client.post("/schedule/generate", json={**request, "rank_by": rank_by}).status_code == 422
+        with pytest.raises(ValueError):
+            ParallelScheduleSearch(self._options(2, 2), rank_by=["gaps", "gaps"])
+
+
+class TestScheduleFits:
+    """Test listing what can still be added to a selection"""
+
+    def _catalog(self):
+        courses = TestScheduleGenerator.COURSES + [_timetable_course("C", "ב", [("C1", 0, 0, "10:30", "12:30")])]
+        return CourseCatalog.from_data({"מדעי המחשב": courses})
+
+    def test_masks_precomputed(self):
+        """Every group's week slots are computed when the catalog loads"""
+        from backend.app.core.timetable import DAY_SLOTS, SLOT_MINUTES
+
+        catalog = self._catalog()
+        mask = catalog.group_mask("A", "L2", "מדעי המחשב")
+        first = DAY_SLOTS + 8 * 60 // SLOT_MINUTES + 30 // SLOT_MINUTES  # Monday 08:30
+        assert mask == ((1 << (120 // SLOT_MINUTES)) - 1) << first
+        assert catalog.group_mask("A", "nope", "מדעי המחשב") is None
+
+    def test_fitting_courses(self):
+        """Only groups that fit are listed; a course is addable when a full lecture/practice set fits together"""
+        from types import SimpleNamespace
+        from backend.app.core.timetable import fitting_courses
+
+        catalog = self._catalog()
+        selection = [SimpleNamespace(courseCode="B", groups=["B1"])]  # Sunday 08:30-10:30
+        result = fitting_courses(catalog, "מדעי המחשב", selection)
+        courses = {course["courseCode"]: course for course in result["courses"]}
+        assert set(courses) == {"A", "C"}
+        assert courses["A"]["groups"] == ["L2", "P1"] and courses["A"]["addable"]
+
+        # With C's Sunday 10:30 taken too, A's only fitting practice is gone
+        selection.append(SimpleNamespace(courseCode="C", groups=["C1"]))
+        result = fitting_courses(catalog, "מדעי המחשב", selection)
+        assert [(course["courseCode"], course["groups"], course["addable"]) for course in result["courses"]] == [
+            ("A", ["L2"], False)]
+
+        result = fitting_courses(catalog, "מדעי המחשב", [SimpleNamespace(courseCode="B", groups=["B9"])],
+                                 filters={"semester": "ב"})
+        assert [course["courseCode"] for course in result["courses"]] == ["C"]
+        assert result["unknownGroups"] == [{"courseCode": "B", "groupCode": "B9"}]
+
+    def test_fits_endpoint(self, client: TestClient, course_catalog):
+        """The endpoint filters by courseType and includes the general departments"""
+        request = {"department": "מדעי המחשב",
+                   "schedule_data": [{"courseCode": "2001", "groups": ["10120-1", "10120-1/1"]}]}
+        response = client.post("/schedule/fits", json=request)
+        assert response.status_code == 200
+        assert [course["courseCode"] for course in response.json()["courses"]] == ["3001", "4001"]
+
+        response = client.post("/schedule/fits", json={**request, "course_type": "רוח"})
+        assert [course["courseCode"] for course in response.json()["courses"]] == ["4001"]
+
+        response = client.post("/schedule/fits", json={"department": "מדעי המחשב", "course_type": "בחירה"})
+        assert [course["courseCode"] for course in response.json()["courses"]] == ["2002"]
+
+
+class TestSharedScheduleCache:
+    """Test the serialized schedule cache behind GET /schedule/{share_code}"""
+
+    def _save(self, client, db_session):
+        from backend.app.db.models import Student
+
+        student = Student(username="Share.Owner", password="x", name="Share Owner", department="מדעי המחשב")
+        db_session.add(student)
+        db_session.commit()
+        schedule = {"student_id": student.id, "schedule_name": "Shared",
+                    "schedule_data": [{"courseCode": "10120", "groups": ["1"]}]}
+        response = client.post("/schedule", json=schedule)
+        assert response.status_code == 200
+        return response.json()
+
+    def test_repeated_views_skip_the_db(self, client: TestClient, db_session):
+        """The second view of a link is served from memory with the same body"""
+        saved = self._save(client, db_session)
+        before = client.get("/schedule/metrics").json()
+
+        first = client.get(f"/schedule/{saved['share_code']}")
+        assert first.status_code == 200
+        assert first.json() == saved
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+        try:
+            second = client.get(f"/schedule/{saved['share_code']}")
+        finally:
+            event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+        assert statements == []
+        assert second.content == first.content
+
+        after = client.get("/schedule/metrics").json()
+        assert after["hits"] - before["hits"] == 1
+        assert after["misses"] - before["misses"] == 1
+
+    def test_delete_invalidates(self, client: TestClient, db_session):
+        """A deleted schedule is gone at once, not when its entry expires"""
+        saved = self._save(client, db_session)
+        assert client.get(f"/schedule/{saved['share_code']}").status_code == 200
+        assert client.delete(f"/schedule/{saved['share_code']}").status_code == 200
+        assert client.get(f"/schedule/{saved['share_code']}").status_code == 404
+        assert client.get("/schedule/metrics").json()["invalidations"] >= 1
+
+    def test_lru_and_ttl(self):
+        """The least recently used entry is evicted first and entries expire after the TTL"""
+        from backend.app.core.schedule_cache import ScheduleCache
+
+        schedules = ScheduleCache(max_entries=2, ttl=60)
+        schedules.put("a", b"1", time.monotonic())
+        schedules.put("b", b"2", time.monotonic())
+        assert schedules.get("a") == b"1"
+        schedules.put("c", b"3", time.monotonic())
+        assert schedules.get("b") is None
+        assert schedules.get("a") == b"1" and schedules.get("c") == b"3"
+        assert schedules.metrics()["evictions"] == 1
+
+        with patch("backend.app.core.schedule_cache.time.monotonic", return_value=time.monotonic() + 61):
+            assert schedules.get("a") is None
+        assert schedules.metrics()["entries"] == 1
+
+    def test_read_before_delete_is_not_cached(self):
+        """A body read before a concurrent delete is not cached after the delete invalidated it"""
+        from backend.app.core.schedule_cache import ScheduleCache
+
+        schedules = ScheduleCache(max_entries=2, ttl=60)
+        read_at = time.monotonic()
+        schedules.invalidate("a")
+        schedules.put("a", b"deleted", read_at)
+        assert schedules.get("a") is None
+
+        schedules.put("a", b"recreated", time.monotonic())
+        assert schedules.get("a") == b"recreated"
+
+    def test_delete_racing_a_view(self, client: TestClient, db_session):
+        """A view that read the row just before it was deleted does not bring it back"""
+        from backend.app.db import crud
+
+        saved = self._save(client, db_session)
+        read = crud.get_schedule_by_id
+
+        def read_then_delete(db, schedule_id):
+            db_schedule = read(db, schedule_id)
+            # The delete commits and invalidates between this view's read and its put
+            assert client.delete(f"/schedule/{schedule_id}").status_code == 200
+            return db_schedule
+
+        with patch("backend.app.api.schedule.crud.get_schedule_by_id", side_effect=read_then_delete):
+            assert client.get(f"/schedule/{saved['share_code']}").status_code == 200
+        assert client.get(f"/schedule/{saved['share_code']}").status_code == 404
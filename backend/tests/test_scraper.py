@@ -0,0 +1,352 @@
+import os
+import threading
+import time
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from unittest.mock import patch
+from backend.app.core.helper import get_grade_fetcher
+from backend.scripts.browser_pool import BrowserPool, BrowserPoolTimeout
+from backend.scripts.grade_parser import MAIN_CONTAINER, GradeListNotFound, outer_html, parse_grade_list, parse_html
+from backend.scripts.http_grade_fetcher import GradeFetchError, _adapter, fetch_student_grades
+from backend.scripts.WebScraperStudent import scrape_student_grades
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "yedion")
+
+# What scrape_student_grades reads from fixtures/yedion/grades.html
+EXPECTED_GRADES = {
+    "UserName": "Test.Student",
+    "Courses": [
+        {"10120": ["78", "4.0"]},
+        {"10350": ["N/A", "3.5"]},  # "ציון:&nbsp;91" in innerHTML does not match the grade pattern
+        {"80001": ["N/A", ""]},  # credits come after the final grade marker
+        {"10120": ["88", "4.0"]},
+    ],
+}
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window = handle
+
+    def new_window(self, kind):
+        handle = f"{kind}-{len(self.driver.opened)}"
+        self.driver.opened.append(handle)
+        self.driver.window_handles.append(handle)
+        self.driver.current_window = handle
+
+
+class FakeDriver:
+    """Stands in for webdriver.Chrome; records what the pool does with it"""
+
+    def __init__(self, profile_dir):
+        self.profile_dir = profile_dir
+        self.window_handles = ["main"]
+        self.opened = []
+        self.cdp = []
+        self.cdp_fails = False
+        self.quit_called = False
+        self.healthy = True
+        self.current_window = "main"
+        self.switch_to = FakeSwitchTo(self)
+
+    @property
+    def current_window_handle(self):
+        return self.current_window
+
+    def close(self):
+        self.window_handles.remove(self.current_window)
+
+    def execute_script(self, script):
+        if not self.healthy:
+            raise RuntimeError("chrome not reachable")
+        return 1
+
+    def execute_cdp_cmd(self, command, params):
+        if self.cdp_fails:
+            raise RuntimeError("DevTools unavailable")
+        self.cdp.append((command, params))
+
+    def quit(self):
+        self.quit_called = True
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def launched():
+    return []
+
+
+@pytest.fixture
+def make_pool(launched):
+    pools = []
+
+    def make(**kwargs):
+        def launcher(profile_dir):
+            driver = FakeDriver(profile_dir)
+            launched.append(driver)
+            return driver
+
+        pool = BrowserPool(launcher=launcher, **{"size": 1, "max_uses": 10, "acquire_timeout": 5, **kwargs})
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+class TestBrowserPool:
+    """Test the warm headless-Chrome pool the grade scraper borrows drivers from"""
+
+    def test_driver_is_reused_and_reset(self, make_pool, launched):
+        """Sessions reuse a warm driver, in a new tab with cookies, cache and all origins' storage cleared"""
+        pool = make_pool()
+        with pool.session() as first:
+            first.window_handles.append("yedion-tab")
+        with pool.session() as second:
+            pass
+
+        assert second is first
+        assert len(launched) == 1
+        assert first.cdp == [
+            ("Network.clearBrowserCookies", {}),
+            ("Network.clearBrowserCache", {}),
+            ("Storage.clearDataForOrigin", {"origin": "*", "storageTypes": "all"}),
+        ] * 2
+        assert first.window_handles == ["tab-1"]
+        assert first.current_window == "tab-1"
+        assert os.path.isdir(first.profile_dir)
+
+    def test_recycled_when_storage_cannot_be_cleared(self, make_pool, launched):
+        """A driver whose storage could not be cleared is quit rather than handed to the next student"""
+        pool = make_pool()
+        with pool.session() as first:
+            first.cdp_fails = True
+        with pool.session() as second:
+            pass
+
+        assert second is not first
+        assert first.quit_called
+        assert pool.metrics()["recycled"] == 1
+
+    def test_released_after_close_is_quit(self, make_pool, launched):
+        """A driver still leased when the pool closes is quit on release, not put back to idle"""
+        pool = make_pool()
+        with pool.session() as driver:
+            pool.close()
+
+        assert driver.quit_called
+        assert not os.path.exists(driver.profile_dir)
+        assert pool.metrics()["idle"] == 0
+
+    def test_recycled_after_max_uses(self, make_pool, launched):
+        """A driver is quit after max_uses sessions and a fresh one (with a fresh profile) replaces it"""
+        pool = make_pool(max_uses=2)
+        drivers = []
+        for _ in range(3):
+            with pool.session() as driver:
+                drivers.append(driver)
+
+        assert drivers[0] is drivers[1]
+        assert drivers[2] is not drivers[0]
+        assert drivers[0].quit_called
+        assert not os.path.exists(drivers[0].profile_dir)
+        assert drivers[2].profile_dir != drivers[0].profile_dir
+        assert pool.metrics()["recycled"] == 1
+
+    def test_recycled_on_error(self, make_pool, launched):
+        """A session that raises never hands its driver to the next student"""
+        pool = make_pool()
+        with pytest.raises(ValueError):
+            with pool.session() as failed:
+                raise ValueError("page layout changed")
+
+        with pool.session() as driver:
+            assert driver is not failed
+        assert failed.quit_called
+
+    def test_unhealthy_driver_replaced(self, make_pool, launched):
+        """An idle driver that fails its health check is replaced on acquire"""
+        pool = make_pool()
+        pool.warm()
+        launched[0].healthy = False
+
+        with pool.session() as driver:
+            assert driver is not launched[0]
+        assert launched[0].quit_called
+        assert pool.metrics()["unhealthy"] == 1
+
+    def test_size_caps_drivers(self, make_pool, launched):
+        """With every driver leased, acquire waits for one and times out if none frees up"""
+        pool = make_pool(size=1, acquire_timeout=0.2)
+        release = threading.Event()
+        leased = threading.Event()
+
+        def hold():
+            with pool.session():
+                leased.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        try:
+            assert leased.wait(5)
+            with pytest.raises(BrowserPoolTimeout):
+                with pool.session():
+                    pass
+        finally:
+            release.set()
+            holder.join(5)
+
+        with pool.session():
+            pass
+        assert len(launched) == 1
+        assert pool.metrics()["timeouts"] == 1
+
+    def test_metrics(self, make_pool, launched):
+        """Acquire latency and utilization are recorded"""
+        pool = make_pool(size=2)
+        pool.warm()
+        assert wait_until(lambda: pool.metrics()["idle"] == 2)
+        with pool.session():
+            time.sleep(0.02)
+            assert pool.metrics()["inUse"] == 1
+
+        metrics = pool.metrics()
+        assert metrics["launched"] == 2
+        assert metrics["inUse"] == 0
+        assert 0 < metrics["utilization"] <= 1
+        assert set(metrics["acquireMs"]) == {"avg", "p50", "p95", "max"}
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class StandInYedion(BaseHTTPRequestHandler):
+    """Local stand-in for the SSO login and Yedion pages, serving the recorded fixtures"""
+
+    password = "secret123"
+    session_cookie = "MRHSession=stand-in"
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body="", headers=()):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _logged_in(self):
+        return self.session_cookie in (self.headers.get("Cookie") or "")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.requests_seen.append(("GET", url.path))
+        if url.path == "/my.policy":
+            return self._send(200, fixture("login.html"))
+        if not self._logged_in():
+            return self._send(302, headers=[("Location", "/my.policy")])
+        query = parse_qs(url.query)
+        pages = {
+            "/vdesk/webtop.eui": "portal.html",
+            "/yedion/main.aspx": "yedion.html",
+        }
+        if url.path in pages:
+            return self._send(200, fixture(pages[url.path]))
+        if url.path == "/yedion/fireflyweb.aspx" and query.get("prgname") == ["Enter_Grades"]:
+            return self._send(200, fixture("grades_form.html"))
+        return self._send(404, "not found")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8"))
+        self.requests_seen.append(("POST", url.path))
+        if url.path == "/my.policy":
+            if form.get("vhost") == ["standard"] and form.get("password") == [self.password]:
+                return self._send(302, headers=[("Location", "/vdesk/webtop.eui"),
+                                                ("Set-Cookie", f"{self.session_cookie}; Path=/")])
+            return self._send(200, fixture("login.html"))
+        if not self._logged_in():
+            return self._send(302, headers=[("Location", "/my.policy")])
+        if (url.path == "/yedion/fireflyweb.aspx" and form.get("prgname") == ["Grades_List"]
+                and form.get("R1C1") == ["-1"] and form.get("R1C2") == ["0"]):
+            return self._send(200, fixture("grades.html"))
+        return self._send(400, "bad request")
+
+
+@pytest.fixture
+def yedion_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInYedion)
+    StandInYedion.requests_seen = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpGradeFetcher:
+    """Test the browser-free grade fetcher against recorded pages"""
+
+    def test_parse_grade_list(self):
+        """The grade list parser reads the page exactly like the browser scraper"""
+        assert parse_grade_list(fixture("grades.html"), "Test.Student") == EXPECTED_GRADES
+
+    def test_parse_container_outer_html(self):
+        """The browser scraper parses the container's outerHTML from one execute_script; same result"""
+        container = parse_html(fixture("grades.html")).xpath(MAIN_CONTAINER)[0]
+        assert parse_grade_list(outer_html(container), "Test.Student") == EXPECTED_GRADES
+
+    def test_parse_without_grade_list(self):
+        """A page without the grade list container is an error, not an empty result"""
+        with pytest.raises(GradeListNotFound):
+            parse_grade_list(fixture("login.html"), "Test.Student")
+
+    def test_fetch_student_grades(self, yedion_server):
+        """SSO login, Afeka-Net, grade list menu and the all-years form, then the parsed grades"""
+        result = fetch_student_grades("Test.Student", "secret123", login_url=f"{yedion_server}/my.policy")
+        assert result == EXPECTED_GRADES
+        assert StandInYedion.requests_seen == [
+            ("GET", "/my.policy"), ("POST", "/my.policy"), ("GET", "/vdesk/webtop.eui"),
+            ("GET", "/yedion/main.aspx"), ("GET", "/yedion/fireflyweb.aspx"), ("POST", "/yedion/fireflyweb.aspx"),
+        ]
+
+    def test_sessions_closed_pool_kept(self, yedion_server):
+        """Each fetch closes its Session; the connection pool shared between students stays open"""
+        with patch.object(requests.Session, "close", autospec=True, side_effect=requests.Session.close) as close:
+            for _ in range(2):
+                result = fetch_student_grades("Test.Student", "secret123", login_url=f"{yedion_server}/my.policy")
+                assert result == EXPECTED_GRADES
+        assert close.call_count == 2
+        assert _adapter.poolmanager.pools
+
+    def test_wrong_password(self, yedion_server):
+        """A login that comes back to the login form fails"""
+        with pytest.raises(GradeFetchError):
+            fetch_student_grades("Test.Student", "wrong", login_url=f"{yedion_server}/my.policy")
+
+    def test_fetcher_is_configurable(self):
+        """GRADE_FETCHER picks the implementation"""
+        assert get_grade_fetcher("browser") is scrape_student_grades
+        assert get_grade_fetcher("http") is fetch_student_grades
+        with pytest.raises(ValueError):
+            get_grade_fetcher("curl")